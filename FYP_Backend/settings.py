@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -49,6 +51,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.tenancy.TenantMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -94,21 +97,139 @@ elif USE_SQLITE:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': BASE_DIR / 'db.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
         }
     }
+    # High-concurrency SQLite: WAL lets readers run alongside the writer,
+    # IMMEDIATE transactions take the write lock up front so concurrent
+    # writers wait up to `timeout` seconds instead of failing with
+    # "database is locked", and NORMAL sync is safe with WAL.
+    if os.environ.get('SQLITE_TUNING', 'True') == 'True':
+        DATABASES['default']['OPTIONS'] = {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA mmap_size=134217728',
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        }
 else:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.postgresql',
-            'NAME': 'school_db',
-            'USER': 'dbuser',
-            'PASSWORD': 'dbpass',
-            'HOST': 'localhost',  # or DB host/IP
-            'PORT': '5433',
+            'NAME': os.environ.get('DB_NAME', 'school_db'),
+            'USER': os.environ.get('DB_USER', 'dbuser'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', 'dbpass'),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),  # or DB host/IP
+            'PORT': os.environ.get('DB_PORT', '5433'),
         }
     }
 
+# Connection reuse. By default connections persist across requests for
+# DB_CONN_MAX_AGE seconds (0 opens one per request) and are health checked
+# before reuse. With PostgreSQL, DB_POOL=True uses Django's psycopg 3 pool
+# instead (pip install "psycopg[binary,pool]").
+if not TESTING:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+    if not USE_SQLITE and os.environ.get('DB_POOL') == 'True':
+        try:
+            from psycopg_pool import ConnectionPool
+        except ImportError as exc:
+            raise ImproperlyConfigured(
+                'DB_POOL=True needs psycopg 3 with its pool, which requirements.txt does not install: '
+                'pip install "psycopg[binary,pool]"'
+            ) from exc
+
+        # A pool replaces persistent connections
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),  # wait for a free connection
+                'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', '1800')),
+                'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', '600')),
+                'check': ConnectionPool.check_connection,
+            },
+        }
+
+# Read replicas (see core.routers), as a comma separated DB_REPLICAS list:
+# database file paths with SQLite, host[:port] entries with PostgreSQL.
+# Locally, two SQLite files kept in sync with `manage.py sync_sqlite_replicas`
+# stand in for a streaming replica.
+DATABASE_REPLICAS = []
+if not TESTING:
+    for n, replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+        alias = f'replica{n}'
+        if USE_SQLITE:
+            DATABASES[alias] = {**DATABASES['default'], 'NAME': replica.strip()}
+        else:
+            host, _, port = replica.strip().partition(':')
+            DATABASES[alias] = {**DATABASES['default'], 'HOST': host, 'PORT': port or DATABASES['default']['PORT']}
+        DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+        DATABASE_REPLICAS.append(alias)
+
+# Scan ingestion shards (see core.sharding), as a comma separated DB_SHARDS
+# list of extra databases like DB_REPLICAS. The primary stays a shard;
+# shards are only ever appended, and `manage.py rebalance_shards` moves the
+# sessions the new ones take over. The tests add two local SQLite shards,
+# which only core.tests.ShardingTestCase enables.
+ATTENDANCE_SHARDS = ['default']
+if TESTING:
+    for alias in ('shard1', 'shard2'):
+        DATABASES[alias] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+else:
+    for n, shard in enumerate(filter(None, os.environ.get('DB_SHARDS', '').split(',')), start=1):
+        alias = f'shard{n}'
+        if USE_SQLITE:
+            DATABASES[alias] = {**DATABASES['default'], 'NAME': shard.strip()}
+        else:
+            host, _, port = shard.strip().partition(':')
+            DATABASES[alias] = {**DATABASES['default'], 'HOST': host, 'PORT': port or DATABASES['default']['PORT']}
+        ATTENDANCE_SHARDS.append(alias)
+
+DATABASE_ROUTERS = ['core.sharding.ShardRouter', 'core.routers.ReplicaRouter']
+
+# Send scan and approval writes through one writer thread with group
+# commits (see core.write_queue). Off by default: with WAL and IMMEDIATE
+# transactions it has not measured faster (benchmarks/bench_sqlite_concurrency.py)
+SQLITE_WRITE_QUEUE = USE_SQLITE and not TESTING and os.environ.get('SQLITE_WRITE_QUEUE', 'False') == 'True'
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Token revocations, response cache versions and similar state must be
+# visible to every worker, so multi-process deployments point REDIS_URL at a
+# shared Redis instance. Without it the cache is local to each process, which
+# is only coherent with a single worker: ALLOW_PROCESS_LOCAL_CACHE declares
+# that (the default under DEBUG); otherwise token revocation refuses to start.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+ALLOW_PROCESS_LOCAL_CACHE = os.environ.get('ALLOW_PROCESS_LOCAL_CACHE', str(DEBUG or TESTING)) == 'True'
+
+# Lifetime of cached reference data responses (see core.caching)
+API_RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+# Lifetime of cached dashboard data and rendered fragments (see core.dashboards)
+DASHBOARD_CACHE_TIMEOUT = 10 * 60
+
+# Live counters of active attendance sessions (see core.live_stats). The cache
+# backend is shared by all workers through REDIS_URL; LocalLiveStats keeps them
+# in the process, for a single worker.
+LIVE_SESSION_STATS_BACKEND = os.environ.get('LIVE_SESSION_STATS_BACKEND', 'core.live_stats.CacheLiveStats')
+LIVE_SESSION_STATS_TIMEOUT = 5 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -157,13 +278,75 @@ LOGIN_URL = '/api/login/student/'
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.RoleJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson-backed JSON, falling back to the stdlib when orjson is missing
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Serve JSON list endpoints from values_list() rows (see core.fastpath)
+FAST_LIST_ENDPOINTS = True
+
+# Scan event log (see core.models.ScanEvent and core.replay)
+SCAN_EVENT_BATCH_SIZE = 500
+SCAN_EVENT_REPLAY_CHUNK_SIZE = 5000
+
+# Archival of stopped sessions (see core.archive)
+ATTENDANCE_ARCHIVE_AFTER_DAYS = 180
+ATTENDANCE_ARCHIVE_CHUNK_SIZE = 100  # sessions per transaction
+
+# Low attendance alerts (see core.alerts), raised by `manage.py detect_low_attendance`
+ATTENDANCE_ALERT_COURSE_THRESHOLD = 75.0  # percentage
+ATTENDANCE_ALERT_OVERALL_THRESHOLD = 75.0
+ATTENDANCE_ALERT_MIN_CLASSES = 3  # held classes before a rate is judged
+ATTENDANCE_ALERT_WATERMARK_OVERLAP = 5 * 60  # seconds
+ATTENDANCE_ALERT_BATCH_SIZE = 500  # students per transaction
+
+# Notification outbox (see core.notifications), delivered by `manage.py dispatch_notifications`.
+# Channels: core.notifications.ConsoleChannel, FileChannel (NOTIFICATION_FILE_PATH)
+# or SMTPChannel (Django's EMAIL_* settings).
+NOTIFICATION_CHANNEL = os.environ.get('NOTIFICATION_CHANNEL', 'core.notifications.ConsoleChannel')
+NOTIFICATION_FILE_PATH = os.environ.get('NOTIFICATION_FILE_PATH', str(BASE_DIR / 'notifications.log'))
+NOTIFICATION_BATCH_SIZE = 200  # notifications claimed per batch
+NOTIFICATION_CLAIM_TIMEOUT = 5 * 60  # seconds a claimed batch is kept from other dispatchers
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_RETRY_DELAY = 60  # seconds, doubled on each failed attempt
+NOTIFICATION_RETRY_MAX_DELAY = 60 * 60
+
+# Background tasks (see core.tasks). WorkerExecutor leaves them to `manage.py run_tasks`,
+# which production deployments must run alongside the web workers; ThreadPoolExecutor
+# runs them in the web process (development); EagerExecutor runs them inline (tests).
+# Only non-critical work is queued: a scan credits attendance in its own transaction.
+TASK_EXECUTOR = 'core.tasks.EagerExecutor' if TESTING else os.environ.get(
+    'TASK_EXECUTOR', 'core.tasks.ThreadPoolExecutor' if DEBUG else 'core.tasks.WorkerExecutor'
+)
+TASK_THREADS = 2
+TASK_BATCH_SIZE = 100  # tasks claimed per batch
+TASK_CLAIM_TIMEOUT = 5 * 60  # seconds a claimed batch is kept from other workers
+TASK_RETRY_DELAY = 30  # seconds, doubled on each failed attempt
+TASK_RETRY_MAX_DELAY = 60 * 60
+TASK_RETENTION = 7 * 24 * 60 * 60  # seconds done tasks (and their keys) are kept
+
+# Campus of requests whose host is not the domain of a tenant, and of rows
+# created outside a request (see core.tenancy)
+DEFAULT_TENANT_SLUG = os.environ.get('DEFAULT_TENANT_SLUG', 'default')
+TENANT_CACHE_TIMEOUT = 5 * 60  # seconds a host's tenant is cached
+
+# Course rosters kept in each worker process (see core.enrollment); the dict
+# is emptied when it reaches this many courses and sections
+ENROLLMENT_CACHE_SIZE = 1000
+
 # Simple JWT settings
 from datetime import timedelta
 
@@ -176,5 +359,24 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_USER_CLASS': 'core.authentication.RoleTokenUser',
+}
+
+# Failed login throttling (in-memory token buckets, see core.throttling)
+LOGIN_RATE_LIMIT = {
+    'EMAIL_CAPACITY': 5,
+    'EMAIL_REFILL_PER_SECOND': 1 / 60,
+    'IP_CAPACITY': 50,
+    'IP_REFILL_PER_SECOND': 1 / 6,
 }
 
+# Repeated RFID taps of one card in one session within this many seconds are
+# answered with the first tap's successful response, without touching the
+# database (see core.throttling). The window is kept in each worker process, so
+# a repeat landing on another worker is processed normally (and recorded as a
+# scan event). 0 disables; tests opt in, so ids reused across tests never hit.
+RFID_SCAN_DEBOUNCE_SECONDS = 0 if TESTING else 1.0
+
+# Reject tokens issued before a logout/deactivation (see core.authentication)
+JWT_REVOCATION_CHECK = os.environ.get('JWT_REVOCATION_CHECK', 'True') == 'True'
+
@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+"""
+Benchmark RFID scan throughput with one database connection per request,
+persistent connections (CONN_MAX_AGE) and, on PostgreSQL with psycopg 3,
+Django's connection pool (DB_POOL=True). See scan_load.py for the database
+each mode runs against.
+
+Usage: python benchmarks/bench_connection_pool.py [clients scans_per_client]
+"""
+import os
+
+from common import ARGS
+from scan_load import run_modes
+
+
+def main():
+    clients, scans = [int(arg) for arg in ARGS[:2]] or [8, 200]
+    modes = [
+        ('per request', {'DB_CONN_MAX_AGE': '0'}),
+        ('persistent', {'DB_CONN_MAX_AGE': '60'}),
+    ]
+    if os.environ.get('USE_SQLITE', 'True') != 'True':
+        modes.append(('pool', {'DB_POOL': 'True'}))
+    run_modes('RFID scans by connection handling', modes, clients, scans)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Benchmark render time and peak allocation of DRF's stdlib JSONRenderer
+against FastJSONRenderer for the session `attendance` action at 500 records
+and AttendanceRecordViewSet.list at 50k records.
+
+Usage: python benchmarks/bench_json_renderer.py [attendance_rows list_rows]
+"""
+import tracemalloc
+
+from common import ARGS, setup_database, timed, print_table
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Student, Teacher, Course, AttendanceSession, AttendanceRecord
+from core.renderers import FastJSONRenderer
+from core.views import AttendanceSessionViewSet, AttendanceRecordViewSet
+
+STUDENTS_PER_SESSION = 500
+
+
+def populate(rows):
+    teacher = Teacher.objects.create(teacher_name='Bench Teacher', rfid='BENCH_T')
+    course = Course.objects.create(course_name='Bench Course')
+    Student.objects.bulk_create(
+        Student(student_name=f'Student {i}', rfid=f'BENCH_{i}', year=1, dept='CS', section='A')
+        for i in range(STUDENTS_PER_SESSION)
+    )
+    students = list(Student.objects.values_list('student_id', flat=True))
+    now = timezone.now()
+    sessions = []
+    for n in range(max(1, rows // STUDENTS_PER_SESSION)):
+        session = AttendanceSession.objects.create(
+            teacher=teacher, course=course, section='A', year=1, qr_code_token=f'bench-{n}'
+        )
+        AttendanceRecord.objects.bulk_create(
+            AttendanceRecord(session=session, student_id=sid, rfid_scanned=True, rfid_scanned_at=now,
+                             qr_scanned=bool(sid % 3), qr_scanned_at=now if sid % 3 else None,
+                             is_present=bool(sid % 3), marked_present_at=now if sid % 3 else None)
+            for sid in students
+        )
+        sessions.append(session)
+    return sessions
+
+
+def response_data(view, path, user, **kwargs):
+    request = APIRequestFactory().get(path, HTTP_ACCEPT='application/json')
+    force_authenticate(request, user=user)
+    return view(request, **kwargs).data
+
+
+def peak_allocation(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    attendance_rows, list_rows = [int(arg) for arg in ARGS] or [500, 50000]
+    setup_database()
+    user = User.objects.create_user(username='bench@test.com', password='x')
+    sessions = populate(max(attendance_rows, list_rows))
+
+    cases = [
+        ('attendance', response_data(
+            AttendanceSessionViewSet.as_view({'get': 'attendance'}),
+            f'/api/attendance-sessions/{sessions[0].id}/attendance/', user, pk=sessions[0].id
+        )),
+        ('records list', response_data(
+            AttendanceRecordViewSet.as_view({'get': 'list'}), '/api/attendance-records/', user
+        )),
+    ]
+
+    rows = []
+    for name, data in cases:
+        size = len(data['records']) if isinstance(data, dict) else len(data)
+        for label, renderer in [('stdlib', JSONRenderer()), ('orjson', FastJSONRenderer())]:
+            render = lambda: renderer.render(data, 'application/json')
+            elapsed = timed(render, repeat=5)
+            peak = peak_allocation(render)
+            rows.append((name, size, label, f'{elapsed * 1000:.2f}ms', f'{peak / 1024:.0f}KiB'))
+    print_table('JSON rendering: stdlib JSONRenderer vs FastJSONRenderer',
+                ('response', 'records', 'renderer', 'render time', 'peak alloc'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Benchmark the values_list() fast path against the ModelSerializer path for
+GET /api/students/ and GET /api/attendance-records/ at 10k and 100k rows.
+
+Usage: python benchmarks/bench_list_fastpath.py [rows ...]
+"""
+from common import ARGS, setup_database, timed, print_table
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Student, Teacher, Course, AttendanceSession, AttendanceRecord
+from core.views import StudentViewSet, AttendanceRecordViewSet
+
+STUDENTS_PER_SESSION = 1000
+
+
+def populate(rows):
+    Student.objects.all().delete()
+    AttendanceSession.objects.all().delete()
+    teacher = Teacher.objects.get_or_create(teacher_name='Bench Teacher', rfid='BENCH_T')[0]
+    course = Course.objects.get_or_create(course_name='Bench Course')[0]
+    Student.objects.bulk_create(
+        Student(student_name=f'Student {i}', rfid=f'BENCH_{i}', year=1, dept='CS', section='A',
+                overall_attendance=i % 100)
+        for i in range(rows)
+    )
+    students = list(Student.objects.values_list('student_id', flat=True)[:STUDENTS_PER_SESSION])
+    now = timezone.now()
+    for n in range(rows // STUDENTS_PER_SESSION):
+        session = AttendanceSession.objects.create(
+            teacher=teacher, course=course, section='A', year=1, qr_code_token=f'bench-{rows}-{n}'
+        )
+        AttendanceRecord.objects.bulk_create(
+            AttendanceRecord(session=session, student_id=sid, rfid_scanned=True, rfid_scanned_at=now,
+                             qr_scanned=True, qr_scanned_at=now, is_present=True, marked_present_at=now)
+            for sid in students
+        )
+
+
+def list_call(viewset, path, user):
+    view = viewset.as_view({'get': 'list'})
+    factory = APIRequestFactory()
+
+    def call():
+        request = factory.get(path, HTTP_ACCEPT='application/json')
+        force_authenticate(request, user=user)
+        response = view(request)
+        response.render()
+        return response.content
+    return call
+
+
+def main():
+    sizes = [int(arg) for arg in ARGS] or [10000, 100000]
+    setup_database()
+    user = User.objects.create_user(username='bench@test.com', password='x')
+    rows = []
+    for size in sizes:
+        populate(size)
+        for name, viewset, path in [
+            ('students', StudentViewSet, '/api/students/'),
+            ('records', AttendanceRecordViewSet, '/api/attendance-records/'),
+        ]:
+            call = list_call(viewset, path, user)
+            fast_body = call()
+            fast = timed(call)
+            with override_settings(FAST_LIST_ENDPOINTS=False):
+                slow_body = call()
+                slow = timed(call, repeat=1)
+            assert fast_body == slow_body, f'{name}: fast path output differs'
+            rows.append((name, size, f'{slow:.3f}s', f'{fast:.3f}s', f'{slow / fast:.1f}x'))
+    print_table('List endpoint: serializer vs values_list() fast path',
+                ('endpoint', 'rows', 'serializer', 'fast path', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Benchmark "students present in at least 75% of the sessions of a course"
+answered with a GROUP BY over AttendanceRecord against the sessions'
+presence bitmaps, with every student present in about 80% of the sessions.
+
+Usage: python benchmarks/bench_presence.py [students sessions]
+"""
+import random
+
+from common import ARGS, setup_database, timed, print_table
+
+from django.db.models import Count
+
+from core.models import Student, Teacher, Course, AttendanceSession, AttendanceRecord
+from core.presence import attendance_rates, build_presence, session_bitmaps
+
+
+def populate(students, sessions):
+    rng = random.Random(0)
+    teacher = Teacher.objects.create(teacher_name='Bench Teacher', rfid='BENCH_T')
+    course = Course.objects.create(course_name='Bench Course')
+    Student.objects.bulk_create(
+        Student(student_name=f'Student {i}', rfid=f'BENCH_{i}', year=1, dept='CS', section='A')
+        for i in range(students)
+    )
+    student_ids = list(Student.objects.values_list('student_id', flat=True))
+    session_ids = []
+    for n in range(sessions):
+        session = AttendanceSession.objects.create(
+            teacher=teacher, course=course, section='A', year=1, qr_code_token=f'bench-presence-{n}', status='stopped'
+        )
+        session_ids.append(session.id)
+        AttendanceRecord.objects.bulk_create(
+            [AttendanceRecord(session=session, student_id=sid, rfid_scanned=True, qr_scanned=True, is_present=True)
+             for sid in student_ids if rng.random() < 0.8],
+            batch_size=2000
+        )
+    build_presence(AttendanceSession, session_ids)
+    return course
+
+
+def main():
+    students, sessions = [int(arg) for arg in ARGS] or [2000, 500]
+    setup_database()
+    course = populate(students, sessions)
+    results = {}
+
+    def with_query():
+        total = AttendanceSession.objects.filter(course=course, status='stopped').count()
+        results['query'] = set(
+            AttendanceRecord.objects.filter(session__course=course, session__status='stopped', is_present=True)
+            .values('student_id').annotate(n=Count('id')).filter(n__gte=0.75 * total)
+            .values_list('student_id', flat=True)
+        )
+
+    def with_bitmaps():
+        index, sessions = session_bitmaps(course=course.course_id)
+        results['bitmaps'] = {
+            index.students[position] for position, rate in attendance_rates(bits for _, _, bits in sessions).items()
+            if rate >= 75
+        }
+
+    rows = [(name, f'{timed(func) * 1000:.1f}ms') for name, func in (('GROUP BY', with_query), ('bitmaps', with_bitmaps))]
+    assert results['query'] == results['bitmaps']
+    print_table(
+        f'Students present in >= 75% of {sessions} sessions ({students} students, {len(results["query"])} found)',
+        ('method', 'time'), rows
+    )
+
+
+if __name__ == '__main__':
+    main()
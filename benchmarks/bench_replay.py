@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Benchmark rebuilding attendance from the scan event log: every student
+scans RFID and QR in every session, as in a semester of classes.
+
+Usage: python benchmarks/bench_replay.py [students sessions]
+"""
+from datetime import timedelta
+
+from common import ARGS, setup_database, timed, print_table
+
+from django.utils import timezone
+
+from core.models import Student, Teacher, Course, TaughtCourse, AttendanceSession, ScanEvent
+from core.replay import AttendanceReplay
+
+
+def populate(students, sessions):
+    teacher = Teacher.objects.create(teacher_name='Bench Teacher', rfid='BENCH_T')
+    course = Course.objects.create(course_name='Bench Course')
+    TaughtCourse.objects.create(course=course, teacher=teacher, classes_taken=', '.join(f'C{n}' for n in range(sessions)))
+    Student.objects.bulk_create(
+        Student(student_name=f'Student {i}', rfid=f'BENCH_{i}', year=1, dept='CS', section='A')
+        for i in range(students)
+    )
+    student_ids = list(Student.objects.values_list('student_id', flat=True))
+    start = timezone.now() - timedelta(days=sessions)
+    for n in range(sessions):
+        session = AttendanceSession.objects.create(
+            teacher=teacher, course=course, section='A', year=1, qr_code_token=f'bench-replay-{n}'
+        )
+        at = start + timedelta(days=n)
+        ScanEvent.objects.bulk_create(
+            [ScanEvent(kind=kind, occurred_at=at, student_id=sid, session=session,
+                       course=course, teacher=teacher)
+             for sid in student_ids for kind in (ScanEvent.RFID, ScanEvent.QR)],
+            batch_size=2000
+        )
+
+
+def main():
+    students, sessions = [int(arg) for arg in ARGS] or [1000, 120]
+    setup_database()
+    populate(students, sessions)
+    stats = {}
+
+    def replay():
+        stats.update(AttendanceReplay().run())
+
+    elapsed = timed(replay, repeat=1)
+    print_table('Replay of the scan event log', ('events', 'records', 'seconds', 'events/s'),
+                [(stats['events'], stats['records'], f'{elapsed:.2f}', f'{stats["events"] / elapsed:,.0f}')])
+
+
+if __name__ == '__main__':
+    main()
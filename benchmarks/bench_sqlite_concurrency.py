@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+"""
+Benchmark concurrent RFID scans on SQLite: the default configuration
+against WAL with IMMEDIATE transactions, and additionally the single-writer
+queue with group commits (SQLITE_TUNING / SQLITE_WRITE_QUEUE in settings.py).
+
+Usage: python benchmarks/bench_sqlite_concurrency.py [clients scans_per_client]
+"""
+from common import ARGS
+from scan_load import run_modes
+
+
+def main():
+    clients, scans = [int(arg) for arg in ARGS[:2]] or [50, 40]
+    run_modes('RFID scans on SQLite', [
+        ('default', {'SQLITE_TUNING': 'False', 'SQLITE_WRITE_QUEUE': 'False'}),
+        ('WAL', {'SQLITE_TUNING': 'True', 'SQLITE_WRITE_QUEUE': 'False'}),
+        ('WAL + queue', {'SQLITE_TUNING': 'True', 'SQLITE_WRITE_QUEUE': 'True'}),
+    ], clients, scans)
+
+
+if __name__ == '__main__':
+    main()
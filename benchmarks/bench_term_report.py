@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Benchmark building a term report (students x sessions attendance grid,
+rates, moving averages) from presence bitmaps and rendering it in each
+file format, with every student present in about 80% of the sessions.
+
+Usage: python benchmarks/bench_term_report.py [students sessions]
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+from common import ARGS, setup_database, timed, print_table
+
+from core.models import Student, Teacher, Course, AttendanceSession, AttendanceRecord
+from core.presence import build_presence
+from core.renderers import TermReportCSVRenderer, TermReportHTMLRenderer, TermReportXLSXRenderer
+from core.reports import build_term_report
+
+
+def populate(students, sessions):
+    rng = random.Random(0)
+    teacher = Teacher.objects.create(teacher_name='Bench Teacher', rfid='BENCH_T')
+    course = Course.objects.create(course_name='Bench Course')
+    Student.objects.bulk_create(
+        Student(student_name=f'Student {i}', rfid=f'BENCH_{i}', year=1, dept='CS', section='A')
+        for i in range(students)
+    )
+    student_ids = list(Student.objects.values_list('student_id', flat=True))
+    start = datetime(2024, 1, 8, 9, tzinfo=timezone.utc)
+    session_ids = []
+    for n in range(sessions):
+        session = AttendanceSession.objects.create(
+            teacher=teacher, course=course, section='A', year=1, qr_code_token=f'bench-report-{n}', status='stopped'
+        )
+        AttendanceSession.objects.filter(pk=session.pk).update(started_at=start + timedelta(days=2 * n))
+        session_ids.append(session.id)
+        AttendanceRecord.objects.bulk_create(
+            [AttendanceRecord(session=session, student_id=sid, rfid_scanned=True, qr_scanned=True, is_present=True)
+             for sid in student_ids if rng.random() < 0.8],
+            batch_size=2000
+        )
+    build_presence(AttendanceSession, session_ids)
+    return course
+
+
+def main():
+    students, sessions = [int(arg) for arg in ARGS] or [2000, 60]
+    setup_database()
+    course = populate(students, sessions)
+    report = build_term_report(course, 'A', 1, '2024-S1')
+
+    rows = [('build', f'{timed(lambda: build_term_report(course, "A", 1, "2024-S1")) * 1000:.1f}ms')]
+    for renderer in (TermReportCSVRenderer(), TermReportHTMLRenderer(), TermReportXLSXRenderer()):
+        rows.append((f'render {renderer.format}', f'{timed(lambda: renderer.render(report)) * 1000:.1f}ms'))
+    print_table(
+        f'Term report of {len(report["sessions"])} sessions x {len(report["students"])} students',
+        ('step', 'time'), rows
+    )
+
+
+if __name__ == '__main__':
+    main()
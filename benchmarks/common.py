@@ -0,0 +1,50 @@
+"""
+Shared setup for the benchmark scripts.
+
+Like demo_api.py, the scripts run against an in-memory SQLite database so
+they need no PostgreSQL server, unless BENCH_CONFIGURED_DB=True selects the
+database configured in settings.py (DB_NAME, USE_SQLITE, ...). Import this
+module before anything that touches Django models.
+"""
+import os
+import sys
+import time
+
+# Command line arguments of the benchmark script itself
+ARGS = sys.argv[1:]
+
+# Trigger the in-memory SQLite configuration in settings.py
+if os.environ.get('BENCH_CONFIGURED_DB') != 'True':
+    sys.argv = ['test']
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'FYP_Backend.settings')
+
+import django
+
+django.setup()
+
+from django.core.management import call_command
+
+
+def setup_database():
+    call_command('migrate', verbosity=0)
+
+
+def timed(func, repeat=3):
+    """Return the best wall time of `repeat` calls, in seconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def print_table(title, header, rows):
+    print(f"\n{title}")
+    print('=' * 60)
+    print(''.join(f'{h:>15}' for h in header))
+    for row in rows:
+        print(''.join(f'{c:>15}' for c in row))
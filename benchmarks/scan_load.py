@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Concurrent RFID scan load, shared by the database benchmarks.
+
+run_modes() runs this script once per mode, in a fresh process with the
+mode's environment, against the database configured in settings.py: with
+PostgreSQL (USE_SQLITE=False) point DB_NAME at a scratch database, with
+SQLite each mode gets a temporary database file. The process migrates the
+database, scans with `clients` threads and prints elapsed seconds and the
+number of failed scans.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from common import ARGS, setup_database, print_table
+
+
+def run_worker(clients, scans):
+    from django.db import connections
+    from django.test import Client
+    from django.urls import reverse
+
+    from core.models import AttendanceSession, Course, Student, Teacher
+
+    setup_database()
+    teacher = Teacher.objects.create(teacher_name='Bench Teacher', rfid='BENCH_T')
+    course = Course.objects.create(course_name='Bench Course')
+    Student.objects.bulk_create(
+        Student(student_name=f'Student {i}', rfid=f'BENCH_{i}', year=1, dept='CS', section='A')
+        for i in range(clients)
+    )
+    session = AttendanceSession.objects.create(
+        teacher=teacher, course=course, section='A', year=1, qr_code_token='bench-scan-load'
+    )
+    connections.close_all()
+
+    url = reverse('rfid-scan')
+    failures = []
+
+    def scan_loop(n):
+        client = Client(raise_request_exception=False)
+        payload = {'rfid': f'BENCH_{n}', 'session_id': session.id}
+        for _ in range(scans):
+            if client.post(url, payload, content_type='application/json').status_code != 200:
+                failures.append(n)
+
+    threads = [threading.Thread(target=scan_loop, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(time.perf_counter() - start, len(failures))
+
+
+def run_modes(title, modes, clients, scans):
+    """Run the scan load once per (name, environment overrides) mode and print a table"""
+    postgres = os.environ.get('USE_SQLITE', 'True') != 'True'
+    rows = []
+    for mode, overrides in modes:
+        env = {**os.environ, **overrides, 'BENCH_CONFIGURED_DB': 'True'}
+        with tempfile.TemporaryDirectory() as tmp:
+            if not postgres:
+                env['DB_NAME'] = os.path.join(tmp, 'bench.sqlite3')
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), str(clients), str(scans)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+        elapsed, failed = output.split()[-2:]
+        total = clients * scans
+        rows.append((mode, total, f'{float(elapsed):.2f}s', f'{total / float(elapsed):,.0f}', failed))
+    print_table(
+        f"{title}, {clients} concurrent clients ({'PostgreSQL' if postgres else 'SQLite'})",
+        ('mode', 'scans', 'time', 'scans/s', 'failed'), rows
+    )
+
+
+if __name__ == '__main__':
+    run_worker(*[int(arg) for arg in ARGS[:2]])
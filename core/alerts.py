@@ -0,0 +1,166 @@
+"""
+Low attendance early warnings.
+
+detect_low_attendance() compares each student's attendance in every course
+and overall with ATTENDANCE_ALERT_COURSE_THRESHOLD and
+ATTENDANCE_ALERT_OVERALL_THRESHOLD and keeps AttendanceAlert in step: an
+alert is raised when a rate falls below its threshold, updated while it
+stays below and resolved once it recovers, so a student has one alert per
+course (and one overall) however many runs see them below. Rates over
+fewer than ATTENDANCE_ALERT_MIN_CLASSES held classes are not judged yet.
+
+Runs are incremental. StudentCourse and TaughtCourse carry an updated_at
+stamp, so a run only evaluates students whose attended or held classes
+changed since the previous run started, not the whole student body. The
+watermark is moved back by ATTENDANCE_ALERT_WATERMARK_OVERLAP seconds to
+cover transactions still open when that run read; evaluating a student
+twice is harmless. Deleting a StudentCourse stamps nothing, so its alert
+is resolved on the student's next evaluation (or by a --full run).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .attendance import attendance_percentage, classes_held
+from .models import AttendanceAlert, AttendanceAlertRun, Notification, Student, StudentCourse, TaughtCourse
+from .notifications import notify
+
+
+def watermark():
+    """Start of the last run, less the overlap; None before the first run"""
+    last = AttendanceAlertRun.objects.order_by('-started_at').values_list('started_at', flat=True).first()
+    if last is None:
+        return None
+    return last - timedelta(seconds=getattr(settings, 'ATTENDANCE_ALERT_WATERMARK_OVERLAP', 5 * 60))
+
+
+def changed_students(since=None):
+    """
+    Ids of the students whose attended classes, or the held classes of one
+    of whose courses, changed at or after `since`; every student with a
+    course when `since` is None. Both lookups use the updated_at indexes.
+    """
+    student_courses = StudentCourse.objects.order_by()
+    if since is None:
+        return sorted(set(student_courses.values_list('student_id', flat=True)))
+
+    student_ids = set(student_courses.filter(updated_at__gte=since).values_list('student_id', flat=True))
+    held_changed = Q()
+    for course_id, teacher_id in set(
+        TaughtCourse.objects.filter(updated_at__gte=since).values_list('course_id', 'teacher_id')
+    ):
+        held_changed |= Q(course_id=course_id, teacher_id=teacher_id)
+    if held_changed:
+        student_ids.update(student_courses.filter(held_changed).values_list('student_id', flat=True))
+    return sorted(student_ids)
+
+
+def _judge(below, key, attended, held, threshold):
+    rate = attendance_percentage(attended, held)
+    if held >= getattr(settings, 'ATTENDANCE_ALERT_MIN_CLASSES', 3) and rate < threshold:
+        below.setdefault(key, {'attended': attended, 'held': held, 'rate': rate, 'threshold': threshold})
+
+
+def evaluate(student_ids):
+    """
+    The rates of `student_ids` below their thresholds, in one query:
+    (student_id, course_id, teacher_id) -> attended/held/rate/threshold, with
+    course and teacher None for the overall rate. Courses without a
+    TaughtCourse are left out, as in overall_attendance().
+    """
+    course_threshold = getattr(settings, 'ATTENDANCE_ALERT_COURSE_THRESHOLD', 75.0)
+    overall_threshold = getattr(settings, 'ATTENDANCE_ALERT_OVERALL_THRESHOLD', 75.0)
+    below, totals = {}, {}
+    for student_id, course_id, teacher_id, attended, held in (
+        StudentCourse.objects.filter(student_id__in=student_ids)
+        .order_by('id')
+        .annotate(held=classes_held())
+        .values_list('student_id', 'course_id', 'teacher_id', 'classes_attended_count', 'held')
+    ):
+        if held is None:
+            continue
+        total = totals.setdefault(student_id, [0, 0])
+        total[0] += attended
+        total[1] += held
+        _judge(below, (student_id, course_id, teacher_id), attended, held, course_threshold)
+
+    for student_id, (attended, held) in totals.items():
+        _judge(below, (student_id, None, None), attended, held, overall_threshold)
+    return below
+
+
+def sync_alerts(student_ids, below, now):
+    """
+    Make the alerts of `student_ids` match `below` (see evaluate()): raise
+    new ones, reopen resolved ones, update open ones and resolve the rest.
+    Raised and reopened alerts notify the student. Return (raised, resolved).
+    """
+    existing = {
+        (alert.student_id, alert.course_id, alert.teacher_id): alert
+        for alert in AttendanceAlert.objects.select_for_update().filter(student_id__in=student_ids)
+    }
+    to_create, to_update, raised = [], [], []
+    resolved = 0
+    for key, values in below.items():
+        alert = existing.pop(key, None)
+        if alert is None:
+            to_create.append(AttendanceAlert(
+                student_id=key[0], course_id=key[1], teacher_id=key[2], raised_at=now, updated_at=now, **values
+            ))
+            raised.append((key, values))
+            continue
+        if alert.resolved_at is not None:
+            alert.raised_at, alert.resolved_at = now, None
+            raised.append((key, values))
+        elif all(getattr(alert, field) == value for field, value in values.items()):
+            continue
+        for field, value in values.items():
+            setattr(alert, field, value)
+        alert.updated_at = now
+        to_update.append(alert)
+
+    for alert in existing.values():
+        if alert.resolved_at is None:
+            alert.resolved_at = alert.updated_at = now
+            to_update.append(alert)
+            resolved += 1
+
+    AttendanceAlert.objects.bulk_create(to_create)
+    AttendanceAlert.objects.bulk_update(
+        to_update, ['attended', 'held', 'rate', 'threshold', 'raised_at', 'updated_at', 'resolved_at']
+    )
+
+    if raised:
+        emails = dict(Student.objects.filter(pk__in={key[0] for key, _ in raised}).values_list('student_id', 'email'))
+        notify(Notification.LOW_ATTENDANCE, [
+            (emails.get(key[0]), {'course': key[1], 'rate': values['rate'], 'threshold': values['threshold']})
+            for key, values in raised
+        ])
+    return len(raised), resolved
+
+
+def detect_low_attendance(full=False, batch_size=None):
+    """
+    Evaluate the students changed since the last run (all of them when
+    `full`, or on the first run), a transaction per batch, and record the
+    run. Returns its statistics.
+    """
+    batch_size = batch_size or getattr(settings, 'ATTENDANCE_ALERT_BATCH_SIZE', 500)
+    started_at = timezone.now()
+    since = None if full else watermark()
+    student_ids = changed_students(since)
+
+    stats = {'students_evaluated': len(student_ids), 'alerts_raised': 0, 'alerts_resolved': 0}
+    for start in range(0, len(student_ids), batch_size):
+        batch = student_ids[start:start + batch_size]
+        with transaction.atomic():
+            raised, resolved = sync_alerts(batch, evaluate(batch), timezone.now())
+        stats['alerts_raised'] += raised
+        stats['alerts_resolved'] += resolved
+
+    # Recorded last: a failed run leaves the watermark where it was
+    AttendanceAlertRun.objects.create(started_at=started_at, finished_at=timezone.now(), since=since, **stats)
+    return {'since': since, **stats}
@@ -0,0 +1,92 @@
+"""
+Archival of historical attendance sessions.
+
+Stopped sessions that started before a cutoff are moved, together with
+their records, into ArchivedAttendanceSession/ArchivedAttendanceRecord in
+chunks of sessions: each chunk is copied with batched INSERTs and removed
+from the live tables in the same transaction. The live tables then only
+hold the current term, which keeps the attendance filters and the per
+session statistics fast.
+
+Archived rows keep their ids. The session and record endpoints look up
+sessions that are no longer live in the archive (see core.views). Records
+on other shards than the primary are read from there and deleted once the
+chunk has committed (see core.signals).
+"""
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AttendanceRecord, AttendanceSession, ArchivedAttendanceRecord, ArchivedAttendanceSession
+from .sharding import PRIMARY, for_sessions
+
+BATCH_SIZE = 1000
+SESSION_FIELDS = (
+    'id', 'tenant_id', 'teacher_id', 'course_id', 'section', 'year', 'status', 'qr_code_token',
+    'started_at', 'stopped_at', 'presence', 'presence_index'
+)
+RECORD_FIELDS = (
+    'id', 'session_id', 'student_id', 'rfid_scanned', 'rfid_scanned_at',
+    'qr_scanned', 'qr_scanned_at', 'is_present', 'marked_present_at'
+)
+
+
+def term_for(when):
+    """Term of a date: "<year>-S1" for January to June, "<year>-S2" for July to December"""
+    return f"{when.year}-S{1 if when.month <= 6 else 2}"
+
+
+def term_range(term):
+    """(start, end) datetimes of a term written as by term_for(); ValueError if it is not one"""
+    match = re.fullmatch(r'(\d{4})-S([12])', term or '')
+    if match is None:
+        raise ValueError('term must look like 2024-S1')
+    year, half = int(match[1]), int(match[2])
+    start = datetime(year, 1 if half == 1 else 7, 1, tzinfo=dt_timezone.utc)
+    end = datetime(year + half - 1, 7 if half == 1 else 1, 1, tzinfo=dt_timezone.utc)
+    return start, end
+
+
+def archivable_sessions(cutoff):
+    return AttendanceSession.objects.filter(status='stopped', started_at__lt=cutoff)
+
+
+def archive_sessions(cutoff, chunk_size=None):
+    """
+    Move stopped sessions started before `cutoff`, and their records, to the
+    archive. Return the number of sessions and records moved.
+    """
+    chunk_size = chunk_size or getattr(settings, 'ATTENDANCE_ARCHIVE_CHUNK_SIZE', 100)
+    moved = {'sessions': 0, 'records': 0}
+
+    while True:
+        with transaction.atomic():
+            sessions = list(
+                archivable_sessions(cutoff).select_for_update().order_by('id').values(*SESSION_FIELDS)[:chunk_size]
+            )
+            if not sessions:
+                return moved
+            session_ids = [session['id'] for session in sessions]
+            now = timezone.now()
+            ArchivedAttendanceSession.objects.bulk_create(
+                [ArchivedAttendanceSession(term=term_for(session['started_at']), archived_at=now, **session)
+                 for session in sessions],
+                batch_size=BATCH_SIZE
+            )
+
+            batch = []
+            for records in for_sessions(AttendanceRecord.objects.order_by('id').values(*RECORD_FIELDS), session_ids):
+                for record in records.iterator(chunk_size=BATCH_SIZE):
+                    batch.append(ArchivedAttendanceRecord(**record))
+                    if len(batch) >= BATCH_SIZE:
+                        moved['records'] += len(ArchivedAttendanceRecord.objects.bulk_create(batch))
+                        batch = []
+            moved['records'] += len(ArchivedAttendanceRecord.objects.bulk_create(batch))
+
+            # Other shards' records go once the session delete commits (see core.signals)
+            AttendanceRecord.objects.using(PRIMARY).filter(session_id__in=session_ids).delete()
+            AttendanceSession.objects.filter(id__in=session_ids).delete()
+            moved['sessions'] += len(session_ids)
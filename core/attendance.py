@@ -0,0 +1,323 @@
+"""
+Attendance bookkeeping shared by the API views and management commands.
+"""
+import base64
+import contextlib
+import io
+import uuid
+from collections import Counter
+
+import qrcode
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from .authentication import ROLE_STUDENT
+from .live_stats import record_state, track_scan, tracking
+from .models import (
+    AttendanceRecord, AttendanceSession, Notification, ScanEvent, StudentCourse, TaughtCourse, UpdateAttendanceRequest
+)
+from .notifications import notify
+from .sharding import PRIMARY, shard_for
+from .tasks import task
+
+
+def append_classes(existing, classes):
+    """Append to a comma separated classes_attended value"""
+    return f"{existing}, {classes}" if existing else classes
+
+
+def count_classes(classes):
+    """Number of entries in a comma separated classes value"""
+    return len(classes.split(',')) if classes else 0
+
+
+def session_label(started_at):
+    """The classes_attended entry a session adds: its start date"""
+    return started_at.strftime('%Y-%m-%d')
+
+
+def overall_attendance(student_courses, classes_taken):
+    """
+    Overall attendance percentage of one student: classes attended over
+    classes taken, summed across the student's courses.
+    - student_courses: iterable of (course_id, teacher_id, classes_attended)
+    - classes_taken: (course_id, teacher_id) -> TaughtCourse.classes_taken
+    Courses without a TaughtCourse are left out, as on the student dashboard.
+    """
+    attended = taken = 0
+    for course_id, teacher_id, classes_attended in student_courses:
+        key = (course_id, teacher_id)
+        if key in classes_taken:
+            attended += count_classes(classes_attended)
+            taken += count_classes(classes_taken[key])
+    return attendance_percentage(attended, taken)
+
+
+def taught_classes():
+    """(course_id, teacher_id) -> classes_taken, first TaughtCourse wins"""
+    classes_taken = {}
+    for course_id, teacher_id, taken in TaughtCourse.objects.order_by('id').values_list(
+        'course_id', 'teacher_id', 'classes_taken'
+    ):
+        classes_taken.setdefault((course_id, teacher_id), taken)
+    return classes_taken
+
+
+def classes_held():
+    """
+    StudentCourse annotation: classes_taken_count of the first matching
+    TaughtCourse, None if there is none
+    """
+    return Subquery(
+        TaughtCourse.objects.filter(
+            course_id=OuterRef('course_id'), teacher_id=OuterRef('teacher_id')
+        ).order_by('id').values('classes_taken_count')[:1]
+    )
+
+
+def course_attendance(student_id):
+    """
+    Per-course attendance of one student from the class counters, in one
+    query: course/teacher ids and names, `attended` and `held` (see
+    classes_held()).
+    """
+    return list(
+        StudentCourse.objects.filter(student_id=student_id)
+        .order_by('id')
+        .annotate(
+            course_name=F('course__course_name'), teacher_name=F('teacher__teacher_name'),
+            attended=F('classes_attended_count'), held=classes_held()
+        )
+        .values('course_id', 'course_name', 'teacher_id', 'teacher_name', 'attended', 'held')
+    )
+
+
+def attendance_percentage(attended, held):
+    """Percentage of held classes attended, rounded to 2 places"""
+    return round(attended / held * 100, 2) if held else 0.0
+
+
+# ============ Scans ============
+
+def record_events(events):
+    """Append ScanEvents to the log (on their sessions' shards) in batched INSERTs; returns them with their ids"""
+    batch_size = getattr(settings, 'SCAN_EVENT_BATCH_SIZE', 500)
+    return ScanEvent.objects.bulk_create(events, batch_size=batch_size)
+
+
+def apply_scan(record, kind, at):
+    """
+    Apply one RFID or QR scan to an AttendanceRecord (saved or not).
+    Return True when it leaves the student marked present, which means the
+    session is credited to the student's StudentCourse. Shared by the scan
+    views and the event replay so both follow the same rules.
+    """
+    if kind == ScanEvent.RFID:
+        record.rfid_scanned = True
+        record.rfid_scanned_at = at
+    else:
+        record.qr_scanned = True
+        record.qr_scanned_at = at
+
+    if record.rfid_scanned and record.qr_scanned:
+        record.is_present = True
+        record.marked_present_at = at
+        return True
+    return False
+
+
+def credit_session(student_id, course_id, teacher_id, label):
+    """Credit a session to the student's StudentCourse after a scan marked them present"""
+    student_course, _ = StudentCourse.objects.get_or_create(
+        student_id=student_id, course_id=course_id, teacher_id=teacher_id
+    )
+    student_course.classes_attended = append_classes(student_course.classes_attended, label)
+    student_course.save()
+
+
+def register_scan(session, student, kind):
+    """
+    Record an RFID or QR scan of `student` in `session`: update the
+    attendance record and append the scan to the event log in one
+    transaction on the session's shard. Once both scans are in, the
+    StudentCourse is credited and the student's notification queued in the
+    outbox on the primary, committed together with the scan.
+    """
+    now = timezone.now()
+    shard = shard_for(session.id)
+    # The credit is written on the primary: commit it right after the shard
+    primary = transaction.atomic() if shard != PRIMARY else contextlib.nullcontext()
+    with primary, transaction.atomic(using=shard), tracking():
+        record, created = AttendanceRecord.objects.get_or_create(session=session, student=student)
+        before = record_state(None if created else record)
+        present = apply_scan(record, kind, now)
+        record.save()
+        record_events([ScanEvent(
+            kind=kind, occurred_at=now, student=student, session=session,
+            course_id=session.course_id, teacher_id=session.teacher_id
+        )])
+        if present:
+            label = session_label(session.started_at)
+            credit_session(student.student_id, session.course_id, session.teacher_id, label)
+            notify(Notification.PRESENT, [(student.email, {'course': session.course_id, 'date': label})])
+        track_scan(session.id, before, record_state(record))
+    return record
+
+
+# ============ Session QR codes ============
+
+@task('attendance.render_qr_code')
+def render_qr_code(token):
+    """
+    The QR code of a session token as a PNG data URI, stored on the session
+    so every worker serves it from there
+    """
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(token)
+    qr.make(fit=True)
+    buffer = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    data_uri = f'data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}'
+    AttendanceSession.objects.filter(qr_code_token=token).update(qr_code_image=data_uri)
+    return data_uri
+
+
+def session_qr_code(session):
+    """The stored QR code of a session, rendered now if its task has not run yet"""
+    return session.qr_code_image or render_qr_code(session.qr_code_token)
+
+
+# ============ Pending request counter ============
+
+def _pending_count_key(tenant_id):
+    return f'update-requests:pending-count:{tenant_id}'
+
+
+def get_pending_request_count(tenant_id):
+    """
+    Number of pending update attendance requests of a tenant's students,
+    served from a cached counter. A missing counter is seeded with one
+    COUNT(*); its timeout bounds drift from writes that bypass
+    adjust_pending_request_count().
+    """
+    key = _pending_count_key(tenant_id)
+    count = cache.get(key)
+    if count is None:
+        count = UpdateAttendanceRequest.objects.filter(status='pending', student__tenant_id=tenant_id).count()
+        timeout = getattr(settings, 'PENDING_COUNT_CACHE_TIMEOUT', 10 * 60)
+        if not cache.add(key, count, timeout):
+            count = cache.get(key, count)
+    return count
+
+
+def adjust_pending_request_count(delta, tenant_id):
+    """Apply `delta` to a tenant's cached counter once the transaction commits"""
+    def apply():
+        try:
+            cache.incr(_pending_count_key(tenant_id), delta)
+        except ValueError:
+            pass  # not seeded yet; the next read counts from the database
+    transaction.on_commit(apply)
+
+
+# ============ Update attendance requests ============
+
+def _apply_to_student_courses(rows):
+    """
+    Append each approved request's classes to its StudentCourse, creating
+    missing ones. `rows` are request values in processing order.
+    """
+    additions = {}
+    for row in rows:
+        key = (row['student_id'], row['course_id'], row['teacher_id'])
+        additions.setdefault(key, []).append(row['classes_to_add'])
+
+    existing = {}
+    candidates = (
+        StudentCourse.objects.select_for_update()
+        .filter(
+            student_id__in={key[0] for key in additions},
+            course_id__in={key[1] for key in additions},
+            teacher_id__in={key[2] for key in additions},
+        )
+        .order_by('id')
+    )
+    for student_course in candidates:
+        key = (student_course.student_id, student_course.course_id, student_course.teacher_id)
+        if key in additions:
+            existing.setdefault(key, student_course)
+
+    now = timezone.now()
+    to_update, to_create = [], []
+    for key, classes in additions.items():
+        joined = ', '.join(classes)
+        if key in existing:
+            student_course = existing[key]
+            student_course.classes_attended = append_classes(student_course.classes_attended, joined)
+            student_course.classes_attended_count = count_classes(student_course.classes_attended)
+            student_course.updated_at = now  # bulk_update skips auto_now
+            to_update.append(student_course)
+        else:
+            to_create.append(StudentCourse(
+                student_id=key[0], course_id=key[1], teacher_id=key[2],
+                classes_attended=joined, classes_attended_count=count_classes(joined)
+            ))
+    StudentCourse.objects.bulk_update(to_update, ['classes_attended', 'classes_attended_count', 'updated_at'])
+    StudentCourse.objects.bulk_create(to_create)
+
+    # Bulk writes send no signals; local import, dashboards builds on this module
+    from .dashboards import bump_dashboards
+    bump_dashboards(ROLE_STUDENT, {key[0] for key in additions})
+
+
+def process_attendance_requests(queryset, approve, management_id):
+    """
+    Approve or reject the pending requests in `queryset` with set-based
+    queries in one transaction, and return the ids that were processed.
+
+    Requests are claimed with a single conditional UPDATE, so a request in
+    two overlapping batches (or a batch and a single approval) is processed
+    exactly once: whichever transaction flips it from pending wins.
+    """
+    new_status = 'approved' if approve else 'rejected'
+    now = timezone.now()
+    claim_token = uuid.uuid4()
+    candidate_ids = list(queryset.filter(status='pending').order_by().values_list('id', flat=True))
+    if not candidate_ids:
+        return []
+
+    with transaction.atomic():
+        UpdateAttendanceRequest.objects.filter(id__in=candidate_ids, status='pending').update(
+            status=new_status, processed_at=now, processed_by_id=management_id, claim_token=claim_token
+        )
+        # Only rows stamped with this batch's token belong to it
+        rows = list(
+            UpdateAttendanceRequest.objects.filter(id__in=candidate_ids, claim_token=claim_token)
+            .order_by('requested_at', 'id')
+            .values(
+                'id', 'student_id', 'course_id', 'teacher_id', 'classes_to_add', 'teacher__email', 'student__tenant_id'
+            )
+        )
+        if approve and rows:
+            _apply_to_student_courses(rows)
+            record_events([
+                ScanEvent(
+                    kind=ScanEvent.ADJUSTMENT, occurred_at=now, student_id=row['student_id'],
+                    course_id=row['course_id'], teacher_id=row['teacher_id'], classes=row['classes_to_add']
+                )
+                for row in rows
+            ])
+        if rows:
+            for tenant_id, processed in Counter(row['student__tenant_id'] for row in rows).items():
+                adjust_pending_request_count(-processed, tenant_id)
+            notify(
+                Notification.REQUEST_APPROVED if approve else Notification.REQUEST_REJECTED,
+                [(row['teacher__email'], {
+                    'student': row['student_id'], 'course': row['course_id'], 'classes': row['classes_to_add']
+                }) for row in rows]
+            )
+
+    return [row['id'] for row in rows]
@@ -0,0 +1,228 @@
+"""
+Stateless JWT authentication for the attendance API.
+
+Access tokens issued by the login views carry the user's role
+(student/teacher/management), profile id and campus (tenant), so
+authenticated requests are served from the token alone instead of loading
+the User row every time.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .tenancy import activate
+
+
+ROLE_STUDENT = 'student'
+ROLE_TEACHER = 'teacher'
+ROLE_MANAGEMENT = 'management'
+
+ROLE_CLAIM = 'role'
+PROFILE_CLAIM = 'profile_id'
+TENANT_CLAIM = 'tenant'
+AUTH_TIME_CLAIM = 'auth_time'
+
+
+PROFILE_RELATIONS = {
+    ROLE_STUDENT: 'student_profile',
+    ROLE_TEACHER: 'teacher_profile',
+    ROLE_MANAGEMENT: 'management_profile',
+}
+
+
+def _role_models():
+    from .models import Student, Teacher, Management
+    return {
+        ROLE_STUDENT: Student,
+        ROLE_TEACHER: Teacher,
+        ROLE_MANAGEMENT: Management,
+    }
+
+
+class RoleTokenUser(TokenUser):
+    """
+    Lightweight user backed by a validated access token.
+    Exposes the role and profile id claims without touching the database.
+    """
+
+    @cached_property
+    def role(self):
+        return self.token.get(ROLE_CLAIM)
+
+    @cached_property
+    def profile_id(self):
+        return self.token.get(PROFILE_CLAIM)
+
+    @cached_property
+    def tenant_id(self):
+        return self.token.get(TENANT_CLAIM)
+
+
+def tokens_for_profile(user, role, profile_id, tenant_id=None):
+    """Issue a refresh/access token pair carrying the role (and tenant) claims"""
+    refresh = RefreshToken.for_user(user)
+    refresh[ROLE_CLAIM] = role
+    refresh[PROFILE_CLAIM] = profile_id
+    if tenant_id is not None:
+        refresh[TENANT_CLAIM] = tenant_id
+    refresh[AUTH_TIME_CLAIM] = time.time()
+    return refresh
+
+
+def get_profile_id(user, role):
+    """
+    Return the profile id of `user` for `role`, or None if the user does not
+    have that role. Token users answer from their claims; regular User
+    instances (session auth, force_authenticate) fall back to one query per
+    role, memoised on the user object.
+    """
+    if user is None or not user.is_authenticated:
+        return None
+
+    if isinstance(user, RoleTokenUser) and user.role is not None:
+        return user.profile_id if user.role == role else None
+
+    resolved = user.__dict__.setdefault('_role_profiles', {})
+    if role not in resolved:
+        model = _role_models()[role]
+        resolved[role] = (
+            model.objects.filter(user_id=user.pk)
+            .values_list('pk', flat=True)
+            .first()
+        )
+    return resolved[role]
+
+
+# ============ Login pipeline ============
+
+class LoginFailed(Exception):
+    """Raised by resolve_login with the message and HTTP status to report"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def resolve_login(email, password, role=None):
+    """
+    Check the credentials and return (user, role, profile).
+    The user and all of its profiles are loaded in a single joined query.
+    Without `role`, the first profile the user has is used.
+    """
+    user = (
+        User.objects.select_related(*PROFILE_RELATIONS.values())
+        .filter(username=email)
+        .first()
+    )
+    if user is None:
+        # Hash anyway so unknown emails take as long as wrong passwords
+        User().set_password(password)
+        raise LoginFailed('Invalid email or password', 401)
+    if not user.check_password(password) or not user.is_active:
+        raise LoginFailed('Invalid email or password', 401)
+
+    for candidate in ([role] if role else PROFILE_RELATIONS):
+        profile = getattr(user, PROFILE_RELATIONS[candidate], None)
+        if profile is not None:
+            return user, candidate, profile
+
+    if role:
+        raise LoginFailed(f'{role.capitalize()} profile not found for this user', 404)
+    raise LoginFailed('No profile found for this user', 404)
+
+
+# ============ Token revocation ============
+
+REVOCATIONS_LOADED_KEY = 'jwt-revoked:loaded'
+
+
+def _revocation_key(user_id):
+    return f'jwt-revoked:{user_id}'
+
+
+def _revocation_lifetime():
+    # Access tokens minted from a refresh token keep its auth_time, so a
+    # revocation covers every token until the refresh tokens issued before it expire
+    return max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME).total_seconds()
+
+
+def revoke_user_tokens(user_id):
+    """
+    Invalidate every token issued to the user before now. The revocation is
+    stored in the database and mirrored in the cache, which the checks read.
+    """
+    from .models import TokenRevocation
+    revoked_at = time.time()
+    TokenRevocation.objects.update_or_create(user_id=user_id, defaults={'revoked_at': revoked_at})
+    cache.set(_revocation_key(user_id), revoked_at, timeout=int(_revocation_lifetime()) + 1)
+
+
+def _load_revocations():
+    """Mirror the revocations still covering unexpired tokens into a cold cache"""
+    from .models import TokenRevocation
+    now = time.time()
+    lifetime = _revocation_lifetime()
+    revocations = TokenRevocation.objects.filter(revoked_at__gt=now - lifetime).values_list('user_id', 'revoked_at')
+    for user_id, revoked_at in revocations:
+        cache.set(_revocation_key(user_id), revoked_at, timeout=int(revoked_at + lifetime - now) + 1)
+    cache.set(REVOCATIONS_LOADED_KEY, True, timeout=None)
+
+
+def is_token_revoked(validated_token):
+    if not getattr(settings, 'JWT_REVOCATION_CHECK', True):
+        return False
+    key = _revocation_key(validated_token[api_settings.USER_ID_CLAIM])
+    found = cache.get_many([REVOCATIONS_LOADED_KEY, key])
+    if REVOCATIONS_LOADED_KEY not in found:
+        # Restarted or flushed cache: one query brings the revocations back
+        _load_revocations()
+        found[key] = cache.get(key)
+    revoked_at = found.get(key)
+    if revoked_at is None:
+        return False
+    issued_at = validated_token.get(AUTH_TIME_CLAIM, validated_token.get('iat', 0))
+    return issued_at < revoked_at
+
+
+def check_revocation_cache():
+    """
+    Revocations are checked against the default cache, so with several
+    workers it must be shared by them: refuse to start on a process-local
+    one unless ALLOW_PROCESS_LOCAL_CACHE says there is a single worker.
+    """
+    from .caching import cache_is_shared
+    if getattr(settings, 'JWT_REVOCATION_CHECK', True) and not cache_is_shared():
+        raise ImproperlyConfigured(
+            'Token revocation needs a cache shared by all workers: set REDIS_URL, or '
+            'ALLOW_PROCESS_LOCAL_CACHE=True for a single-process deployment'
+        )
+
+
+class RoleJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that builds a RoleTokenUser from the token claims
+    instead of loading the User row, honouring logout/deactivation through
+    the revocation cache. The token's tenant becomes the current one.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None and result[1].get(TENANT_CLAIM) is not None:
+            activate(result[1][TENANT_CLAIM])
+        return result
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if is_token_revoked(validated_token):
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+        return user
@@ -0,0 +1,179 @@
+"""
+Response caching for read-mostly reference data endpoints.
+
+Each cached viewset lists the models its responses depend on. Every such
+model has a version stamp in the cache that is bumped by save/delete
+signals, and the stamps are part of the response cache key, so a write
+makes all dependent entries unreachable without having to find them.
+
+Cached entries hold the rendered body and its ETag, so a repeat fetch is
+answered with the stored bytes, or 304 Not Modified, without touching the
+ORM or the serializers. Queryset.update() bypasses signals; call
+bump_model_version() after such bulk writes.
+
+Version stamps are only bumped in the cache of the writing process, so
+responses are only cached when that cache is shared by every worker
+(cache_is_shared(), see CACHES in settings); on a process-local cache of a
+multi-worker deployment they are always rendered afresh.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+from .tenancy import get_current_tenant
+
+
+PROCESS_LOCAL_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+def cache_is_shared():
+    """
+    Whether every worker sees the same default cache: a process-local
+    backend only counts as shared when ALLOW_PROCESS_LOCAL_CACHE declares a
+    single-process deployment.
+    """
+    if getattr(settings, 'ALLOW_PROCESS_LOCAL_CACHE', False):
+        return True
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def _version_key(model):
+    return f'respver:{model._meta.label_lower}'
+
+
+def get_model_versions(models):
+    """Return the current version stamp of each model"""
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Seed from the clock so an evicted stamp never repeats an old one
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_model_version(model):
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def _object_version_key(scope, pk):
+    return f'objver:{scope}:{pk}'
+
+
+def get_object_version(scope, pk):
+    """Version stamp of one object, e.g. a user's dashboard, within `scope`"""
+    key = _object_version_key(scope, pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_object_versions(scope, pks):
+    """Bump the version stamps of `pks` once the current transaction commits"""
+    keys = {_object_version_key(scope, pk) for pk in pks}
+
+    def bump():
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                pass  # never read, so nothing is cached under it
+    if keys:
+        transaction.on_commit(bump)
+
+
+def _bump_sender_version(sender, using=None, **kwargs):
+    # A reader between the write and the commit would cache the old rows under a new stamp
+    transaction.on_commit(lambda: bump_model_version(sender), using=using)
+
+
+def watch_models(*models):
+    """Bump the version stamp of `models` once a row save or delete commits"""
+    for model in models:
+        post_save.connect(_bump_sender_version, sender=model, dispatch_uid=f'respver-save-{model._meta.label_lower}')
+        post_delete.connect(_bump_sender_version, sender=model, dispatch_uid=f'respver-delete-{model._meta.label_lower}')
+
+
+def etag_matches(request, etag):
+    """True if `etag` is listed in the request's If-None-Match"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags
+
+
+def not_modified(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    return response
+
+
+class CachedResponseMixin:
+    """
+    ViewSet mixin caching rendered list/retrieve responses.
+    Set `cache_models` to every model the serialized output reads from.
+    """
+    cache_models = ()
+    cached_actions = ('list', 'retrieve')
+    cacheable_formats = ('json',)
+
+    def _response_cache_key(self, request):
+        if self.action not in self.cached_actions or not cache_is_shared():
+            return None
+        if request.accepted_renderer.format not in self.cacheable_formats:
+            return None
+        versions = '.'.join(str(v) for v in get_model_versions(self.cache_models))
+        raw = f'{get_current_tenant()}|{request.get_full_path()}|{request.accepted_renderer.format}|{versions}'
+        return f'resp:{self.basename}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+    def _cached_response(self, request, handler, *args, **kwargs):
+        key = self._response_cache_key(request)
+        if key is not None:
+            entry = cache.get(key)
+            if entry is not None:
+                etag, content_type, content = entry
+                if etag_matches(request, etag):
+                    return not_modified(etag)
+                response = HttpResponse(content, content_type=content_type)
+                response['ETag'] = etag
+                return response
+
+        response = handler(request, *args, **kwargs)
+        response.response_cache_key = key
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(request, super().retrieve, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(response, 'response_cache_key', None)
+        if key is None or response.status_code != 200:
+            return response
+
+        if hasattr(response, 'render'):
+            response.render()
+        etag = f'"{hashlib.md5(response.content).hexdigest()}"'
+        response['ETag'] = etag
+        timeout = getattr(settings, 'API_RESPONSE_CACHE_TIMEOUT', 60 * 60)
+        cache.set(key, (etag, response['Content-Type'], response.content), timeout)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        return response
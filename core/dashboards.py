@@ -0,0 +1,100 @@
+"""
+Cached per-user dashboard models for the template dashboards.
+
+A dashboard's data is assembled with a fixed number of queries and cached
+under a version built from what it reads: a per-profile stamp, bumped when
+that user's own rows change (their StudentCourse rows on a scan or an
+approval, their profile), and the reference data stamps of core.caching.
+The templates cache their rendered fragments under the same version, so an
+unchanged dashboard costs the version lookup and one fragment read.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from . import attendance
+from .authentication import ROLE_MANAGEMENT, ROLE_STUDENT, ROLE_TEACHER
+from .caching import bump_object_versions, get_model_versions, get_object_version
+from .models import Course, Management, Student, TaughtCourse, Teacher
+
+# Reference data each dashboard reads, besides the user's own rows
+DASHBOARD_MODELS = {
+    ROLE_STUDENT: (Course, Teacher, TaughtCourse),
+    ROLE_TEACHER: (Course, Teacher, TaughtCourse),
+    ROLE_MANAGEMENT: (),
+}
+
+
+def bump_dashboards(role, profile_ids):
+    """Invalidate the dashboards of `profile_ids` once the transaction commits"""
+    bump_object_versions(f'dashboard-{role}', profile_ids)
+
+
+def dashboard_version(role, profile_id):
+    """Version string of a user's dashboard, part of every key it is cached under"""
+    versions = [get_object_version(f'dashboard-{role}', profile_id)] + get_model_versions(DASHBOARD_MODELS[role])
+    return '.'.join(str(v) for v in versions)
+
+
+def get_dashboard(role, profile_id, version):
+    """The dashboard data of a profile, from the cache or built and cached"""
+    key = f'dashboard:{role}:{profile_id}:{version}'
+    data = cache.get(key)
+    if data is None:
+        data = DASHBOARD_BUILDERS[role](profile_id)
+        cache.set(key, data, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 10 * 60))
+    return data
+
+
+# ============ Builders ============
+
+def build_student_dashboard(student_id):
+    student = Student.objects.values('student_id', 'student_name', 'overall_attendance').get(pk=student_id)
+    course_attendance = []
+    for course in attendance.course_attendance(student_id):
+        held = course['held'] or 0
+        attendance_percentage = course['attended'] / held * 100 if held > 0 else 0
+        course_attendance.append({
+            'course_name': course['course_name'],
+            'teacher_name': course['teacher_name'],
+            'attendance': round(attendance_percentage, 1)
+        })
+
+    return {
+        'student_name': student['student_name'],
+        'student_id': student['student_id'],
+        'overall_attendance': round(student['overall_attendance'], 1),
+        'total_courses': len(course_attendance),
+        'course_attendance': course_attendance,
+    }
+
+
+def build_teacher_dashboard(teacher_id):
+    teacher = Teacher.objects.values('teacher_id', 'teacher_name', 'email').get(pk=teacher_id)
+    courses = [
+        {'course_name': course_name, 'classes_taken': classes_taken if classes_taken else 'None'}
+        for course_name, classes_taken in TaughtCourse.objects.filter(teacher_id=teacher_id)
+        .order_by('id').values_list('course__course_name', 'classes_taken')
+    ]
+    return {
+        'teacher_name': teacher['teacher_name'],
+        'teacher_id': teacher['teacher_id'],
+        'email': teacher['email'],
+        'total_courses': len(courses),
+        'courses': courses,
+    }
+
+
+def build_management_dashboard(management_id):
+    management = Management.objects.values('Management_id', 'Management_name', 'email').get(pk=management_id)
+    return {
+        'management_name': management['Management_name'],
+        'management_id': management['Management_id'],
+        'email': management['email'],
+    }
+
+
+DASHBOARD_BUILDERS = {
+    ROLE_STUDENT: build_student_dashboard,
+    ROLE_TEACHER: build_teacher_dashboard,
+    ROLE_MANAGEMENT: build_management_dashboard,
+}
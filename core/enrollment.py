@@ -0,0 +1,141 @@
+"""
+Course enrollment index.
+
+Enrollment rows say which students take a course in a section and year
+during a term. load_enrollments() replaces a term's enrollment of the
+courses it is given, typically once per term from the registrar's export
+(`manage.py load_enrollments`). A course with nothing loaded for a term
+falls back to the students of the section and year on its campus, which
+is who could attend before enrollments existed.
+
+Scan eligibility, session rosters and the roster side of reports and
+analytics all go through course_roster(). Rosters are kept as sets in a
+dict in each worker process, one entry per course and term, so a lookup
+costs one cache read of the rosters' version stamp and a set membership
+test. Loading enrollments and saving or deleting a Student or an
+Enrollment bump the stamp, which makes every worker reload the rosters on
+their next use. Queryset.update() of those models bypasses the signals;
+call invalidate_rosters() after such bulk writes.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .archive import term_for, term_range
+from .models import Course, Enrollment, Student
+
+VERSION_KEY = 'enrollment-rosters'
+
+_rosters = {}
+_lock = threading.Lock()
+
+
+# ============ Roster cache ============
+
+def rosters_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted stamp never repeats an old one
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        pass  # never read, so no roster is cached under it
+
+
+def invalidate_rosters():
+    """
+    Make every worker reload its rosters, now and again once the current
+    transaction commits: a roster read in between saw the old rows.
+    """
+    _bump_version()
+    transaction.on_commit(_bump_version)
+
+
+def _cached(key, version, load):
+    entry = _rosters.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    value = load()
+    with _lock:
+        if len(_rosters) >= getattr(settings, 'ENROLLMENT_CACHE_SIZE', 1000):
+            _rosters.clear()
+        _rosters[key] = (version, value)
+    return value
+
+
+def _load_course(course_id, term):
+    """(section, year) -> frozenset of student ids enrolled in the course in `term`; empty if none is loaded"""
+    sections = {}
+    for section, year, student_id in (
+        Enrollment.objects.filter(term=term, course_id=course_id).order_by().values_list('section', 'year', 'student_id')
+    ):
+        sections.setdefault((section, year), set()).add(student_id)
+    return {key: frozenset(student_ids) for key, student_ids in sections.items()}
+
+
+def _load_section(course_id, section, year):
+    """Students of a section and year on the course's campus"""
+    return frozenset(
+        Student.objects.filter(
+            section=section, year=year, tenant__in=Course.objects.filter(pk=course_id).values('tenant')
+        ).order_by().values_list('student_id', flat=True)
+    )
+
+
+# ============ Lookups ============
+
+def course_roster(course_id, section, year, term):
+    """Ids of the students of a course's section and year in `term`, as a frozenset"""
+    version = rosters_version()
+    sections = _cached(('course', course_id, term), version, lambda: _load_course(course_id, term))
+    if not sections:
+        return _cached(('section', course_id, section, year), version, lambda: _load_section(course_id, section, year))
+    return sections.get((section, year), frozenset())
+
+
+def session_roster(session):
+    """Students expected at a (live or archived) session"""
+    return course_roster(session.course_id, session.section, session.year, term_for(session.started_at))
+
+
+def is_enrolled(session, student):
+    return student.student_id in session_roster(session)
+
+
+def reset_rosters():
+    """Drop this process's rosters"""
+    with _lock:
+        _rosters.clear()
+
+
+# ============ Loading ============
+
+def load_enrollments(term, rows, batch_size=1000):
+    """
+    Replace the `term` enrollment of every course in `rows`, an iterable of
+    (course_id, student_id, section, year), in one transaction. A student
+    listed twice for a course keeps the last row. Raises ValueError for a
+    malformed term. Returns the number of courses and enrollments loaded.
+    """
+    term_range(term)
+    enrollments = {}
+    for course_id, student_id, section, year in rows:
+        enrollments[(course_id, student_id)] = Enrollment(
+            course_id=course_id, student_id=student_id, section=section, year=year, term=term
+        )
+    course_ids = {course_id for course_id, _ in enrollments}
+
+    with transaction.atomic():
+        Enrollment.objects.filter(term=term, course_id__in=course_ids).delete()
+        Enrollment.objects.bulk_create(enrollments.values(), batch_size=batch_size)
+        invalidate_rosters()
+    return {'courses': len(course_ids), 'enrollments': len(enrollments)}
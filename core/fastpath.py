@@ -0,0 +1,189 @@
+"""
+values_list() based fast path for list endpoints.
+
+A ValuesSerializer describes the same output as a ModelSerializer, but reads
+plain tuples from a single values_list() query (joined names included) and
+builds the dicts directly, skipping model instantiation and the DRF field
+machinery. The rendered bytes match what the ModelSerializer produces for
+the same rows.
+"""
+from django.conf import settings
+from django.db.models import F
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .models import AttendanceSession, Student
+from .sharding import scatter
+
+
+class ValuesSerializer:
+    """
+    Row serializer for values_list() querysets.
+    - fields: output keys, in serializer order
+    - annotations: key -> expression for joined columns
+    - datetime_fields: keys rendered like serializers.DateTimeField
+    - skip_if_null: keys omitted when null, as DRF does for dotted sources
+      through a null relation
+    """
+    fields = ()
+    annotations = {}
+    datetime_fields = ()
+    skip_if_null = ()
+
+    def __init__(self):
+        self.columns = tuple(self.fields) + tuple(k for k in self.annotations if k not in self.fields)
+        self._datetime = serializers.DateTimeField().to_representation
+
+    def to_representation(self, row):
+        for key in self.datetime_fields:
+            if row[key] is not None:
+                row[key] = self._datetime(row[key])
+        for key in self.skip_if_null:
+            if row[key] is None:
+                del row[key]
+        return row
+
+    def serialize(self, queryset):
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        columns = self.columns
+        to_representation = self.to_representation
+        return [
+            to_representation(dict(zip(columns, values)))
+            for values in queryset.values_list(*columns)
+        ]
+
+
+class FastListMixin:
+    """
+    ViewSet mixin answering JSON list requests through `values_serializer_class`.
+    Other formats (e.g. the browsable API) keep the regular serializer, and
+    FAST_LIST_ENDPOINTS = False turns the fast path off.
+    """
+    values_serializer_class = None
+
+    def use_values_serializer(self, request):
+        return (
+            self.values_serializer_class is not None
+            and getattr(settings, 'FAST_LIST_ENDPOINTS', True)
+            and request.accepted_renderer.format == 'json'
+            and self.paginator is None
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_values_serializer(request):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        data = self.values_serializer_class().serialize(queryset)
+        return Response(data)
+
+
+# ============ Values serializers ============
+
+class StudentValuesSerializer(ValuesSerializer):
+    fields = ('student_id', 'student_name', 'email', 'rfid', 'overall_attendance', 'year', 'dept', 'section')
+
+
+class TaughtCourseValuesSerializer(ValuesSerializer):
+    fields = ('id', 'course', 'teacher', 'course_name', 'teacher_name', 'classes_taken', 'section', 'year')
+    annotations = {
+        'course_name': F('course__course_name'),
+        'teacher_name': F('teacher__teacher_name'),
+    }
+
+
+class StudentCourseValuesSerializer(ValuesSerializer):
+    fields = ('id', 'student', 'course', 'teacher', 'student_name', 'course_name', 'teacher_name', 'classes_attended')
+    annotations = {
+        'student_name': F('student__student_name'),
+        'course_name': F('course__course_name'),
+        'teacher_name': F('teacher__teacher_name'),
+    }
+
+
+class UpdateAttendanceRequestValuesSerializer(ValuesSerializer):
+    fields = (
+        'id', 'teacher', 'student', 'course', 'classes_to_add', 'reason',
+        'status', 'requested_at', 'processed_at', 'processed_by',
+        'teacher_name', 'student_name', 'course_name', 'processed_by_name'
+    )
+    annotations = {
+        'teacher_name': F('teacher__teacher_name'),
+        'student_name': F('student__student_name'),
+        'course_name': F('course__course_name'),
+        'processed_by_name': F('processed_by__Management_name'),
+    }
+    datetime_fields = ('requested_at', 'processed_at')
+    skip_if_null = ('processed_by_name',)
+
+
+class AttendanceSessionValuesSerializer(ValuesSerializer):
+    fields = (
+        'id', 'teacher', 'course', 'section', 'year', 'status',
+        'qr_code_token', 'started_at', 'stopped_at',
+        'teacher_name', 'course_name'
+    )
+    annotations = {
+        'teacher_name': F('teacher__teacher_name'),
+        'course_name': F('course__course_name'),
+    }
+    datetime_fields = ('started_at', 'stopped_at')
+
+
+class AttendanceRecordValuesSerializer(ValuesSerializer):
+    fields = (
+        'id', 'session', 'student', 'rfid_scanned', 'rfid_scanned_at',
+        'qr_scanned', 'qr_scanned_at', 'is_present', 'marked_present_at',
+        'student_name'
+    )
+    annotations = {
+        'student_name': F('student__student_name'),
+        'session_course': F('session__course__course_name'),
+        'session_teacher': F('session__teacher__teacher_name'),
+        'session_section': F('session__section'),
+        'session_year': F('session__year'),
+    }
+    datetime_fields = ('rfid_scanned_at', 'qr_scanned_at', 'marked_present_at')
+
+    def to_representation(self, row):
+        row = super().to_representation(row)
+        row['session_details'] = {
+            'course': row.pop('session_course'),
+            'teacher': row.pop('session_teacher'),
+            'section': row.pop('session_section'),
+            'year': row.pop('session_year'),
+        }
+        return row
+
+    def serialize_sharded(self, queryset, tenant_id=None):
+        """
+        serialize() for records gathered from the shards (see core.sharding):
+        shard rows cannot join the primary, so the joined columns are looked up
+        there afterwards, one query per table. Records of sessions outside
+        `tenant_id` are dropped.
+        """
+        own = tuple(key for key in self.fields if key not in self.annotations)
+        rows = [dict(zip(own, values)) for values in scatter(queryset.values_list(*own))]
+        sessions = {
+            session.pop('id'): (session.pop('tenant_id'), session)
+            for session in AttendanceSession.objects.filter(id__in={row['session'] for row in rows}).values(
+                'id', 'tenant_id', session_course=F('course__course_name'), session_teacher=F('teacher__teacher_name'),
+                session_section=F('section'), session_year=F('year')
+            )
+        }
+        names = dict(
+            Student.objects.filter(student_id__in={row['student'] for row in rows}).values_list('student_id', 'student_name')
+        )
+        data = []
+        for row in rows:
+            # Records of a session deleted on the primary until its shard catches up
+            if row['session'] not in sessions:
+                continue
+            session_tenant_id, joined = sessions[row['session']]
+            if tenant_id is not None and session_tenant_id != tenant_id:
+                continue
+            row['student_name'] = names.get(row['student'])
+            row.update(joined)
+            data.append(self.to_representation(row))
+        return data
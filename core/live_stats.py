@@ -0,0 +1,261 @@
+"""
+Live attendance counters of active sessions.
+
+Each active session has four counters: records scanned, present, RFID only
+and QR only. The scan path adjusts them once its transaction commits, by the
+difference the scan made to the student's record, so reading the counts of
+a running session needs no aggregation.
+
+Counters live in a backend chosen by LIVE_SESSION_STATS_BACKEND:
+- CacheLiveStats (default) keeps them in the Django cache, which every
+  worker shares when REDIS_URL is set. Entries expire after
+  LIVE_SESSION_STATS_TIMEOUT, which bounds the drift from writes that
+  bypass the scan path. Counters in a process-local cache would miss the
+  scans of other workers, so without a shared cache (see
+  core.caching.cache_is_shared) every read counts from the database.
+- LocalLiveStats keeps them in a dict in the process. It starts empty, so
+  each worker recounts a session from the database on its first read, and
+  it only sees the scans of its own process: use it with a single worker
+  or in tests.
+
+A read that misses a session's counters recounts it from the database and
+seeds them. A scan committing between that count and the seed finds no
+counters to adjust, so the session is counted again once seeded and the
+counters are dropped if the count moved. Any other save of a session or record drops them (see
+core.signals), as do record deletes through the API and bulk writes that
+call reset_live_stats().
+"""
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils.module_loading import import_string
+
+from .caching import cache_is_shared
+from .models import AttendanceRecord
+from .sharding import for_sessions, shard_for
+
+LIVE_STATS_FIELDS = ('scanned', 'present', 'rfid_only', 'qr_only')
+
+
+# ============ Counting from the database ============
+
+def _record_counts(relation=None):
+    """Aggregates of the live counters over records, or over `relation` to them"""
+    counted = relation or 'pk'
+    prefix = f'{relation}__' if relation else ''
+    return {
+        'scanned': Count(counted),
+        'present': Count(counted, filter=Q(**{f'{prefix}is_present': True})),
+        'rfid_only': Count(counted, filter=Q(**{f'{prefix}rfid_scanned': True, f'{prefix}qr_scanned': False})),
+        'qr_only': Count(counted, filter=Q(**{f'{prefix}rfid_scanned': False, f'{prefix}qr_scanned': True})),
+    }
+
+
+def session_stats_annotations():
+    """AttendanceSession annotations computing the live counters, in one grouped query"""
+    return _record_counts('attendance_records')
+
+
+def count_sessions_stats(session_ids):
+    """
+    session id -> live counters of the sessions with records, counted on
+    their shards with one grouped query per shard
+    """
+    stats = {}
+    for records in for_sessions(AttendanceRecord.objects.order_by(), session_ids):
+        for row in records.values('session_id').annotate(**_record_counts()):
+            stats[row.pop('session_id')] = row
+    return stats
+
+
+def count_session_stats(records):
+    """The live counters of a queryset of (live or archived) records, in one query"""
+    return records.order_by().aggregate(**_record_counts())
+
+
+def record_state(record):
+    """The live counters a record contributes to, as a dict of 0/1"""
+    if record is None:
+        return dict.fromkeys(LIVE_STATS_FIELDS, 0)
+    return {
+        'scanned': 1,
+        'present': int(record.is_present),
+        'rfid_only': int(record.rfid_scanned and not record.qr_scanned),
+        'qr_only': int(record.qr_scanned and not record.rfid_scanned),
+    }
+
+
+# ============ Backends ============
+
+class CacheLiveStats:
+    """Counters in the Django cache, one key per session and field"""
+
+    def __init__(self):
+        self.timeout = getattr(settings, 'LIVE_SESSION_STATS_TIMEOUT', 5 * 60)
+
+    def available(self):
+        return cache_is_shared()
+
+    def _key(self, session_id, field):
+        return f'live-session:{session_id}:{field}'
+
+    def get_many(self, session_ids):
+        keys = {self._key(session_id, field): (session_id, field) for session_id in session_ids for field in LIVE_STATS_FIELDS}
+        found = {}
+        for key, value in cache.get_many(keys).items():
+            session_id, field = keys[key]
+            found.setdefault(session_id, {})[field] = value
+        return {session_id: stats for session_id, stats in found.items() if len(stats) == len(LIVE_STATS_FIELDS)}
+
+    def seed(self, session_id, stats):
+        for field in LIVE_STATS_FIELDS:
+            cache.add(self._key(session_id, field), stats[field], self.timeout)
+
+    def incr(self, session_id, deltas):
+        for field, delta in deltas.items():
+            try:
+                cache.incr(self._key(session_id, field), delta)
+            except ValueError:
+                pass  # not seeded, the next read counts from the database
+
+    def reset(self, session_ids):
+        cache.delete_many([self._key(session_id, field) for session_id in session_ids for field in LIVE_STATS_FIELDS])
+
+
+class LocalLiveStats:
+    """Counters in a dict of this process"""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def available(self):
+        return True
+
+    def get_many(self, session_ids):
+        with self._lock:
+            return {
+                session_id: dict(self._sessions[session_id])
+                for session_id in session_ids if session_id in self._sessions
+            }
+
+    def seed(self, session_id, stats):
+        with self._lock:
+            self._sessions.setdefault(session_id, {field: stats[field] for field in LIVE_STATS_FIELDS})
+
+    def incr(self, session_id, deltas):
+        with self._lock:
+            counters = self._sessions.get(session_id)
+            if counters is not None:
+                for field, delta in deltas.items():
+                    counters[field] += delta
+
+    def reset(self, session_ids):
+        with self._lock:
+            for session_id in session_ids:
+                self._sessions.pop(session_id, None)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(
+            getattr(settings, 'LIVE_SESSION_STATS_BACKEND', 'core.live_stats.CacheLiveStats')
+        )()
+    return _backend
+
+
+def _reset_backend(setting, **kwargs):
+    global _backend
+    if setting in ('LIVE_SESSION_STATS_BACKEND', 'LIVE_SESSION_STATS_TIMEOUT'):
+        _backend = None
+
+
+setting_changed.connect(_reset_backend)
+
+
+# ============ API ============
+
+_tracking = ContextVar('live_stats_tracking', default=False)
+
+
+@contextmanager
+def tracking():
+    """Record writes inside the block adjust the counters via track_scan()"""
+    token = _tracking.set(True)
+    try:
+        yield
+    finally:
+        _tracking.reset(token)
+
+
+def is_tracking():
+    return _tracking.get()
+
+
+def track_scan(session_id, before, after):
+    """
+    Apply the change from record state `before` to `after` to the session's
+    counters once the current transaction (on the session's shard) commits.
+    """
+    deltas = {field: after[field] - before[field] for field in LIVE_STATS_FIELDS if after[field] != before[field]}
+    if deltas and get_backend().available():
+        transaction.on_commit(lambda: get_backend().incr(session_id, deltas), using=shard_for(session_id))
+
+
+def get_live_stats(session_ids):
+    """session id -> counters, for the sessions that have them"""
+    backend = get_backend()
+    if not backend.available():
+        return {}
+    return backend.get_many(session_ids)
+
+
+def seed_live_stats(session_id, stats):
+    """
+    Store counts read from the database, unless counters already exist.
+    Scans that committed since the counts were read are then missing from
+    them, so the session is counted again and the counters dropped if so.
+    """
+    backend = get_backend()
+    if not backend.available():
+        return
+    backend.seed(session_id, stats)
+    recount = count_session_stats(AttendanceRecord.objects.filter(session_id=session_id))
+    if any(recount[field] != stats[field] for field in LIVE_STATS_FIELDS):
+        backend.reset([session_id])
+
+
+def reset_live_stats(session_ids):
+    """
+    Drop the counters of sessions whose records changed outside the scan
+    path: now, and again on commit, in case a read reseeded them meanwhile.
+    """
+    session_ids = set(session_ids)
+    if session_ids:
+        get_backend().reset(session_ids)
+        transaction.on_commit(lambda: get_backend().reset(session_ids))
+
+
+def session_stats(session):
+    """
+    The counters of a live AttendanceSession: from the backend while it is
+    active, recounted (and seeded) when they are missing.
+    """
+    if session.status == 'active':
+        stats = get_live_stats([session.id]).get(session.id)
+        if stats is not None:
+            return stats
+    stats = count_session_stats(AttendanceRecord.objects.filter(session_id=session.id))
+    if session.status == 'active':
+        seed_live_stats(session.id, stats)
+    return stats
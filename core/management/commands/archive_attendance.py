@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.archive import archivable_sessions, archive_sessions
+from core.models import AttendanceRecord
+from core.sharding import for_sessions
+
+
+class Command(BaseCommand):
+    help = 'Move stopped attendance sessions older than a cutoff, with their records, to the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help='Archive sessions started before this date (YYYY-MM-DD)')
+        parser.add_argument(
+            '--older-than-days', type=int,
+            help='Archive sessions started more than this many days ago (default: ATTENDANCE_ARCHIVE_AFTER_DAYS)'
+        )
+        parser.add_argument('--chunk-size', type=int, help='Sessions moved per transaction (default: ATTENDANCE_ARCHIVE_CHUNK_SIZE)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be archived')
+
+    def handle(self, *args, **options):
+        if options['before']:
+            try:
+                cutoff = timezone.make_aware(datetime.strptime(options['before'], '%Y-%m-%d'))
+            except ValueError:
+                raise CommandError('--before must be a date in YYYY-MM-DD format')
+        else:
+            days = options['older_than_days']
+            if days is None:
+                days = getattr(settings, 'ATTENDANCE_ARCHIVE_AFTER_DAYS', 180)
+            cutoff = timezone.now() - timedelta(days=days)
+
+        if options['dry_run']:
+            session_ids = list(archivable_sessions(cutoff).values_list('id', flat=True))
+            records = 0
+            for start in range(0, len(session_ids), 500):
+                # Counted on the shards holding the records
+                records += sum(
+                    shard_records.count()
+                    for shard_records in for_sessions(AttendanceRecord.objects.all(), session_ids[start:start + 500])
+                )
+            self.stdout.write(f'Would archive {len(session_ids)} session(s) and {records} record(s) started before {cutoff:%Y-%m-%d}')
+            return
+
+        moved = archive_sessions(cutoff, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved['sessions']} session(s) and {moved['records']} record(s) started before {cutoff:%Y-%m-%d}"
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.alerts import detect_low_attendance
+
+
+class Command(BaseCommand):
+    help = (
+        'Raise and resolve low attendance alerts for the students whose attendance '
+        'changed since the last run (schedule it, e.g. nightly)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Evaluate every student, not only changed ones')
+        parser.add_argument('--batch-size', type=int, help='Students per transaction (default: ATTENDANCE_ALERT_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        stats = detect_low_attendance(full=options['full'], batch_size=options['batch_size'])
+        since = stats.pop('since')
+        self.stdout.write(f'changes since: {since:%Y-%m-%d %H:%M:%S}' if since else 'changes since: everything')
+        for name, value in stats.items():
+            self.stdout.write(f'{name.replace("_", " ")}: {value}')
+        self.stdout.write(self.style.SUCCESS('Detection complete'))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notifications import dispatch_notifications
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued notifications in per-recipient digests, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Notifications per batch (default: NOTIFICATION_BATCH_SIZE)')
+        parser.add_argument('--loop', action='store_true', help='Keep running, polling for due notifications')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop (default: 5)')
+
+    def handle(self, *args, **options):
+        totals = {}
+        while True:
+            # Drain everything due, one batch at a time
+            while True:
+                stats = dispatch_notifications(batch_size=options['batch_size'])
+                for name, value in stats.items():
+                    totals[name] = totals.get(name, 0) + value
+                if not stats['notifications']:
+                    break
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        for name, value in totals.items():
+            self.stdout.write(f'{name}: {value}')
+        self.stdout.write(self.style.SUCCESS('Dispatch complete'))
@@ -0,0 +1,57 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from core.enrollment import load_enrollments
+from core.models import Student, TaughtCourse
+
+
+class Command(BaseCommand):
+    help = (
+        "Replace a term's course enrollments from a CSV file with course, student, section and year "
+        "columns (ids), or from the students of the sections and years of the taught courses"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('term', help='Term to load, e.g. 2024-S1')
+        parser.add_argument('file', nargs='?', help='CSV file with a header row')
+        parser.add_argument(
+            '--from-sections', action='store_true',
+            help='Enroll the students of the section and year of every taught course that has both'
+        )
+
+    def rows_from_file(self, path):
+        try:
+            with open(path, newline='', encoding='utf-8') as stream:
+                for line, row in enumerate(csv.DictReader(stream), start=2):
+                    try:
+                        yield int(row['course']), int(row['student']), row['section'].strip(), int(row['year'])
+                    except (KeyError, TypeError, ValueError, AttributeError):
+                        raise CommandError(f'{path}:{line}: expected integer course, student and year and a section')
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+    def rows_from_sections(self):
+        students = {}
+        for student_id, section, year in Student.objects.order_by().values_list('student_id', 'section', 'year'):
+            students.setdefault((section, year), []).append(student_id)
+        for course_id, section, year in (
+            TaughtCourse.objects.exclude(section='').exclude(year=None).values_list('course_id', 'section', 'year').distinct()
+        ):
+            for student_id in students.get((section, year), []):
+                yield course_id, student_id, section, year
+
+    def handle(self, *args, **options):
+        if bool(options['file']) == options['from_sections']:
+            raise CommandError('Give either a CSV file or --from-sections')
+        rows = self.rows_from_sections() if options['from_sections'] else self.rows_from_file(options['file'])
+        try:
+            loaded = load_enrollments(options['term'], rows)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        except IntegrityError:
+            raise CommandError('Every course and student must exist')
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {loaded['enrollments']} enrollment(s) in {loaded['courses']} course(s) for {options['term']}"
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import AttendanceSession
+from core.sharding import rebalance, shards
+
+
+class Command(BaseCommand):
+    help = (
+        'Move the attendance records and scan events of sessions to the shard ATTENDANCE_SHARDS now maps them to. '
+        'Run after changing ATTENDANCE_SHARDS, while no session is active'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows copied per INSERT')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be moved')
+
+    def handle(self, *args, **options):
+        if not options['dry_run'] and AttendanceSession.objects.filter(status='active').exists():
+            # Scans of an active session would keep writing to the shard its rows leave
+            raise CommandError('Stop every active attendance session before rebalancing')
+        moved = rebalance(dry_run=options['dry_run'], chunk_size=options['chunk_size'])
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {moved['records']} record(s) and {moved['events']} scan event(s) of {moved['sessions']} "
+            f"session(s) across {len(shards())} shard(s)"
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.replay import AttendanceReplay
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild attendance records, StudentCourse.classes_attended and '
+        'Student.overall_attendance from the scan event log'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, help='Events read per query (default: SCAN_EVENT_REPLAY_CHUNK_SIZE)')
+        parser.add_argument('--dry-run', action='store_true', help='Replay and report without writing anything')
+
+    def handle(self, *args, **options):
+        stats = AttendanceReplay(chunk_size=options['chunk_size']).run(dry_run=options['dry_run'])
+        for name, value in stats.items():
+            self.stdout.write(f'{name.replace("_", " ")}: {value}')
+        self.stdout.write(self.style.SUCCESS('Dry run, nothing written' if options['dry_run'] else 'Replay complete'))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.tasks import prune_tasks, run_due_tasks
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks, retrying failures with backoff, and delete old finished ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Tasks claimed per batch (default: TASK_BATCH_SIZE)')
+        parser.add_argument('--loop', action='store_true', help='Keep running, polling for due tasks')
+        parser.add_argument('--interval', type=float, default=1, help='Seconds between polls with --loop (default: 1)')
+
+    def handle(self, *args, **options):
+        totals = {}
+        next_prune = 0
+        while True:
+            # Drain everything due, one batch at a time
+            while True:
+                stats = run_due_tasks(batch_size=options['batch_size'])
+                for name, value in stats.items():
+                    totals[name] = totals.get(name, 0) + value
+                if not stats['tasks']:
+                    break
+            if time.monotonic() >= next_prune:
+                totals['pruned'] = totals.get('pruned', 0) + prune_tasks()
+                next_prune = time.monotonic() + 60 * 60
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        for name, value in totals.items():
+            self.stdout.write(f'{name}: {value}')
+        self.stdout.write(self.style.SUCCESS('Tasks complete'))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_taughtcourse_section_taughtcourse_year_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='updateattendancerequest',
+            index=models.Index(fields=['status', 'requested_at', 'id'], name='core_uar_status_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_updateattendancerequest_queue_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'RFID scan'), (2, 'QR scan'), (3, 'Manual adjustment'), (4, 'Baseline')])),
+                ('occurred_at', models.DateTimeField()),
+                ('classes', models.CharField(blank=True, max_length=255)),
+                ('course', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.course')),
+                ('session', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.attendancesession')),
+                ('student', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.student')),
+                ('teacher', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.teacher')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['session', 'id'], name='core_scanevent_session_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:55
+
+from django.db import migrations
+from django.utils import timezone
+
+RFID, QR, BASELINE = 1, 2, 4
+BATCH_SIZE = 1000
+
+
+def seed_scan_events(apps, schema_editor):
+    """
+    Log the scans behind existing attendance records, then one baseline per
+    StudentCourse holding its current classes_attended, so replaying the log
+    reproduces the data as it was before the log existed.
+    """
+    AttendanceRecord = apps.get_model('core', 'AttendanceRecord')
+    StudentCourse = apps.get_model('core', 'StudentCourse')
+    ScanEvent = apps.get_model('core', 'ScanEvent')
+
+    events = []
+    records = AttendanceRecord.objects.order_by('session_id', 'id').values_list(
+        'session_id', 'student_id', 'session__course_id', 'session__teacher_id',
+        'rfid_scanned', 'rfid_scanned_at', 'qr_scanned', 'qr_scanned_at'
+    )
+    for session_id, student_id, course_id, teacher_id, rfid, rfid_at, qr, qr_at in records.iterator():
+        scans = []
+        if rfid and rfid_at:
+            scans.append((rfid_at, RFID))
+        if qr and qr_at:
+            scans.append((qr_at, QR))
+        for occurred_at, kind in sorted(scans):
+            events.append(ScanEvent(
+                kind=kind, occurred_at=occurred_at, student_id=student_id, session_id=session_id,
+                course_id=course_id, teacher_id=teacher_id
+            ))
+        if len(events) >= BATCH_SIZE:
+            ScanEvent.objects.bulk_create(events)
+            events = []
+    ScanEvent.objects.bulk_create(events)
+
+    now = timezone.now()
+    events = []
+    for student_id, course_id, teacher_id, classes in StudentCourse.objects.order_by('id').values_list(
+        'student_id', 'course_id', 'teacher_id', 'classes_attended'
+    ).iterator():
+        events.append(ScanEvent(
+            kind=BASELINE, occurred_at=now, student_id=student_id,
+            course_id=course_id, teacher_id=teacher_id, classes=classes
+        ))
+        if len(events) >= BATCH_SIZE:
+            ScanEvent.objects.bulk_create(events)
+            events = []
+    ScanEvent.objects.bulk_create(events)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_scanevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_scan_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_seed_scan_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAttendanceSession',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('section', models.CharField(max_length=10)),
+                ('year', models.IntegerField()),
+                ('status', models.CharField(choices=[('active', 'Active'), ('stopped', 'Stopped')], max_length=10)),
+                ('qr_code_token', models.CharField(max_length=255)),
+                ('started_at', models.DateTimeField()),
+                ('stopped_at', models.DateTimeField(blank=True, null=True)),
+                ('term', models.CharField(db_index=True, max_length=10)),
+                ('archived_at', models.DateTimeField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendance_sessions', to='core.course')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendance_sessions', to='core.teacher')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAttendanceRecord',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('rfid_scanned', models.BooleanField(default=False)),
+                ('rfid_scanned_at', models.DateTimeField(blank=True, null=True)),
+                ('qr_scanned', models.BooleanField(default=False)),
+                ('qr_scanned_at', models.DateTimeField(blank=True, null=True)),
+                ('is_present', models.BooleanField(default=False)),
+                ('marked_present_at', models.DateTimeField(blank=True, null=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendance_records', to='core.student')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_records', to='core.archivedattendancesession')),
+            ],
+            options={
+                'ordering': ['-marked_present_at'],
+            },
+        ),
+    ]
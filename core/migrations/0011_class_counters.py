@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:24
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def count_classes(classes):
+    return len(classes.split(',')) if classes else 0
+
+
+def backfill_counters(apps, schema_editor):
+    """Count the comma separated classes of existing rows"""
+    for model_name, field in (('TaughtCourse', 'classes_taken'), ('StudentCourse', 'classes_attended')):
+        model = apps.get_model('core', model_name)
+        rows = []
+        for row in model.objects.order_by('id').only('id', field).iterator(chunk_size=BATCH_SIZE):
+            setattr(row, f'{field}_count', count_classes(getattr(row, field)))
+            rows.append(row)
+        model.objects.bulk_update(rows, [f'{field}_count'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_attendance_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentcourse',
+            name='classes_attended_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='taughtcourse',
+            name='classes_taken_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_class_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedattendancesession',
+            name='presence',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='attendancesession',
+            name='presence',
+            field=models.BinaryField(null=True),
+        ),
+    ]
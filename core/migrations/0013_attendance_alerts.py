@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_session_presence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceAlertRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+                ('since', models.DateTimeField(blank=True, null=True)),
+                ('students_evaluated', models.PositiveIntegerField(default=0)),
+                ('alerts_raised', models.PositiveIntegerField(default=0)),
+                ('alerts_resolved', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='studentcourse',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='taughtcourse',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='AttendanceAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attended', models.PositiveIntegerField()),
+                ('held', models.PositiveIntegerField()),
+                ('rate', models.FloatField()),
+                ('threshold', models.FloatField()),
+                ('raised_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_alerts', to='core.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_alerts', to='core.student')),
+                ('teacher', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_alerts', to='core.teacher')),
+            ],
+            options={
+                'ordering': ['-raised_at'],
+                'indexes': [models.Index(fields=['resolved_at', 'raised_at'], name='core_alert_open_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('course__isnull', False)), fields=('student', 'course', 'teacher'), name='core_alert_course_uniq'), models.UniqueConstraint(condition=models.Q(('course__isnull', True)), fields=('student',), name='core_alert_overall_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Enrollment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(max_length=10)),
+                ('year', models.IntegerField()),
+                ('term', models.CharField(max_length=10)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='core.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='core.student')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'course', 'student'), name='core_enrollment_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:09
+
+import core.tenancy
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_default_tenant(apps, schema_editor):
+    """The campus existing rows are assigned to, and the one requests fall back to"""
+    Tenant = apps.get_model('core', 'Tenant')
+    slug = getattr(settings, 'DEFAULT_TENANT_SLUG', 'default')
+    Tenant.objects.get_or_create(slug=slug, defaults={'name': slug.capitalize()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_enrollment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tenant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('slug', models.SlugField(unique=True)),
+                ('domain', models.CharField(blank=True, max_length=255, null=True, unique=True)),
+            ],
+        ),
+        migrations.RunPython(create_default_tenant, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='class',
+            name='scanner_id',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='rfid',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='teacher',
+            name='rfid',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddField(
+            model_name='archivedattendancesession',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=core.tenancy.tenant_default, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='attendancesession',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=core.tenancy.tenant_default, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='class',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=core.tenancy.tenant_default, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=core.tenancy.tenant_default, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='management',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=core.tenancy.tenant_default, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=core.tenancy.tenant_default, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='teacher',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=core.tenancy.tenant_default, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedattendancesession',
+            index=models.Index(fields=['tenant', 'course', 'section', 'year', 'started_at'], name='core_archsession_tenant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancesession',
+            index=models.Index(fields=['tenant', 'course', 'section', 'year', 'started_at'], name='core_session_tenant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancesession',
+            index=models.Index(fields=['tenant', 'status', 'started_at'], name='core_session_tenant_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['tenant', 'course_name'], name='core_course_tenant_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='management',
+            index=models.Index(fields=['tenant', 'Management_name'], name='core_mgmt_tenant_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['tenant', 'section', 'year'], name='core_student_tenant_roster_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='class',
+            constraint=models.UniqueConstraint(fields=('tenant', 'scanner_id'), name='core_class_tenant_scanner_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='student',
+            constraint=models.UniqueConstraint(fields=('tenant', 'rfid'), name='core_student_tenant_rfid_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='teacher',
+            constraint=models.UniqueConstraint(fields=('tenant', 'rfid'), name='core_teacher_tenant_rfid_uniq'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_tenants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendancerecord',
+            name='session',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_records', to='core.attendancesession'),
+        ),
+        migrations.AlterField(
+            model_name='attendancerecord',
+            name='student',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_records', to='core.student'),
+        ),
+    ]
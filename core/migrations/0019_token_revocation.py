@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_unconstrained_attendance_records'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('user_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('revoked_at', models.FloatField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_token_revocation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancesession',
+            name='qr_code_image',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_session_qr_code_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='updateattendancerequest',
+            name='claim_token',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:01
+
+from django.db import migrations, models
+
+
+def drop_bitmaps(apps, schema_editor):
+    """Bitmaps over raw student ids are rebuilt over an index on next use"""
+    for model_name in ('AttendanceSession', 'ArchivedAttendanceSession'):
+        apps.get_model('core', model_name).objects.filter(presence__isnull=False).update(presence=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_update_request_claim_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedattendancesession',
+            name='presence_index',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='attendancesession',
+            name='presence_index',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.RunPython(drop_bitmaps, migrations.RunPython.noop),
+    ]
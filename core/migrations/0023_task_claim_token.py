@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_presence_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='claim_token',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,22 +1,49 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .sharding import SessionShardedQuerySet
+from .tenancy import tenant_default
+
+
+def tenant_key():
+    """The tenant key of a core model; composite indexes lead with it instead of it being indexed alone"""
+    return models.ForeignKey('Tenant', on_delete=models.PROTECT, default=tenant_default, db_index=False, related_name='+')
+
+
+class Tenant(models.Model):
+    """A campus. Core models are partitioned by tenant, see core.tenancy."""
+    name = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=50, unique=True)
+    domain = models.CharField(max_length=255, unique=True, null=True, blank=True)  # host serving this campus
+
+    def __str__(self):
+        return self.name
+
 
 # Create your models here.
 class Class(models.Model):
     classroom_id = models.AutoField(primary_key=True)
-    scanner_id = models.CharField(max_length=100, unique=True)
+    tenant = tenant_key()
+    scanner_id = models.CharField(max_length=100)
 
     def __str__(self):
         return f"Classroom {self.classroom_id}"
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'scanner_id'], name='core_class_tenant_scanner_uniq'),
+        ]
+
 
 class Student(models.Model):
     student_id = models.AutoField(primary_key=True)
+    tenant = tenant_key()
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, related_name='student_profile')
     student_name = models.CharField(max_length=255)
     email = models.EmailField(unique=True, null=True, blank=True)
     # image = models.ImageField(upload_to='student_images/', null=True, blank=True)  # for CV
-    rfid = models.CharField(max_length=100, unique=True)
+    rfid = models.CharField(max_length=100)  # unique within the tenant
     overall_attendance = models.FloatField(default=0.0)  # percentage
     year = models.IntegerField()  # e.g., 1, 2, 3, 4
     dept = models.CharField(max_length=100)  # e.g., CS, IT
@@ -25,26 +52,47 @@ class Student(models.Model):
     def __str__(self):
         return self.student_name
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'rfid'], name='core_student_tenant_rfid_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'section', 'year'], name='core_student_tenant_roster_idx'),
+        ]
+
 class Course(models.Model):
     course_id = models.AutoField(primary_key=True)
+    tenant = tenant_key()
     course_name = models.CharField(max_length=200)
 
     def __str__(self):
         return self.course_name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'course_name'], name='core_course_tenant_name_idx'),
+        ]
+
 class Teacher(models.Model):
     teacher_id = models.AutoField(primary_key=True)
+    tenant = tenant_key()
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, related_name='teacher_profile')
     teacher_name = models.CharField(max_length=255)
     email = models.EmailField(unique=True, null=True, blank=True)
     # image = models.ImageField(upload_to='teacher_images/', null=True, blank=True)
-    rfid = models.CharField(max_length=100, unique=True)
+    rfid = models.CharField(max_length=100)  # unique within the tenant
 
     def __str__(self):
         return self.teacher_name
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'rfid'], name='core_teacher_tenant_rfid_uniq'),
+        ]
+
 class Management(models.Model):
     Management_id = models.AutoField(primary_key=True)
+    tenant = tenant_key()
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, related_name='management_profile')
     Management_name = models.CharField(max_length=255)
     email = models.EmailField(unique=True, null=True, blank=True)
@@ -52,12 +100,19 @@ class Management(models.Model):
     def __str__(self):
         return self.Management_name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'Management_name'], name='core_mgmt_tenant_name_idx'),
+        ]
+
 class TaughtCourse(models.Model):
     course = models.ForeignKey('Course', on_delete=models.CASCADE, related_name='taught_courses')
     teacher = models.ForeignKey('Teacher', on_delete=models.CASCADE, related_name='taught_courses')
     classes_taken = models.CharField(max_length=255)  # e.g., "Class A, Class B"
+    classes_taken_count = models.PositiveIntegerField(default=0, editable=False)  # kept in sync with classes_taken
     section = models.CharField(max_length=10, blank=True)  # e.g., A, B, C
     year = models.IntegerField(null=True, blank=True)  # e.g., 1, 2, 3, 4
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # watermark of the attendance alerts
 
     def __str__(self):
         return f"{self.teacher} teaches {self.course}"
@@ -67,11 +122,34 @@ class StudentCourse(models.Model):
     course = models.ForeignKey('Course', on_delete=models.CASCADE, related_name='student_courses')
     teacher = models.ForeignKey('Teacher', on_delete=models.CASCADE, related_name='student_courses')
     classes_attended = models.CharField(max_length=255, blank=True)  # e.g., "Class A, Class B"
+    classes_attended_count = models.PositiveIntegerField(default=0, editable=False)  # kept in sync with classes_attended
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # watermark of the attendance alerts
 
     def __str__(self):
         return f"{self.student} - {self.course} - {self.teacher}"
 
 
+class Enrollment(models.Model):
+    """
+    A student taking a course in a section and year during a term. Loaded a
+    term at a time (see core.enrollment); a course with no enrollment for a
+    term has the students of the section and year as its roster.
+    """
+    course = models.ForeignKey('Course', on_delete=models.CASCADE, related_name='enrollments')
+    student = models.ForeignKey('Student', on_delete=models.CASCADE, related_name='enrollments')
+    section = models.CharField(max_length=10)  # e.g., A, B, C
+    year = models.IntegerField()  # e.g., 1, 2, 3, 4
+    term = models.CharField(max_length=10)  # e.g., 2024-S1, see core.archive.term_for
+
+    def __str__(self):
+        return f"{self.student} - {self.course} ({self.section}/{self.year}, {self.term})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'course', 'student'], name='core_enrollment_uniq'),
+        ]
+
+
 class UpdateAttendanceRequest(models.Model):
     """
     Model for attendance update requests sent by teachers.
@@ -93,12 +171,17 @@ class UpdateAttendanceRequest(models.Model):
     requested_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
     processed_by = models.ForeignKey('Management', on_delete=models.SET_NULL, null=True, blank=True, related_name='processed_attendance_requests')
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)  # set by the batch that processed it
 
     def __str__(self):
         return f"Request by {self.teacher} for {self.student} in {self.course} - {self.status}"
 
     class Meta:
         ordering = ['-requested_at']
+        indexes = [
+            # Pending queue: filtered by status, keyset paged on (requested_at, id)
+            models.Index(fields=['status', 'requested_at', 'id'], name='core_uar_status_queue_idx'),
+        ]
 
 
 class AttendanceSession(models.Model):
@@ -111,29 +194,42 @@ class AttendanceSession(models.Model):
         ('stopped', 'Stopped'),
     ]
 
+    tenant = tenant_key()
     teacher = models.ForeignKey('Teacher', on_delete=models.CASCADE, related_name='attendance_sessions')
     course = models.ForeignKey('Course', on_delete=models.CASCADE, related_name='attendance_sessions')
     section = models.CharField(max_length=10)  # e.g., A, B, C
     year = models.IntegerField()  # e.g., 1, 2, 3, 4
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
     qr_code_token = models.CharField(max_length=255, unique=True)  # Token for QR code validation
+    qr_code_image = models.TextField(blank=True, editable=False)  # PNG data URI, see core.attendance
     started_at = models.DateTimeField(auto_now_add=True)
     stopped_at = models.DateTimeField(null=True, blank=True)
+    presence = models.BinaryField(null=True, editable=False)  # bitmap of present students, see core.presence
+    presence_index = models.BinaryField(null=True, editable=False)  # student ids the bits of presence stand for
 
     def __str__(self):
         return f"{self.teacher} - {self.course} - {self.section} - Year {self.year} - {self.status}"
 
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['tenant', 'course', 'section', 'year', 'started_at'], name='core_session_tenant_idx'),
+            models.Index(fields=['tenant', 'status', 'started_at'], name='core_session_tenant_status_idx'),
+        ]
 
 
 class AttendanceRecord(models.Model):
     """
     Model for tracking 2FA attendance (RFID + QR code).
     Students must scan both RFID and QR code to mark attendance.
+
+    Stored on the shard of its session (see core.sharding), so its foreign
+    keys carry no database constraint.
     """
-    session = models.ForeignKey('AttendanceSession', on_delete=models.CASCADE, related_name='attendance_records')
-    student = models.ForeignKey('Student', on_delete=models.CASCADE, related_name='attendance_records')
+    session = models.ForeignKey(
+        'AttendanceSession', on_delete=models.CASCADE, db_constraint=False, related_name='attendance_records'
+    )
+    student = models.ForeignKey('Student', on_delete=models.CASCADE, db_constraint=False, related_name='attendance_records')
     rfid_scanned = models.BooleanField(default=False)
     rfid_scanned_at = models.DateTimeField(null=True, blank=True)
     qr_scanned = models.BooleanField(default=False)
@@ -141,9 +237,253 @@ class AttendanceRecord(models.Model):
     is_present = models.BooleanField(default=False)  # True only when both RFID and QR are scanned
     marked_present_at = models.DateTimeField(null=True, blank=True)
 
+    objects = SessionShardedQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.student} - {self.session} - Present: {self.is_present}"
 
     class Meta:
         unique_together = ['session', 'student']
         ordering = ['-marked_present_at']
+
+
+class ScanEvent(models.Model):
+    """
+    Append-only log of everything that changes attendance: RFID/QR scans and
+    manual adjustments (approved update requests). AttendanceRecord,
+    StudentCourse.classes_attended and Student.overall_attendance can be
+    rebuilt from it with `manage.py replay_attendance`.
+
+    Rows are never updated or deleted, only moved between shards (scans
+    are stored on the shard of their session, see core.sharding). Foreign
+    keys carry no database constraint so the log outlives the rows it
+    refers to.
+    """
+    RFID = 1
+    QR = 2
+    ADJUSTMENT = 3
+    BASELINE = 4  # classes_attended as it was when the log was introduced
+    KIND_CHOICES = [
+        (RFID, 'RFID scan'),
+        (QR, 'QR scan'),
+        (ADJUSTMENT, 'Manual adjustment'),
+        (BASELINE, 'Baseline'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    occurred_at = models.DateTimeField()
+    student = models.ForeignKey('Student', on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+')
+    session = models.ForeignKey('AttendanceSession', on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, blank=True, related_name='+')
+    course = models.ForeignKey('Course', on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+')
+    teacher = models.ForeignKey('Teacher', on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+')
+    classes = models.CharField(max_length=255, blank=True)  # adjustments and baselines only
+
+    objects = SessionShardedQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - student {self.student_id} - {self.occurred_at}"
+
+    class Meta:
+        indexes = [
+            # Replay streams scans session by session
+            models.Index(fields=['session', 'id'], name='core_scanevent_session_idx'),
+        ]
+
+
+class ArchivedAttendanceSession(models.Model):
+    """
+    A stopped AttendanceSession moved out of the live tables by
+    `manage.py archive_attendance`. Keeps the original id, so a session id
+    is found in exactly one of the two tables.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    tenant = tenant_key()
+    teacher = models.ForeignKey('Teacher', on_delete=models.CASCADE, related_name='archived_attendance_sessions')
+    course = models.ForeignKey('Course', on_delete=models.CASCADE, related_name='archived_attendance_sessions')
+    section = models.CharField(max_length=10)
+    year = models.IntegerField()
+    status = models.CharField(max_length=10, choices=AttendanceSession.STATUS_CHOICES)
+    qr_code_token = models.CharField(max_length=255)
+    started_at = models.DateTimeField()
+    stopped_at = models.DateTimeField(null=True, blank=True)
+    presence = models.BinaryField(null=True, editable=False)
+    presence_index = models.BinaryField(null=True, editable=False)
+    term = models.CharField(max_length=10, db_index=True)  # e.g., 2024-S1
+    archived_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.teacher} - {self.course} - {self.section} - Year {self.year} - {self.term}"
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['tenant', 'course', 'section', 'year', 'started_at'], name='core_archsession_tenant_idx'),
+        ]
+
+
+class ArchivedAttendanceRecord(models.Model):
+    """An AttendanceRecord of an archived session, with its original id"""
+    id = models.BigIntegerField(primary_key=True)
+    session = models.ForeignKey('ArchivedAttendanceSession', on_delete=models.CASCADE, related_name='attendance_records')
+    student = models.ForeignKey('Student', on_delete=models.CASCADE, related_name='archived_attendance_records')
+    rfid_scanned = models.BooleanField(default=False)
+    rfid_scanned_at = models.DateTimeField(null=True, blank=True)
+    qr_scanned = models.BooleanField(default=False)
+    qr_scanned_at = models.DateTimeField(null=True, blank=True)
+    is_present = models.BooleanField(default=False)
+    marked_present_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.student} - {self.session} - Present: {self.is_present}"
+
+    class Meta:
+        ordering = ['-marked_present_at']
+
+
+class AttendanceAlert(models.Model):
+    """
+    A student below the attendance threshold of one of their courses, or
+    overall (no course and teacher). Raised and resolved by
+    `manage.py detect_low_attendance` (see core.alerts): a student has at
+    most one alert per course and one overall, reopened when they fall
+    below the threshold again.
+    """
+    student = models.ForeignKey('Student', on_delete=models.CASCADE, related_name='attendance_alerts')
+    course = models.ForeignKey('Course', on_delete=models.CASCADE, null=True, blank=True, related_name='attendance_alerts')
+    teacher = models.ForeignKey('Teacher', on_delete=models.CASCADE, null=True, blank=True, related_name='attendance_alerts')
+    attended = models.PositiveIntegerField()
+    held = models.PositiveIntegerField()
+    rate = models.FloatField()  # percentage
+    threshold = models.FloatField()
+    raised_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        scope = self.course or 'overall'
+        return f"{self.student} - {scope} - {self.rate}%{' (resolved)' if self.resolved_at else ''}"
+
+    class Meta:
+        ordering = ['-raised_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'course', 'teacher'], condition=models.Q(course__isnull=False),
+                name='core_alert_course_uniq'
+            ),
+            models.UniqueConstraint(fields=['student'], condition=models.Q(course__isnull=True), name='core_alert_overall_uniq'),
+        ]
+        indexes = [
+            # Open alerts, newest first
+            models.Index(fields=['resolved_at', 'raised_at'], name='core_alert_open_idx'),
+        ]
+
+
+class AttendanceAlertRun(models.Model):
+    """A run of the low attendance detector. The start of the last one is the next one's watermark."""
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+    since = models.DateTimeField(null=True, blank=True)  # changes looked at; empty for a full run
+    students_evaluated = models.PositiveIntegerField(default=0)
+    alerts_raised = models.PositiveIntegerField(default=0)
+    alerts_resolved = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Alert run {self.started_at}"
+
+    class Meta:
+        ordering = ['-started_at']
+
+
+class Notification(models.Model):
+    """
+    Outbox of notifications to students and teachers. Rows are written in
+    the same transaction as the change they report, and delivered later in
+    per-recipient digests by `manage.py dispatch_notifications` (see
+    core.notifications), so no request waits on delivery.
+    """
+    PRESENT = 'present'
+    REQUEST_APPROVED = 'request_approved'
+    REQUEST_REJECTED = 'request_rejected'
+    LOW_ATTENDANCE = 'low_attendance'
+    KIND_CHOICES = [
+        (PRESENT, 'Marked present'),
+        (REQUEST_APPROVED, 'Update request approved'),
+        (REQUEST_REJECTED, 'Update request rejected'),
+        (LOW_ATTENDANCE, 'Low attendance'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),  # gave up after NOTIFICATION_MAX_ATTEMPTS
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    recipient = models.EmailField()
+    payload = models.JSONField(default=dict)  # ids and values; the text is rendered on delivery
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)  # pushed forward while claimed and on retry
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)  # set by the batch that last claimed it
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} to {self.recipient} - {self.status}"
+
+    class Meta:
+        indexes = [
+            # Dispatcher: due pending notifications, oldest first
+            models.Index(fields=['status', 'next_attempt_at'], name='core_notification_due_idx'),
+        ]
+
+
+class Task(models.Model):
+    """
+    A queued background job (see core.tasks): the name of a registered task
+    function and its JSON arguments. Run by the TASK_EXECUTOR of the process
+    that queued it, or by `manage.py run_tasks`.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),  # gave up after max_attempts
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    key = models.CharField(max_length=200, unique=True, null=True, blank=True)  # queueing a known key again is a no-op
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)  # pushed forward while claimed and on retry
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)  # set by the batch that last claimed it
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.name} #{self.id} - {self.status}"
+
+    class Meta:
+        indexes = [
+            # Workers: due pending tasks, oldest first
+            models.Index(fields=['status', 'run_at'], name='core_task_due_idx'),
+        ]
+
+
+class TokenRevocation(models.Model):
+    """
+    Tokens of the user issued before revoked_at (a Unix timestamp) are
+    rejected. Kept by user id, not a foreign key, so deleting a user
+    records its revocation too (see core.authentication).
+    """
+    user_id = models.IntegerField(primary_key=True)
+    revoked_at = models.FloatField()
+
+    def __str__(self):
+        return f"Tokens of user {self.user_id} revoked at {self.revoked_at}"
@@ -0,0 +1,231 @@
+"""
+Notification outbox and its dispatcher.
+
+State changes worth telling someone about (a student marked present, an
+update request approved or rejected, a low attendance alert raised) call
+notify() inside their own transaction. That only INSERTs Notification
+rows, so the notification commits or rolls back with the change and the
+request never waits on delivery. Rows hold ids and values; their text is
+rendered when they are delivered.
+
+dispatch_notifications(), run by `manage.py dispatch_notifications`,
+claims a batch of due rows, renders them, coalesces each recipient's rows
+into one digest and hands the digests to the channel chosen by
+NOTIFICATION_CHANNEL:
+- ConsoleChannel (default) writes them to stdout, for development.
+- FileChannel appends them to NOTIFICATION_FILE_PATH.
+- SMTPChannel sends them through Django's email backend (EMAIL_BACKEND,
+  EMAIL_HOST, ...), over one connection per batch.
+
+A digest that fails is retried after NOTIFICATION_RETRY_DELAY seconds,
+doubling on each attempt up to NOTIFICATION_RETRY_MAX_DELAY; after
+NOTIFICATION_MAX_ATTEMPTS attempts its rows are marked failed.
+"""
+import sys
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.signals import setting_changed
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Course, Notification, Student
+
+Digest = namedtuple('Digest', 'recipient subject body')
+
+
+def notify(kind, recipients_payloads):
+    """Queue `kind` notifications: one per (recipient email, payload), skipping empty emails"""
+    Notification.objects.bulk_create([
+        Notification(kind=kind, recipient=recipient, payload=payload)
+        for recipient, payload in recipients_payloads if recipient
+    ])
+
+
+# ============ Rendering ============
+
+def _render(notification, courses, students):
+    """(subject, body) of one notification, given course and student names by id"""
+    payload = notification.payload
+    course = courses.get(payload.get('course'), 'your course')
+    if notification.kind == Notification.PRESENT:
+        return f'Present in {course}', f'You were marked present in {course} on {payload["date"]}.'
+    if notification.kind == Notification.LOW_ATTENDANCE:
+        scope = f'in {course}' if payload.get('course') else 'overall'
+        return (
+            'Low attendance warning',
+            f'Your attendance {scope} is {payload["rate"]}%, below the required {payload["threshold"]}%.'
+        )
+    outcome = 'approved' if notification.kind == Notification.REQUEST_APPROVED else 'rejected'
+    student = students.get(payload.get('student'), 'a student')
+    return (
+        f'Attendance request {outcome}',
+        f'Your request to add {payload["classes"]} to the attendance of {student} in {course} was {outcome}.'
+    )
+
+
+def build_digests(notifications):
+    """
+    Coalesce notifications into one Digest per recipient, loading the names
+    they mention in one query per model. Returns [(digest, notifications)].
+    """
+    course_ids = {n.payload.get('course') for n in notifications} - {None}
+    student_ids = {n.payload.get('student') for n in notifications} - {None}
+    courses = dict(Course.objects.filter(pk__in=course_ids).values_list('course_id', 'course_name'))
+    students = dict(Student.objects.filter(pk__in=student_ids).values_list('student_id', 'student_name'))
+
+    per_recipient = {}
+    for notification in notifications:
+        per_recipient.setdefault(notification.recipient, []).append(notification)
+
+    digests = []
+    for recipient, group in per_recipient.items():
+        rendered = [_render(notification, courses, students) for notification in group]
+        if len(rendered) == 1:
+            subject, body = rendered[0]
+        else:
+            subject = f'{len(rendered)} attendance notifications'
+            body = '\n\n'.join(f'{title}\n{text}' for title, text in rendered)
+        digests.append((Digest(recipient, subject, body), group))
+    return digests
+
+
+# ============ Channels ============
+
+class ConsoleChannel:
+    """Writes digests to stdout"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def _write(self, stream, digests):
+        for digest in digests:
+            stream.write(f'To: {digest.recipient}\nSubject: {digest.subject}\n\n{digest.body}\n\n')
+
+    def send(self, digests):
+        """Deliver `digests`; return one error (or None) per digest"""
+        self._write(self.stream, digests)
+        return [None] * len(digests)
+
+
+class FileChannel(ConsoleChannel):
+    """Appends digests to NOTIFICATION_FILE_PATH"""
+
+    def __init__(self):
+        self.path = getattr(settings, 'NOTIFICATION_FILE_PATH', 'notifications.log')
+
+    def send(self, digests):
+        with open(self.path, 'a', encoding='utf-8') as stream:
+            self._write(stream, digests)
+        return [None] * len(digests)
+
+
+class SMTPChannel:
+    """Sends digests as emails through Django's email backend"""
+
+    def send(self, digests):
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as exc:
+            return [exc] * len(digests)
+        errors = []
+        try:
+            for digest in digests:
+                try:
+                    EmailMessage(digest.subject, digest.body, to=[digest.recipient], connection=connection).send()
+                    errors.append(None)
+                except Exception as exc:
+                    errors.append(exc)
+        finally:
+            connection.close()
+        return errors
+
+
+_channel = None
+
+
+def get_channel():
+    global _channel
+    if _channel is None:
+        _channel = import_string(
+            getattr(settings, 'NOTIFICATION_CHANNEL', 'core.notifications.ConsoleChannel')
+        )()
+    return _channel
+
+
+def _reset_channel(setting, **kwargs):
+    global _channel
+    if setting in ('NOTIFICATION_CHANNEL', 'NOTIFICATION_FILE_PATH'):
+        _channel = None
+
+
+setting_changed.connect(_reset_channel)
+
+
+# ============ Dispatching ============
+
+def retry_delay(attempts):
+    """Seconds to wait after the `attempts`th failed attempt"""
+    base = getattr(settings, 'NOTIFICATION_RETRY_DELAY', 60)
+    return min(base * 2 ** (attempts - 1), getattr(settings, 'NOTIFICATION_RETRY_MAX_DELAY', 60 * 60))
+
+
+def claim_due(batch_size, now):
+    """
+    Claim up to `batch_size` due notifications by pushing their
+    next_attempt_at forward with a conditional UPDATE, so overlapping
+    dispatchers never deliver the same row twice while one is working.
+    """
+    lease = now + timedelta(seconds=getattr(settings, 'NOTIFICATION_CLAIM_TIMEOUT', 5 * 60))
+    claim_token = uuid.uuid4()
+    due = Notification.objects.filter(status='pending', next_attempt_at__lte=now)
+    ids = list(due.order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+    due.filter(id__in=ids).update(next_attempt_at=lease, claim_token=claim_token)
+    # Only rows stamped with this batch's token belong to it
+    return list(Notification.objects.filter(id__in=ids, claim_token=claim_token).order_by('id'))
+
+
+def dispatch_notifications(batch_size=None):
+    """
+    Deliver one batch of due notifications as per-recipient digests and
+    record the outcome. Returns counts of notifications, digests, and
+    notifications sent, retried and failed.
+    """
+    batch_size = batch_size or getattr(settings, 'NOTIFICATION_BATCH_SIZE', 200)
+    max_attempts = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+    notifications = claim_due(batch_size, timezone.now())
+    stats = {'notifications': len(notifications), 'digests': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+    if not notifications:
+        return stats
+
+    digests = build_digests(notifications)
+    errors = get_channel().send([digest for digest, _ in digests])
+    stats['digests'] = len(digests)
+
+    now = timezone.now()
+    sent, to_update = [], []
+    for (_, group), error in zip(digests, errors):
+        if error is None:
+            sent.extend(notification.id for notification in group)
+            continue
+        for notification in group:
+            notification.attempts += 1
+            notification.last_error = f'{type(error).__name__}: {error}'
+            if notification.attempts >= max_attempts:
+                notification.status = 'failed'
+                stats['failed'] += 1
+            else:
+                notification.next_attempt_at = now + timedelta(seconds=retry_delay(notification.attempts))
+                stats['retried'] += 1
+            to_update.append(notification)
+
+    Notification.objects.filter(id__in=sent).update(status='sent', sent_at=now)
+    Notification.objects.bulk_update(to_update, ['attempts', 'last_error', 'status', 'next_attempt_at'])
+    stats['sent'] = len(sent)
+    return stats
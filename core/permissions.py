@@ -0,0 +1,28 @@
+from rest_framework.permissions import BasePermission
+
+from .authentication import (
+    ROLE_STUDENT, ROLE_TEACHER, ROLE_MANAGEMENT, get_profile_id
+)
+
+
+class HasRole(BasePermission):
+    """Allow access only to users whose token (or profile) has `role`"""
+    role = None
+
+    def has_permission(self, request, view):
+        return get_profile_id(request.user, self.role) is not None
+
+
+class IsStudent(HasRole):
+    role = ROLE_STUDENT
+    message = 'Only students can perform this action'
+
+
+class IsTeacher(HasRole):
+    role = ROLE_TEACHER
+    message = 'Only teachers can perform this action'
+
+
+class IsManagement(HasRole):
+    role = ROLE_MANAGEMENT
+    message = 'Only management users can perform this action'
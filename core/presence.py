@@ -0,0 +1,238 @@
+"""
+Per-session presence bitmaps and the set analytics built on them.
+
+The students present in a session are stored on the session as a bitmap
+over a dense index of students kept next to it: bit i is set when the
+i-th student of the index was present. A session's index is its roster
+(see core.enrollment) plus anyone else present, in id order, so a session
+of a few thousand students packs into a few hundred bytes however large
+the student ids grow, and sessions of one course, section and term share
+the same index. Bitmaps are Python ints in memory, whose &, |, ~ and
+bit_count() run in C over the whole machine word array, so combining
+thousands of sessions takes a few big-int operations per session instead
+of a join over their attendance records.
+
+A bitmap is built when its session stops, and dropped whenever one of its
+records changes afterwards (see core.signals); analytics rebuild missing
+bitmaps on the fly, live and archived sessions alike. session_bitmaps()
+returns the bitmaps over one StudentIndex, which maps positions back to
+student ids; only sessions whose index differs from it are re-indexed.
+"""
+from array import array
+
+from django.db.models import Q
+
+from .archive import term_for
+from .enrollment import course_roster
+from .models import ArchivedAttendanceSession, AttendanceSession, Student
+from .sharding import for_sessions
+
+
+def to_bitmap(positions):
+    bits = 0
+    for position in positions:
+        bits |= 1 << position
+    return bits
+
+
+def from_bitmap(bits):
+    """Positions set in `bits`, ascending"""
+    positions = []
+    while bits:
+        low = bits & -bits
+        positions.append(low.bit_length() - 1)
+        bits ^= low
+    return positions
+
+
+def encode(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def decode(data):
+    return int.from_bytes(data, 'little')
+
+
+class StudentIndex:
+    """
+    Dense positions of student ids: bit i of a bitmap over the index stands
+    for students[i]. Students it does not know yet are appended.
+    """
+
+    def __init__(self, student_ids=()):
+        self.students = []
+        self.positions = {}
+        self.extend(student_ids)
+
+    def extend(self, student_ids):
+        for student_id in student_ids:
+            if student_id not in self.positions:
+                self.positions[student_id] = len(self.students)
+                self.students.append(student_id)
+
+    def bitmap(self, student_ids):
+        student_ids = list(student_ids)
+        self.extend(student_ids)
+        return to_bitmap(self.positions[student_id] for student_id in student_ids)
+
+    def student_ids(self, bits):
+        """Student ids set in `bits`, ascending"""
+        return sorted(self.students[position] for position in from_bitmap(bits))
+
+    def reindex(self, bits, source):
+        """`bits` over the `source` index, as a bitmap over this one"""
+        return self.bitmap(source.students[position] for position in from_bitmap(bits))
+
+    def shares_positions(self, other):
+        """True when every student of `other` has the same position here, so its bitmaps need no reindexing"""
+        return all(self.positions.get(student_id) == i for i, student_id in enumerate(other.students))
+
+    def encode(self):
+        return array('q', self.students).tobytes()
+
+    @classmethod
+    def decode(cls, data):
+        return cls(array('q', bytes(data)))
+
+
+# ============ Building ============
+
+def build_presence(session_model, session_ids):
+    """
+    Build and store the bitmaps of `session_ids` and their indexes from the
+    records and rosters, with one query for the sessions, one for the
+    records (per shard holding them) and one batched UPDATE.
+    Return id -> (index, bitmap).
+    """
+    record_model = session_model._meta.get_field('attendance_records').related_model
+    present = {session_id: [] for session_id in session_ids}
+    records = record_model.objects.filter(is_present=True).order_by().values_list('session_id', 'student_id')
+    for shard_records in for_sessions(records, present):
+        for session_id, student_id in shard_records.iterator(chunk_size=5000):
+            present[session_id].append(student_id)
+
+    built = {}
+    for session_id, course_id, section, year, started_at in session_model.objects.filter(
+        id__in=session_ids
+    ).order_by().values_list('id', 'course_id', 'section', 'year', 'started_at'):
+        roster = course_roster(course_id, section, year, term_for(started_at))
+        index = StudentIndex(sorted(roster.union(present[session_id])))
+        built[session_id] = (index, index.bitmap(present[session_id]))
+
+    session_model.objects.bulk_update(
+        [
+            session_model(id=session_id, presence=encode(bits), presence_index=index.encode())
+            for session_id, (index, bits) in built.items()
+        ],
+        ['presence', 'presence_index'], batch_size=500
+    )
+    return built
+
+
+def invalidate_presence(session_ids):
+    AttendanceSession.objects.filter(id__in=session_ids, presence__isnull=False).update(presence=None)
+
+
+def session_bitmaps(course=None, section=None, year=None, teacher=None, since=None, until=None, tenant=None):
+    """
+    Presence bitmaps of the stopped sessions, live and archived, matching the
+    filters and started in [since, until), oldest first: the StudentIndex
+    they are over and a list of (session id, started_at, bitmap).
+    """
+    filters = Q(status='stopped')
+    for name, value in (
+        ('tenant_id', tenant), ('course_id', course), ('section', section), ('year', year), ('teacher_id', teacher),
+        ('started_at__gte', since), ('started_at__lt', until),
+    ):
+        if value is not None:
+            filters &= Q(**{name: value})
+
+    index = StudentIndex()
+    indexes = {}  # stored index bytes -> (StudentIndex, whether its bitmaps need reindexing)
+    sessions = []
+    for model in (ArchivedAttendanceSession, AttendanceSession):
+        rows = list(
+            model.objects.filter(filters).order_by().values_list('id', 'started_at', 'presence', 'presence_index')
+        )
+        missing = build_presence(model, [row[0] for row in rows if row[2] is None]) if rows else {}
+        for session_id, started_at, presence, stored_index in rows:
+            if presence is None:
+                source, bits = missing[session_id]
+                stored_index = source.encode()
+            else:
+                bits = decode(presence)
+            stored_index = bytes(stored_index)
+            if stored_index not in indexes:
+                source = StudentIndex.decode(stored_index)
+                if not index.students:
+                    index.extend(source.students)
+                indexes[stored_index] = (source, not index.shares_positions(source))
+            source, reindex = indexes[stored_index]
+            sessions.append((session_id, started_at, index.reindex(bits, source) if reindex else bits))
+    sessions.sort(key=lambda session: (session[1], session[0]))
+    return index, sessions
+
+
+def section_roster(section=None, year=None, tenant=None):
+    """Ids of the students of a section and year (of a tenant)"""
+    students = Student.objects.all()
+    if tenant is not None:
+        students = students.filter(tenant_id=tenant)
+    if section is not None:
+        students = students.filter(section=section)
+    if year is not None:
+        students = students.filter(year=year)
+    return list(students.values_list('student_id', flat=True).iterator())
+
+
+# ============ Analytics ============
+
+def presence_counts(bitmaps):
+    """
+    position -> number of bitmaps the student at that position is set in.
+    The bitmaps are added with a bit-sliced counter (plane k holds bit k of
+    every student's count), so each session costs a few big-int operations
+    however large it is.
+    """
+    planes = []
+    for bits in bitmaps:
+        for k, plane in enumerate(planes):
+            planes[k], bits = plane ^ bits, plane & bits
+            if not bits:
+                break
+        if bits:
+            planes.append(bits)
+
+    counts = {}
+    for k, plane in enumerate(planes):
+        for position in from_bitmap(plane):
+            counts[position] = counts.get(position, 0) + (1 << k)
+    return counts
+
+
+def attendance_rates(bitmaps, roster=0):
+    """position -> percentage of the bitmaps the student there is set in, for students in either"""
+    bitmaps = list(bitmaps)
+    counts = dict.fromkeys(from_bitmap(roster), 0)
+    counts.update(presence_counts(bitmaps))
+    total = len(bitmaps)
+    return {position: round(count / total * 100, 2) if total else 0.0 for position, count in counts.items()}
+
+
+def absence_streaks(bitmaps, roster, length):
+    """Bitmap of the roster students absent from `length` consecutive bitmaps at some point"""
+    streaks = [0] * length  # streaks[j]: absent from the last j + 1 sessions
+    found = 0
+    for bits in bitmaps:
+        absent = roster & ~bits
+        streaks = [absent] + [streak & absent for streak in streaks[:-1]]
+        found |= streaks[-1]
+    return found
+
+
+def attendees(bitmaps):
+    """Bitmap of the students present in at least one bitmap"""
+    union = 0
+    for bits in bitmaps:
+        union |= bits
+    return union
@@ -0,0 +1,218 @@
+"""
+orjson-backed JSON renderer and parser, and the file renderers of term
+reports.
+
+Both JSON classes produce/accept what DRF's JSONRenderer/JSONParser do with
+the default settings. The rendered bytes are the same except for floats
+outside plain decimal range: orjson writes 1e16 and 0.000025 where the
+stdlib writes 1e+16 and 2.5e-05, the same values. Types orjson does not render the DRF way
+(datetime, date, time, Decimal, lazy strings, ...) are handed to DRF's
+JSONEncoder. Without orjson installed, or for options orjson cannot express
+(indentation, ASCII-only output, non-strict floats), they fall back to the
+stdlib implementation. NaN and infinite floats render as null either way,
+as orjson renders them, where DRF's strict mode refuses them.
+"""
+import csv
+import io
+import math
+import zipfile
+from xml.sax.saxutils import escape as xml_escape
+
+from django.conf import settings
+from django.utils.html import escape
+from rest_framework import renderers, parsers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import encoders
+
+from .reports import report_table, report_title
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+
+def finite(data):
+    """`data` with NaN and infinite floats, in nested dicts and lists too, replaced by None"""
+    if isinstance(data, float):
+        return data if math.isfinite(data) else None
+    if isinstance(data, dict):
+        return {key: finite(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [finite(value) for value in data]
+    return data
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer using orjson when available"""
+
+    def _use_orjson(self, accepted_media_type, renderer_context):
+        return (
+            orjson is not None
+            and self.encoder_class is encoders.JSONEncoder
+            and self.compact
+            and self.strict
+            and not self.ensure_ascii
+            and self.get_indent(accepted_media_type, renderer_context or {}) is None
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not self._use_orjson(accepted_media_type, renderer_context):
+            return self._render_stdlib(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=encoders.JSONEncoder().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits
+            return self._render_stdlib(data, accepted_media_type, renderer_context)
+
+        # We always fully escape \u2028 and \u2029 to ensure we output JSON
+        # that is a strict javascript subset, like JSONRenderer does.
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+    def _render_stdlib(self, data, accepted_media_type, renderer_context):
+        if self.strict:
+            data = finite(data)
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class FastJSONParser(parsers.JSONParser):
+    """JSONParser using orjson when available"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except (ValueError, orjson.JSONDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+# ============ Term report files ============
+
+class TermReportCSVRenderer(renderers.BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        header, rows = report_table(data)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        writer.writerows(rows)
+        return buffer.getvalue().encode()
+
+
+class TermReportHTMLRenderer(renderers.BaseRenderer):
+    """A standalone, printable HTML table"""
+    media_type = 'text/html'
+    format = 'html'
+    charset = 'utf-8'
+    # P/A cells are most of a grid, render them once
+    CELLS = {'P': '<td class="p">P</td>', 'A': '<td class="a">A</td>'}
+    STYLE = (
+        'table{border-collapse:collapse;font:12px sans-serif}th,td{border:1px solid #ccc;padding:2px 4px}'
+        '.p{background:#e6f4ea}.a{background:#fce8e6}'
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        header, rows = report_table(data)
+        cells = self.CELLS
+        parts = [
+            f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{escape(report_title(data))}</title>'
+            f'<style>{self.STYLE}</style></head><body><h1>{escape(report_title(data))}</h1><table><thead><tr>',
+            ''.join(f'<th>{escape(cell)}</th>' for cell in header),
+            '</tr></thead><tbody>',
+        ]
+        for row in rows:
+            parts.append('<tr>')
+            parts.append(''.join(
+                cells.get(cell) or f'<td>{escape(cell)}</td>' if isinstance(cell, str) else f'<td>{cell}</td>'
+                for cell in row
+            ))
+            parts.append('</tr>')
+        parts.append('</tbody></table></body></html>')
+        return ''.join(parts).encode()
+
+
+class TermReportXLSXRenderer(renderers.BaseRenderer):
+    """
+    A single sheet workbook, written directly as SpreadsheetML (the zipped
+    XML of the .xlsx format) so no spreadsheet library is needed.
+    """
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+    charset = None
+    render_style = 'binary'
+
+    PARTS = {
+        '[Content_Types].xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'
+        ),
+        '_rels/.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        ),
+        'xl/workbook.xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets><sheet name="Attendance" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ),
+        'xl/_rels/workbook.xml.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            'Target="worksheets/sheet1.xml"/></Relationships>'
+        ),
+    }
+
+    @staticmethod
+    def cell(value):
+        if isinstance(value, str):
+            return f'<c t="inlineStr"><is><t>{xml_escape(value)}</t></is></c>'
+        return f'<c><v>{value}</v></c>'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        header, rows = report_table(data)
+        cell = self.cell
+        sheet = [
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        ]
+        for row in [header] + rows:
+            sheet.append('<row>' + ''.join(cell(value) for value in row) + '</row>')
+        sheet.append('</sheetData></worksheet>')
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as workbook:
+            for name, content in self.PARTS.items():
+                workbook.writestr(name, content)
+            workbook.writestr('xl/worksheets/sheet1.xml', ''.join(sheet))
+        return buffer.getvalue()
@@ -0,0 +1,208 @@
+"""
+Rebuild attendance state from the ScanEvent log.
+
+Scans are streamed session by session in keyset-paged chunks, so only one
+session's records are held in memory at a time; each finished session is
+written back with one DELETE and batched INSERTs. Credits to StudentCourse
+(completed scans, adjustments and baselines) are collected in log order and
+applied at the end, followed by Student.overall_attendance.
+
+Rows the log knows nothing about (sessions without scans, StudentCourse
+rows without events) are left as they are, and so are the records of
+archived sessions (see core.archive), whose scans still count towards
+StudentCourse.
+
+With scans sharded (see core.sharding) each shard's log is replayed in
+turn, and the run is one transaction on every shard.
+"""
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .attendance import append_classes, apply_scan, count_classes, overall_attendance, session_label, taught_classes
+from .authentication import ROLE_STUDENT
+from .dashboards import bump_dashboards
+from .live_stats import reset_live_stats
+from .presence import invalidate_presence
+from .sharding import PRIMARY, shards
+from .models import (
+    AttendanceRecord, AttendanceSession, ArchivedAttendanceSession, Course, ScanEvent, Student, StudentCourse, Teacher
+)
+
+
+def iter_scan_events(chunk_size, using=PRIMARY):
+    """Yield the (id, session_id, student_id, kind, occurred_at) of a shard ordered by session, then id"""
+    scans = ScanEvent.objects.using(using).filter(kind__in=(ScanEvent.RFID, ScanEvent.QR), session__isnull=False)
+    last_session, last_id = 0, 0
+    while True:
+        chunk = list(
+            scans.filter(Q(session_id__gt=last_session) | Q(session_id=last_session, id__gt=last_id))
+            .order_by('session_id', 'id')
+            .values_list('id', 'session_id', 'student_id', 'kind', 'occurred_at')[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield from chunk
+        last_id, last_session = chunk[-1][0], chunk[-1][1]
+
+
+def _join_credits(credits):
+    """
+    Build a classes_attended value from ((occurred_at, event_id), classes,
+    resets) credits: ids only order events within a shard, times across them
+    """
+    classes_attended = ''
+    for _, classes, resets in sorted(credits):
+        if resets:
+            classes_attended = classes
+        else:
+            classes_attended = append_classes(classes_attended, classes)
+    return classes_attended
+
+
+class AttendanceReplay:
+    """
+    One replay run. `stats` counts what was read and written.
+    """
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or getattr(settings, 'SCAN_EVENT_REPLAY_CHUNK_SIZE', 5000)
+        self.batch_size = getattr(settings, 'SCAN_EVENT_BATCH_SIZE', 500)
+        self.stats = dict.fromkeys((
+            'events', 'skipped_events', 'sessions', 'records',
+            'student_courses_updated', 'student_courses_created', 'students_updated'
+        ), 0)
+
+    def run(self, dry_run=False):
+        aliases = dict.fromkeys((PRIMARY, *shards()))
+        with ExitStack() as stack:
+            for alias in aliases:
+                stack.enter_context(transaction.atomic(using=alias))
+            credits = self._replay_scans()
+            self._replay_adjustments(credits)
+            self._write_student_courses(credits)
+            self._write_overall_attendance()
+            if dry_run:
+                for alias in aliases:
+                    transaction.set_rollback(True, using=alias)
+        return self.stats
+
+    def _replay_scans(self):
+        sessions = {}
+        for model in (ArchivedAttendanceSession, AttendanceSession):
+            for session_id, course_id, teacher_id, started_at in model.objects.order_by().values_list(
+                'id', 'course_id', 'teacher_id', 'started_at'
+            ):
+                sessions[session_id] = (course_id, teacher_id, session_label(started_at))
+        # Archived sessions still credit StudentCourse, but their records stay as archived
+        archived = set(ArchivedAttendanceSession.objects.values_list('id', flat=True))
+        students = set(Student.objects.values_list('student_id', flat=True))
+        credits = {}
+        current, records = None, {}
+
+        scans = (scan for alias in shards() for scan in iter_scan_events(self.chunk_size, alias))
+        for event_id, session_id, student_id, kind, at in scans:
+            self.stats['events'] += 1
+            if session_id != current:
+                if current not in archived:
+                    self._write_records(current, records)
+                current, records = session_id, {}
+            if session_id not in sessions or student_id not in students:
+                self.stats['skipped_events'] += 1
+                continue
+
+            record = records.get(student_id)
+            if record is None:
+                record = records[student_id] = AttendanceRecord(session_id=session_id, student_id=student_id)
+            if apply_scan(record, kind, at):
+                course_id, teacher_id, label = sessions[session_id]
+                credits.setdefault((student_id, course_id, teacher_id), []).append(((at, event_id), label, False))
+
+        if current not in archived:
+            self._write_records(current, records)
+        return credits
+
+    def _write_records(self, session_id, records):
+        if not records:
+            return
+        AttendanceRecord.objects.filter(session_id=session_id).delete()
+        AttendanceRecord.objects.bulk_create(records.values(), batch_size=self.batch_size)
+        reset_live_stats([session_id])
+        invalidate_presence([session_id])
+        self.stats['sessions'] += 1
+        self.stats['records'] += len(records)
+
+    def _replay_adjustments(self, credits):
+        # Adjustments and baselines belong to no session, so they are all on the primary
+        events = (
+            ScanEvent.objects.using(PRIMARY).filter(kind__in=(ScanEvent.ADJUSTMENT, ScanEvent.BASELINE))
+            .order_by('id')
+            .values_list('id', 'occurred_at', 'kind', 'student_id', 'course_id', 'teacher_id', 'classes')
+        )
+        for event_id, at, kind, student_id, course_id, teacher_id, classes in events.iterator(chunk_size=self.chunk_size):
+            self.stats['events'] += 1
+            credits.setdefault((student_id, course_id, teacher_id), []).append(
+                ((at, event_id), classes, kind == ScanEvent.BASELINE)
+            )
+
+    def _write_student_courses(self, credits):
+        existing = {}
+        for student_course in StudentCourse.objects.order_by('id').only(
+            'id', 'student_id', 'course_id', 'teacher_id', 'classes_attended', 'classes_attended_count'
+        ).iterator(chunk_size=self.chunk_size):
+            key = (student_course.student_id, student_course.course_id, student_course.teacher_id)
+            existing.setdefault(key, student_course)
+
+        students = set(Student.objects.values_list('student_id', flat=True))
+        courses = set(Course.objects.values_list('course_id', flat=True))
+        teachers = set(Teacher.objects.values_list('teacher_id', flat=True))
+        now = timezone.now()
+        to_update, to_create = [], []
+        for key, key_credits in credits.items():
+            classes_attended = _join_credits(key_credits)
+            student_course = existing.get(key)
+            if student_course is not None:
+                count = count_classes(classes_attended)
+                if (student_course.classes_attended, student_course.classes_attended_count) != (classes_attended, count):
+                    student_course.classes_attended = classes_attended
+                    student_course.classes_attended_count = count
+                    student_course.updated_at = now  # bulk_update skips auto_now
+                    to_update.append(student_course)
+            elif key[0] in students and key[1] in courses and key[2] in teachers:
+                to_create.append(StudentCourse(
+                    student_id=key[0], course_id=key[1], teacher_id=key[2],
+                    classes_attended=classes_attended, classes_attended_count=count_classes(classes_attended)
+                ))
+            else:
+                self.stats['skipped_events'] += len(key_credits)
+
+        StudentCourse.objects.bulk_update(
+            to_update, ['classes_attended', 'classes_attended_count', 'updated_at'], batch_size=self.batch_size
+        )
+        StudentCourse.objects.bulk_create(to_create, batch_size=self.batch_size)
+        bump_dashboards(ROLE_STUDENT, {student_course.student_id for student_course in to_update + to_create})
+        self.stats['student_courses_updated'] = len(to_update)
+        self.stats['student_courses_created'] = len(to_create)
+
+    def _write_overall_attendance(self):
+        classes_taken = taught_classes()
+        per_student = {}
+        for student_id, course_id, teacher_id, classes_attended in StudentCourse.objects.order_by().values_list(
+            'student_id', 'course_id', 'teacher_id', 'classes_attended'
+        ).iterator(chunk_size=self.chunk_size):
+            per_student.setdefault(student_id, []).append((course_id, teacher_id, classes_attended))
+
+        to_update = []
+        for student in Student.objects.order_by('student_id').only('student_id', 'overall_attendance').iterator(
+            chunk_size=self.chunk_size
+        ):
+            value = overall_attendance(per_student.get(student.student_id, ()), classes_taken)
+            if student.overall_attendance != value:
+                student.overall_attendance = value
+                to_update.append(student)
+        Student.objects.bulk_update(to_update, ['overall_attendance'], batch_size=self.batch_size)
+        bump_dashboards(ROLE_STUDENT, {student.student_id for student in to_update})
+        self.stats['students_updated'] = len(to_update)
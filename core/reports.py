@@ -0,0 +1,126 @@
+"""
+Term attendance reports.
+
+A term report is the students x sessions attendance grid of one course,
+section and year over a term, with each student's attendance rate and
+recent (moving window) rate, each session's turnout and its moving
+average, and flags for students below a threshold.
+
+The grid comes from the sessions' presence bitmaps (core.presence), so
+loading it is one query per session table however many records there are,
+and the per-student counts are bit-sliced additions over whole sessions.
+The table helpers below feed the CSV, HTML and XLSX renderers in
+core.renderers.
+"""
+from .archive import term_range
+from .enrollment import course_roster
+from .models import Student
+from .presence import attendees, presence_counts, session_bitmaps
+
+DEFAULT_THRESHOLD = 75.0
+DEFAULT_WINDOW = 5
+
+
+def _rate(count, total):
+    return round(count / total * 100, 2) if total else 0.0
+
+
+def moving_averages(values, window):
+    """Mean of each value and the up to `window - 1` values before it"""
+    averages, total = [], 0
+    for i, value in enumerate(values):
+        total += value
+        if i >= window:
+            total -= values[i - window]
+        averages.append(round(total / min(i + 1, window), 2))
+    return averages
+
+
+def build_term_report(course, section, year, term, threshold=DEFAULT_THRESHOLD, window=DEFAULT_WINDOW):
+    """
+    The term report of `course` (a Course), as a dict. Students are the
+    course's roster for the section, year and term (see core.enrollment)
+    plus anyone else present in its sessions.
+    Raises ValueError for a malformed term.
+    """
+    since, until = term_range(term)
+    index, sessions = session_bitmaps(course=course.course_id, section=section, year=year, since=since, until=until)
+    bitmaps = [bits for _, _, bits in sessions]
+    students = index.bitmap(sorted(course_roster(course.course_id, section, year, term))) | attendees(bitmaps)
+    student_ids = index.student_ids(students)
+    names = dict(Student.objects.filter(pk__in=student_ids).values_list('student_id', 'student_name'))
+
+    counts = presence_counts(bitmaps)
+    recent = bitmaps[-window:]
+    recent_counts = presence_counts(recent)
+    present = [(bits & students).bit_count() for bits in bitmaps]
+    turnout = [_rate(count, len(student_ids)) for count in present]
+
+    rows = []
+    for student_id in student_ids:
+        position = index.positions[student_id]
+        rate = _rate(counts.get(position, 0), len(bitmaps))
+        recent_rate = _rate(recent_counts.get(position, 0), len(recent))
+        rows.append({
+            'student': student_id,
+            'student_name': names.get(student_id),
+            'attendance': [bits >> position & 1 == 1 for bits in bitmaps],
+            'attended': counts.get(position, 0),
+            'rate': rate,
+            'recent_rate': recent_rate,
+            'below_threshold': rate < threshold,
+            'recent_below_threshold': recent_rate < threshold,
+        })
+
+    return {
+        'course': course.course_id,
+        'course_name': course.course_name,
+        'section': section,
+        'year': year,
+        'term': term,
+        'threshold': threshold,
+        'window': window,
+        'sessions': [
+            {'id': session_id, 'started_at': started_at, 'present': count,
+             'turnout': rate, 'turnout_moving_average': average}
+            for (session_id, started_at, _), count, rate, average
+            in zip(sessions, present, turnout, moving_averages(turnout, window))
+        ],
+        'students': rows,
+    }
+
+
+def report_filename(report, extension):
+    return f"attendance-{report['course']}-{report['section']}-{report['year']}-{report['term']}.{extension}"
+
+
+# ============ Tables for the file renderers ============
+
+def report_table(report):
+    """
+    The report as a header and rows of strings and numbers: one row per
+    student, P/A per session, then a turnout row. Any other data (an error
+    response) becomes a key/value table.
+    """
+    if 'students' not in report:
+        return ['field', 'value'], [[key, str(value)] for key, value in report.items()]
+
+    header = (
+        ['Student ID', 'Name']
+        + [session['started_at'].strftime('%Y-%m-%d %H:%M') for session in report['sessions']]
+        + ['Attended', 'Rate %', f"Last {report['window']} %", 'Flag']
+    )
+    rows = [
+        [row['student'], row['student_name'] or '']
+        + ['P' if present else 'A' for present in row['attendance']]
+        + [row['attended'], row['rate'], row['recent_rate'], 'LOW' if row['below_threshold'] else '']
+        for row in report['students']
+    ]
+    rows.append(['', 'Turnout %'] + [session['turnout'] for session in report['sessions']] + ['', '', '', ''])
+    return header, rows
+
+
+def report_title(report):
+    if 'course_name' not in report:
+        return 'Term report'
+    return f"{report['course_name']}, section {report['section']}, year {report['year']}, {report['term']}"
@@ -0,0 +1,77 @@
+"""
+Read-replica routing.
+
+Reads go to a replica only inside a `read_from_replica()` block: viewsets
+opt in per action with ReplicaReadMixin, function views with the
+`read_from_replica()` decorator. Everything else, including the scan views
+and the approval flow, reads and writes on the primary ('default').
+
+A write inside a replica block pins the rest of the block to the primary,
+so a request reads its own writes. Replicas are listed in
+settings.DATABASE_REPLICAS; with none configured every query uses the
+primary.
+"""
+import random
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def choose_replica():
+    replicas = getattr(settings, 'DATABASE_REPLICAS', ())
+    return random.choice(replicas) if replicas else PRIMARY
+
+
+class read_from_replica(ContextDecorator):
+    """Send the reads of a block, or of a decorated view, to a replica"""
+
+    def __enter__(self):
+        self._token = _use_replica.set(True)
+        return self
+
+    def __exit__(self, *exc):
+        _use_replica.reset(self._token)
+        return False
+
+
+class ReplicaRouter:
+    """Database router for DATABASE_ROUTERS, see the module docstring"""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return choose_replica()
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        # Read your writes: stay on the primary until the block ends
+        _use_replica.set(False)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return db == PRIMARY
+
+
+class ReplicaReadMixin:
+    """
+    ViewSet mixin serving `replica_actions` from a replica.
+    Not for CachedResponseMixin viewsets: a lagging replica could be cached
+    under the version stamp of a newer write.
+    """
+    replica_actions = ('list', 'retrieve')
+
+    def dispatch(self, request, *args, **kwargs):
+        action = self.action_map.get(request.method.lower())
+        if action in self.replica_actions:
+            with read_from_replica():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
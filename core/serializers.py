@@ -3,8 +3,29 @@ from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from .models import (
     Student, Teacher, Management, Course, Class, TaughtCourse, StudentCourse,
-    UpdateAttendanceRequest, AttendanceSession, AttendanceRecord
+    UpdateAttendanceRequest, AttendanceSession, AttendanceRecord,
+    ArchivedAttendanceSession, ArchivedAttendanceRecord, AttendanceAlert
 )
+from .tenancy import tenant_default
+
+
+class UniqueInTenant:
+    """Field validator: no other row of the same tenant (campus) has this value"""
+    requires_context = True
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def __call__(self, value, field):
+        instance = getattr(field.parent, 'instance', None)
+        tenant_id = instance.tenant_id if instance is not None else tenant_default()
+        queryset = self.queryset.filter(tenant_id=tenant_id, **{field.source: value})
+        if instance is not None:
+            queryset = queryset.exclude(pk=instance.pk)
+        if queryset.exists():
+            raise serializers.ValidationError(
+                f'{self.queryset.model._meta.verbose_name} with this {field.source} already exists.', code='unique'
+            )
 
 
 # ============ Model Serializers for CRUD operations ============
@@ -15,6 +36,7 @@ class StudentSerializer(serializers.ModelSerializer):
         model = Student
         fields = ['student_id', 'student_name', 'email', 'rfid', 'overall_attendance', 'year', 'dept', 'section']
         read_only_fields = ['student_id']
+        extra_kwargs = {'rfid': {'validators': [UniqueInTenant(Student.objects.all())]}}
 
 
 class TeacherSerializer(serializers.ModelSerializer):
@@ -23,6 +45,7 @@ class TeacherSerializer(serializers.ModelSerializer):
         model = Teacher
         fields = ['teacher_id', 'teacher_name', 'email', 'rfid']
         read_only_fields = ['teacher_id']
+        extra_kwargs = {'rfid': {'validators': [UniqueInTenant(Teacher.objects.all())]}}
 
 
 class ManagementSerializer(serializers.ModelSerializer):
@@ -47,6 +70,7 @@ class ClassSerializer(serializers.ModelSerializer):
         model = Class
         fields = ['classroom_id', 'scanner_id']
         read_only_fields = ['classroom_id']
+        extra_kwargs = {'scanner_id': {'validators': [UniqueInTenant(Class.objects.all())]}}
 
 
 class TaughtCourseSerializer(serializers.ModelSerializer):
@@ -89,6 +113,35 @@ class UpdateAttendanceRequestSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'status', 'requested_at', 'processed_at', 'processed_by']
 
 
+class AttendanceAlertSerializer(serializers.ModelSerializer):
+    """Read-only serializer for low attendance alerts"""
+    student_name = serializers.CharField(source='student.student_name', read_only=True)
+    course_name = serializers.CharField(source='course.course_name', read_only=True, default=None)
+    teacher_name = serializers.CharField(source='teacher.teacher_name', read_only=True, default=None)
+
+    class Meta:
+        model = AttendanceAlert
+        fields = [
+            'id', 'student', 'course', 'teacher', 'attended', 'held', 'rate', 'threshold',
+            'raised_at', 'updated_at', 'resolved_at', 'student_name', 'course_name', 'teacher_name'
+        ]
+        read_only_fields = fields
+
+
+class BulkProcessAttendanceRequestSerializer(serializers.Serializer):
+    """Serializer for bulk approve/reject of update attendance requests"""
+    action = serializers.ChoiceField(choices=['approve', 'reject'])
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=10000)
+    teacher = serializers.IntegerField(required=False)
+    course = serializers.IntegerField(required=False)
+    status = serializers.ChoiceField(choices=['pending'], required=False)
+
+    def validate(self, attrs):
+        if 'ids' not in attrs and not attrs.get('teacher') and not attrs.get('course') and 'status' not in attrs:
+            raise serializers.ValidationError("Provide 'ids' or at least one filter.")
+        return attrs
+
+
 # ============ Registration Serializers ============
 
 class StudentRegistrationSerializer(serializers.ModelSerializer):
@@ -99,6 +152,7 @@ class StudentRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = ('email', 'password', 'password2', 'student_name', 'rfid', 'year', 'dept', 'section')
+        extra_kwargs = {'rfid': {'validators': [UniqueInTenant(Student.objects.all())]}}
 
     def validate(self, attrs):
         if attrs['password'] != attrs['password2']:
@@ -142,6 +196,7 @@ class TeacherRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Teacher
         fields = ('email', 'password', 'password2', 'teacher_name', 'rfid')
+        extra_kwargs = {'rfid': {'validators': [UniqueInTenant(Teacher.objects.all())]}}
 
     def validate(self, attrs):
         if attrs['password'] != attrs['password2']:
@@ -216,6 +271,9 @@ class ManagementRegistrationSerializer(serializers.ModelSerializer):
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField(required=True)
     password = serializers.CharField(write_only=True, required=True)
+    user_type = serializers.ChoiceField(
+        choices=['student', 'teacher', 'management'], required=False
+    )
 
 
 class AttendanceSessionSerializer(serializers.ModelSerializer):
@@ -259,6 +317,22 @@ class AttendanceRecordSerializer(serializers.ModelSerializer):
         }
 
 
+class ArchivedAttendanceSessionSerializer(AttendanceSessionSerializer):
+    """Read-only AttendanceSessionSerializer for archived sessions"""
+
+    class Meta(AttendanceSessionSerializer.Meta):
+        model = ArchivedAttendanceSession
+        read_only_fields = AttendanceSessionSerializer.Meta.fields
+
+
+class ArchivedAttendanceRecordSerializer(AttendanceRecordSerializer):
+    """Read-only AttendanceRecordSerializer for records of archived sessions"""
+
+    class Meta(AttendanceRecordSerializer.Meta):
+        model = ArchivedAttendanceRecord
+        read_only_fields = AttendanceRecordSerializer.Meta.fields
+
+
 class RFIDScanSerializer(serializers.Serializer):
     """Serializer for RFID scan requests"""
     rfid = serializers.CharField(required=True)
@@ -0,0 +1,352 @@
+"""
+Session-keyed sharding of scan ingestion.
+
+Every tap writes an AttendanceRecord and a ScanEvent, far more rows than
+anything else. Those rows live on the shard (database alias) of their
+session: ATTENDANCE_SHARDS lists the aliases, and a consistent-hash ring
+maps a session id to one of them, so all writes of a session go to one
+database and adding a shard only moves about 1/n of the sessions. Sessions
+themselves, and every other table, stay on the primary ('default'), which
+is also a shard when it is listed. With only the primary (the default)
+nothing changes.
+
+- Querysets of the sharded models filtered by one session (as keyword
+  arguments, Q objects or get()), reached from a session
+  (session.attendance_records), or creating rows of one, go to its shard
+  (SessionShardedQuerySet), and ShardRouter sends saves and deletes of
+  loaded rows back where they came from, so the scan path and the per
+  session endpoints run unchanged. Once sharded, evaluating any other
+  queryset of them, e.g. student.attendance_records or an exclude() of a
+  session, raises instead of reading the primary's rows only.
+- Reads spanning sessions scatter to the shards holding them and gather the
+  rows: for_sessions() (presence bitmaps for analytics and reports, the
+  statistics of a teacher's sessions, archiving) and scatter().
+- Sharded rows cannot join the primary's tables: their foreign keys carry
+  no database constraint, deleting a session or student deletes its
+  sharded records once the delete commits (see core.signals), and shards
+  share no ids, as reserve_id_ranges() starts each shard's ids at its own
+  offset after migrating.
+
+Change ATTENDANCE_SHARDS while no session is active, then run
+`manage.py rebalance_shards` to move the rows of sessions whose shard changed.
+"""
+import bisect
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import connections, models, transaction
+from django.db.models import Q
+
+PRIMARY = 'default'
+SHARDED_MODELS = ('core.AttendanceRecord', 'core.ScanEvent')
+VIRTUAL_NODES = 64
+ID_RANGE_BITS = 40  # ids of the nth non-primary shard start at n << 40
+
+_ring = None
+_NO_SESSION = object()
+
+
+# ============ Ring ============
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(str(key).encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent-hash ring placing keys on `nodes`, each at VIRTUAL_NODES points"""
+
+    def __init__(self, nodes, virtual_nodes=VIRTUAL_NODES):
+        points = sorted((_hash(f'{node}#{i}'), node) for node in nodes for i in range(virtual_nodes))
+        self.nodes = tuple(dict.fromkeys(nodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key):
+        if len(self.nodes) == 1:
+            return self.nodes[0]
+        return self._owners[bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)]
+
+
+def get_ring():
+    global _ring
+    if _ring is None:
+        aliases = getattr(settings, 'ATTENDANCE_SHARDS', None) or [PRIMARY]
+        missing = [alias for alias in aliases if alias not in settings.DATABASES]
+        if missing:
+            raise ImproperlyConfigured(f'ATTENDANCE_SHARDS lists unknown databases: {", ".join(missing)}')
+        _ring = HashRing(aliases)
+    return _ring
+
+
+def _reset_ring(setting, **kwargs):
+    global _ring
+    if setting == 'ATTENDANCE_SHARDS':
+        _ring = None
+
+
+setting_changed.connect(_reset_ring)
+
+
+def shards():
+    """Aliases of the shards, as listed in ATTENDANCE_SHARDS"""
+    return get_ring().nodes
+
+
+def is_sharded():
+    return shards() != (PRIMARY,)
+
+
+def shard_for(session_id):
+    """Alias of the database holding the scan rows of a session; the primary's for rows without one"""
+    if session_id is None:
+        return PRIMARY
+    return get_ring().node_for(session_id)
+
+
+def is_sharded_model(model):
+    return model._meta.label in SHARDED_MODELS
+
+
+# ============ Queries ============
+
+def _on(queryset, alias):
+    if alias != PRIMARY:
+        return queryset.using(alias)
+    # Left unpinned on the primary so replica routing still applies there
+    return queryset._routed() if isinstance(queryset, SessionShardedQuerySet) else queryset
+
+
+def group_by_shard(session_ids):
+    """shard alias -> the ids among `session_ids` it holds"""
+    groups = {}
+    for session_id in session_ids:
+        groups.setdefault(shard_for(session_id), []).append(session_id)
+    return groups
+
+
+def for_sessions(queryset, session_ids):
+    """
+    `queryset` limited to the rows of `session_ids`, as one queryset per shard
+    holding some of them. Not sharded models give the one queryset.
+    """
+    session_ids = list(session_ids)
+    if not is_sharded_model(queryset.model):
+        return [queryset.filter(session_id__in=session_ids)]
+    return [
+        _on(queryset, alias).filter(session_id__in=ids) for alias, ids in group_by_shard(session_ids).items()
+    ]
+
+
+def scatter(queryset):
+    """The rows of `queryset` from every shard, or from the one it was routed to"""
+    if queryset._db is not None or not is_sharded_model(queryset.model):
+        yield from queryset
+        return
+    for alias in shards():
+        yield from _on(queryset, alias)
+
+
+class SessionShardedQuerySet(models.QuerySet):
+    """
+    QuerySet of a model sharded by session: filtering by one session, or
+    creating rows, goes to the session's shard unless a database was chosen.
+    exclude() never limits the rows to one session, so it routes nothing.
+    While sharded, a queryset neither routed nor reached from a session
+    refuses to run, rather than silently reading the primary alone.
+    """
+    SESSION_LOOKUPS = ('session', 'session_id', 'session__pk', 'session__id')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._session_routed = False
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._session_routed = self._session_routed
+        return clone
+
+    def _routed(self):
+        clone = self._chain()
+        clone._session_routed = True
+        return clone
+
+    def _session_lookup(self, args, kwargs):
+        """The session value filtered on by ANDed `kwargs` or Q objects in `args`; _NO_SESSION if none"""
+        for lookup in self.SESSION_LOOKUPS:
+            if lookup in kwargs:
+                return kwargs[lookup]
+        for arg in args:
+            if isinstance(arg, Q) and not arg.negated and arg.connector == Q.AND:
+                children = [child for child in arg.children if isinstance(child, Q)]
+                lookups = dict(child for child in arg.children if not isinstance(child, Q))
+                value = self._session_lookup(children, lookups)
+                if value is not _NO_SESSION:
+                    return value
+        return _NO_SESSION
+
+    def _route(self, kwargs, args=()):
+        if self._db is not None or self._session_routed:
+            return self
+        value = self._session_lookup(args, kwargs)
+        if value is _NO_SESSION:
+            return self
+        session_id = getattr(value, 'pk', value)
+        try:
+            alias = shard_for(None if session_id is None else int(session_id))
+        except (TypeError, ValueError):
+            return self  # the filter itself reports the bad value
+        return _on(self, alias)
+
+    def _reached_from_session(self):
+        # Related managers hint at their instance, which ShardRouter follows
+        instance = self._hints.get('instance')
+        return instance is not None and (
+            isinstance(instance, self.model) or instance._meta.label == 'core.AttendanceSession'
+        )
+
+    @property
+    def db(self):
+        if self._db is None and not self._session_routed and not self._reached_from_session() and is_sharded():
+            raise ValueError(
+                f'{self.model._meta.label} rows are sharded by session: filter by one session, '
+                'or read across sessions with for_sessions() or scatter()'
+            )
+        return super().db
+
+    def filter(self, *args, **kwargs):
+        return models.QuerySet.filter(self._route(kwargs, args), *args, **kwargs)
+
+    def get(self, *args, **kwargs):
+        return models.QuerySet.get(self._route(kwargs, args), *args, **kwargs)
+
+    def create(self, **kwargs):
+        return models.QuerySet.create(self._route(kwargs), **kwargs)
+
+    def get_or_create(self, defaults=None, **kwargs):
+        return models.QuerySet.get_or_create(self._route(kwargs), defaults=defaults, **kwargs)
+
+    def update_or_create(self, defaults=None, create_defaults=None, **kwargs):
+        return models.QuerySet.update_or_create(
+            self._route(kwargs), defaults=defaults, create_defaults=create_defaults, **kwargs
+        )
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        if self._db is not None:
+            return super().bulk_create(objs, *args, **kwargs)
+        groups = {}
+        for obj in objs:
+            groups.setdefault(shard_for(obj.session_id), []).append(obj)
+        for alias, group in groups.items():
+            models.QuerySet.bulk_create(_on(self, alias), group, *args, **kwargs)
+        return objs
+
+
+# ============ Router ============
+
+class ShardRouter:
+    """
+    Database router for DATABASE_ROUTERS, ahead of the replica router: rows
+    of the sharded models follow their session (see the module docstring).
+    """
+
+    def _shard(self, model, hints):
+        instance = hints.get('instance')
+        if instance is None or not is_sharded_model(model):
+            return None
+        if isinstance(instance, model):
+            alias = instance._state.db or shard_for(instance.session_id)
+        elif instance._meta.label == 'core.AttendanceSession':
+            alias = shard_for(instance.pk)
+        else:
+            return None
+        return None if alias == PRIMARY else alias
+
+    def db_for_read(self, model, **hints):
+        return self._shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._shard(model, hints)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Shards (any database but the replicas) get the whole schema, so a
+        # new one is migrated before joining the ring; their other tables stay empty
+        if db != PRIMARY and db not in getattr(settings, 'DATABASE_REPLICAS', ()):
+            return True
+        return None
+
+
+# ============ Id ranges ============
+
+def id_range_start(alias):
+    """First id of the sharded rows created on `alias`"""
+    if alias == PRIMARY or alias not in shards():
+        return 0
+    return ([shard for shard in shards() if shard != PRIMARY].index(alias) + 1) << ID_RANGE_BITS
+
+
+def reserve_id_ranges(alias):
+    """Move the id sequences of the sharded tables on `alias` past the start of its range"""
+    start = id_range_start(alias)
+    if not start:
+        return
+    from django.apps import apps
+    connection = connections[alias]
+    with transaction.atomic(using=alias), connection.cursor() as cursor:
+        for label in SHARDED_MODELS:
+            table = apps.get_model(label)._meta.db_table
+            if connection.vendor == 'sqlite':
+                cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, start])
+                elif row[0] < start:
+                    cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s', [start, table])
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                    f"GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM {connection.ops.quote_name(table)})))",
+                    [table, start]
+                )
+            else:
+                raise ImproperlyConfigured(f'Sharding does not support {connection.vendor} databases')
+
+
+# ============ Rebalancing ============
+
+def rebalance(dry_run=False, chunk_size=1000):
+    """
+    Move the records and scan events of sessions held on a shard other than
+    their own (after ATTENDANCE_SHARDS changed) to their shard, a session at
+    a time: copied with their ids, then those rows deleted from the old
+    shard in a transaction wrapping the copy's, so a failure never loses
+    rows and a rerun skips those already copied. Returns the number of
+    sessions, records and events moved. Run while no session is active.
+    """
+    from .models import AttendanceRecord, ScanEvent
+    moved = {'sessions': 0, 'records': 0, 'events': 0}
+    for source in dict.fromkeys((PRIMARY, *shards())):
+        misplaced = set()
+        for model in (AttendanceRecord, ScanEvent):
+            session_ids = model.objects.using(source).filter(session__isnull=False).values_list('session_id', flat=True)
+            misplaced.update(
+                session_id for session_id in session_ids.distinct().iterator() if shard_for(session_id) != source
+            )
+        for session_id in sorted(misplaced):
+            moved['sessions'] += 1
+            target = shard_for(session_id)
+            for model, counter in ((AttendanceRecord, 'records'), (ScanEvent, 'events')):
+                rows = model.objects.using(source).filter(session_id=session_id)
+                if dry_run:
+                    moved[counter] += rows.count()
+                    continue
+                with transaction.atomic(using=source), transaction.atomic(using=target):
+                    copies = [model(**row) for row in rows.values().iterator(chunk_size=chunk_size)]
+                    model.objects.using(target).bulk_create(copies, batch_size=chunk_size, ignore_conflicts=True)
+                    ids = [copy.id for copy in copies]
+                    for start in range(0, len(ids), chunk_size):
+                        model.objects.using(source).filter(id__in=ids[start:start + chunk_size]).delete()
+                moved[counter] += len(copies)
+    return moved
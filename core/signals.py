@@ -0,0 +1,124 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_migrate, post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .attendance import adjust_pending_request_count, count_classes
+from .authentication import ROLE_MANAGEMENT, ROLE_STUDENT, revoke_user_tokens
+from .caching import watch_models
+from .dashboards import bump_dashboards
+from .enrollment import invalidate_rosters
+from .live_stats import is_tracking, reset_live_stats
+from .presence import invalidate_presence
+from .sharding import PRIMARY, reserve_id_ranges, shard_for, shards
+from .models import (
+    AttendanceRecord, AttendanceSession, Class, Course, Enrollment, Management, Student, StudentCourse, Teacher,
+    TaughtCourse, Tenant, UpdateAttendanceRequest
+)
+
+
+# Reference data served through CachedResponseMixin
+watch_models(Class, Course, Teacher, TaughtCourse)
+# Host to tenant lookups, see core.tenancy
+watch_models(Tenant)
+
+
+@receiver(pre_save, sender=TaughtCourse)
+def count_classes_taken(sender, instance, **kwargs):
+    instance.classes_taken_count = count_classes(instance.classes_taken)
+
+
+@receiver(pre_save, sender=StudentCourse)
+def count_classes_attended(sender, instance, **kwargs):
+    instance.classes_attended_count = count_classes(instance.classes_attended)
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_of_deactivated_user(sender, instance, **kwargs):
+    """Stateless tokens are never re-checked against the User row"""
+    if not instance.is_active:
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_of_deleted_user(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
+
+
+@receiver(post_save, sender=UpdateAttendanceRequest)
+def count_new_pending_request(sender, instance, created, **kwargs):
+    if created and instance.status == 'pending':
+        adjust_pending_request_count(1, instance.student.tenant_id)
+
+
+@receiver(post_delete, sender=UpdateAttendanceRequest)
+def uncount_deleted_pending_request(sender, instance, **kwargs):
+    if instance.status == 'pending':
+        adjust_pending_request_count(-1, instance.student.tenant_id)
+
+
+@receiver(post_save, sender=StudentCourse)
+@receiver(post_delete, sender=StudentCourse)
+def bump_student_course_dashboard(sender, instance, **kwargs):
+    bump_dashboards(ROLE_STUDENT, [instance.student_id])
+
+
+@receiver(post_save, sender=Student)
+def bump_student_dashboard(sender, instance, **kwargs):
+    bump_dashboards(ROLE_STUDENT, [instance.pk])
+
+
+@receiver(post_save, sender=Management)
+def bump_management_dashboard(sender, instance, **kwargs):
+    bump_dashboards(ROLE_MANAGEMENT, [instance.pk])
+
+
+@receiver(post_save, sender=AttendanceSession)
+@receiver(post_delete, sender=AttendanceSession)
+def reset_session_live_stats(sender, instance, **kwargs):
+    reset_live_stats([instance.pk])
+
+
+@receiver(post_delete, sender=AttendanceSession)
+def delete_sharded_session_records(sender, instance, **kwargs):
+    """The cascade only reaches the primary; other shards follow once the delete commits"""
+    session_id, shard = instance.pk, shard_for(instance.pk)  # the pk is cleared after the delete
+    if shard != PRIMARY:
+        transaction.on_commit(lambda: AttendanceRecord.objects.using(shard).filter(session_id=session_id).delete())
+
+
+@receiver(post_delete, sender=Student)
+def delete_sharded_student_records(sender, instance, **kwargs):
+    student_id = instance.pk
+    for shard in shards():
+        if shard != PRIMARY:
+            transaction.on_commit(
+                lambda shard=shard: AttendanceRecord.objects.using(shard).filter(student_id=student_id).delete()
+            )
+
+
+@receiver(post_migrate)
+def reserve_shard_ids(sender, using, **kwargs):
+    if sender.label == 'core':
+        reserve_id_ranges(using)
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def record_changed(sender, instance, **kwargs):
+    """
+    Writes outside the scan path, which adjusts the counters itself. No
+    post_delete receiver, so bulk deletes (archiving, replay) stay fast
+    deletes; deleting views reset the session themselves.
+    """
+    if not is_tracking():
+        reset_live_stats([instance.session_id])
+        invalidate_presence([instance.session_id])
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_cached_rosters(sender, instance, **kwargs):
+    """A student's section or year, or an enrollment, may have changed"""
+    invalidate_rosters()
@@ -0,0 +1,184 @@
+"""
+Database-backed background tasks.
+
+Follow-up work that a request does not need to wait for is a task: a
+function registered with @task and queued with `func.enqueue(*args,
+key=..., **kwargs)`. Enqueueing INSERTs a Task row in the caller's
+transaction, so a task only exists if the change that queued it commits.
+A `key` makes the enqueue idempotent: a second task with a known key is
+dropped. Arguments must be JSON serializable.
+
+A task runs in a transaction together with marking it done, so its
+database writes happen once however often it is retried; failures are
+retried after TASK_RETRY_DELAY seconds, doubling up to
+TASK_RETRY_MAX_DELAY, until the task's max_attempts. Done tasks are
+deleted TASK_RETENTION seconds after they finish (see prune_tasks), and
+with them their keys; failed ones are kept for inspection.
+
+Who runs tasks is chosen by TASK_EXECUTOR:
+- WorkerExecutor (default) leaves them to `manage.py run_tasks --loop`,
+  which must run next to the web workers.
+- ThreadPoolExecutor runs due tasks on TASK_THREADS threads of the
+  queueing process after each commit that queued one; for development.
+- EagerExecutor calls the function inline at enqueue time, within the
+  caller's transaction and without a Task row; for tests.
+"""
+import concurrent.futures
+import functools
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name, max_attempts=5):
+    """Register the decorated function as task `name` and give it an enqueue() method"""
+    def decorator(func):
+        _registry[name] = func
+        func.enqueue = functools.partial(enqueue, name, max_attempts=max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(name, *args, key=None, max_attempts=5, **kwargs):
+    """Queue task `name`, or run it now with the EagerExecutor"""
+    executor = get_executor()
+    if executor.eager:
+        _registry[name](*args, **kwargs)
+        return
+    Task.objects.bulk_create(
+        [Task(name=name, args=list(args), kwargs=kwargs, key=key, max_attempts=max_attempts)],
+        ignore_conflicts=key is not None
+    )
+    transaction.on_commit(executor.notify)
+
+
+# ============ Executors ============
+
+class WorkerExecutor:
+    """Tasks wait for `manage.py run_tasks`"""
+    eager = False
+
+    def notify(self):
+        pass
+
+
+class ThreadPoolExecutor(WorkerExecutor):
+    """Tasks run on a thread pool of the process that queued them"""
+
+    def __init__(self):
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=getattr(settings, 'TASK_THREADS', 2), thread_name_prefix='tasks'
+        )
+
+    def notify(self):
+        self._pool.submit(self._drain)
+
+    def _drain(self):
+        close_old_connections()
+        try:
+            while run_due_tasks()['tasks']:
+                pass
+        except Exception:
+            logger.exception('Running background tasks failed')
+        finally:
+            close_old_connections()
+
+
+class EagerExecutor(WorkerExecutor):
+    """Tasks run inline when they are queued"""
+    eager = True
+
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = import_string(getattr(settings, 'TASK_EXECUTOR', 'core.tasks.WorkerExecutor'))()
+    return _executor
+
+
+def _reset_executor(setting, **kwargs):
+    global _executor
+    if setting in ('TASK_EXECUTOR', 'TASK_THREADS'):
+        _executor = None
+
+
+setting_changed.connect(_reset_executor)
+
+
+# ============ Running ============
+
+def retry_delay(attempts):
+    """Seconds to wait after the `attempts`th failed attempt"""
+    base = getattr(settings, 'TASK_RETRY_DELAY', 30)
+    return min(base * 2 ** (attempts - 1), getattr(settings, 'TASK_RETRY_MAX_DELAY', 60 * 60))
+
+
+def claim_due(batch_size, now):
+    """
+    Claim up to `batch_size` due tasks by pushing their run_at forward with
+    a conditional UPDATE, so concurrent workers never run the same task
+    while one is working on it.
+    """
+    lease = now + timedelta(seconds=getattr(settings, 'TASK_CLAIM_TIMEOUT', 5 * 60))
+    claim_token = uuid.uuid4()
+    due = Task.objects.filter(status='pending', run_at__lte=now)
+    ids = list(due.order_by('run_at', 'id').values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+    due.filter(id__in=ids).update(run_at=lease, claim_token=claim_token)
+    # Only rows stamped with this batch's token belong to it
+    return list(Task.objects.filter(id__in=ids, claim_token=claim_token).order_by('id'))
+
+
+def run_task(queued):
+    """Run one claimed task and record the outcome; True when it succeeded"""
+    func = _registry.get(queued.name)
+    try:
+        if func is None:
+            raise LookupError(f'No task named {queued.name!r}')
+        with transaction.atomic():
+            func(*queued.args, **queued.kwargs)
+            Task.objects.filter(pk=queued.pk).update(status='done', finished_at=timezone.now())
+        return True
+    except Exception as exc:
+        logger.warning('Task %s #%s failed: %s', queued.name, queued.pk, exc)
+        queued.attempts += 1
+        queued.last_error = f'{type(exc).__name__}: {exc}'
+        if queued.attempts >= queued.max_attempts or func is None:
+            queued.status, queued.finished_at = 'failed', timezone.now()
+        else:
+            queued.run_at = timezone.now() + timedelta(seconds=retry_delay(queued.attempts))
+        queued.save(update_fields=['attempts', 'last_error', 'status', 'finished_at', 'run_at'])
+        return False
+
+
+def run_due_tasks(batch_size=None):
+    """Claim and run one batch of due tasks. Returns counts of tasks, done and failed attempts."""
+    batch_size = batch_size or getattr(settings, 'TASK_BATCH_SIZE', 100)
+    stats = {'tasks': 0, 'done': 0, 'failed': 0}
+    for queued in claim_due(batch_size, timezone.now()):
+        stats['tasks'] += 1
+        stats['done' if run_task(queued) else 'failed'] += 1
+    return stats
+
+
+def prune_tasks(now=None):
+    """Delete tasks done more than TASK_RETENTION seconds ago; returns how many"""
+    cutoff = (now or timezone.now()) - timedelta(seconds=getattr(settings, 'TASK_RETENTION', 7 * 24 * 60 * 60))
+    deleted, _ = Task.objects.filter(status='done', finished_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,154 @@
+"""
+Campus (tenant) partitioning.
+
+Student, Teacher, Management, Course, Class and AttendanceSession carry a
+tenant key, leading their composite indexes and uniqueness constraints
+(an RFID or scanner id is unique within a campus). Other rows belong to
+the tenant of the student, session or course they hang off.
+
+Each request has a current tenant:
+- A validated access token's tenant claim, added at login (see
+  core.authentication).
+- Otherwise the tenant of the host, resolved by TenantMiddleware on first
+  use: the tenant whose `domain` it is, else the DEFAULT_TENANT_SLUG
+  tenant. Lookups are cached until a Tenant is saved or deleted.
+
+The API reads through tenant_scope() (TenantScopedMixin for viewsets), so
+a campus's queries only touch its own index ranges, and new rows default
+to the current tenant. Outside a request (management commands, tasks)
+there is no current tenant and nothing is filtered; use_tenant() scopes a
+block explicitly.
+"""
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.http.request import split_domain_port
+
+_current = ContextVar('tenant', default=None)
+_default_tenant_id = None
+
+
+def get_current_tenant():
+    """Id of the current tenant, or None outside one"""
+    tenant_id = _current.get()
+    if callable(tenant_id):
+        # Resolved on first use, see TenantMiddleware
+        tenant_id = tenant_id()
+        _current.set(tenant_id)
+    return tenant_id
+
+
+class use_tenant(ContextDecorator):
+    """Make `tenant_id` current for a block"""
+
+    def __init__(self, tenant_id):
+        self.tenant_id = tenant_id
+
+    def __enter__(self):
+        self._token = _current.set(self.tenant_id)
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._token)
+        return False
+
+
+def activate(tenant_id):
+    """Make `tenant_id` current for the rest of the request (TenantMiddleware restores the previous one)"""
+    _current.set(tenant_id)
+
+
+def default_tenant_id():
+    """Id of the DEFAULT_TENANT_SLUG tenant, created on first use"""
+    global _default_tenant_id
+    if _default_tenant_id is None:
+        from .models import Tenant
+        slug = getattr(settings, 'DEFAULT_TENANT_SLUG', 'default')
+        _default_tenant_id = Tenant.objects.get_or_create(slug=slug, defaults={'name': slug.capitalize()})[0].pk
+    return _default_tenant_id
+
+
+def tenant_default():
+    """Default of the tenant keys: the current tenant, else the default one"""
+    tenant_id = get_current_tenant()
+    return default_tenant_id() if tenant_id is None else tenant_id
+
+
+def _reset_default_tenant(setting, **kwargs):
+    global _default_tenant_id
+    if setting == 'DEFAULT_TENANT_SLUG':
+        _default_tenant_id = None
+
+
+setting_changed.connect(_reset_default_tenant)
+
+
+def tenant_for_host(host):
+    """
+    Id of the tenant of a request host: the tenant whose domain it is, else
+    the default tenant. Cached until a Tenant is saved or deleted.
+    """
+    from .caching import get_model_versions
+    from .models import Tenant
+    domain, _ = split_domain_port(host)
+    version, = get_model_versions([Tenant])
+    key = f'tenant-host:{version}:{domain}'
+    tenant_id = cache.get(key)
+    if tenant_id is None:
+        tenant_id = Tenant.objects.filter(domain=domain).values_list('pk', flat=True).first() or default_tenant_id()
+        cache.set(key, tenant_id, getattr(settings, 'TENANT_CACHE_TIMEOUT', 5 * 60))
+    return tenant_id
+
+
+def tenant_scope(queryset, tenant_field='tenant'):
+    """`queryset` limited to the current tenant through `tenant_field`; unchanged without one"""
+    tenant_id = get_current_tenant()
+    if tenant_id is None:
+        return queryset
+    return queryset.filter(**{f'{tenant_field}_id': tenant_id})
+
+
+def is_tenant_model(model):
+    return any(field.name == 'tenant' for field in model._meta.concrete_fields)
+
+
+class TenantMiddleware:
+    """
+    Makes the tenant of the request's host current while the request is
+    handled. It is looked up on first use, so requests authenticated with a
+    tenant claim, or never reading tenant data, skip the lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        host = request.get_host()
+        token = _current.set(lambda: tenant_for_host(host))
+        try:
+            return self.get_response(request)
+        finally:
+            _current.reset(token)
+
+
+class TenantScopedMixin:
+    """
+    ViewSet mixin limiting every queryset it serves, and the choices of its
+    serializers' related fields, to the current tenant. `tenant_field` is
+    the path from the viewset's model to its tenant key.
+    """
+    tenant_field = 'tenant'
+
+    def filter_queryset(self, queryset):
+        return tenant_scope(super().filter_queryset(queryset), self.tenant_field)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        for field in getattr(serializer, 'fields', {}).values():
+            queryset = getattr(field, 'queryset', None)
+            if queryset is not None and is_tenant_model(queryset.model):
+                field.queryset = tenant_scope(queryset)
+        return serializer
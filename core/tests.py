@@ -1,11 +1,12 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth.models import User
 from .models import (
     Student, Teacher, Management, Course, Class, TaughtCourse, StudentCourse,
-    UpdateAttendanceRequest, AttendanceSession, AttendanceRecord
+    UpdateAttendanceRequest, AttendanceSession, AttendanceRecord, ScanEvent,
+    ArchivedAttendanceSession, ArchivedAttendanceRecord
 )
 
 
@@ -1401,3 +1402,2500 @@ class AttendanceSessionStatisticsTestCase(APITestCase):
         self.assertEqual(response.data['statistics']['qr_only'], 1)
 
 
+
+
+# ============ Stateless JWT Authentication Tests ============
+
+class StatelessJWTAuthenticationTestCase(APITestCase):
+    """Test that access tokens carry role claims and skip the User lookup"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='management@test.com',
+            email='management@test.com',
+            password='TestPass123!'
+        )
+        self.management = Management.objects.create(
+            user=self.user,
+            email='management@test.com',
+            Management_name='Test Management'
+        )
+        response = self.client.post(reverse('management-login'), {
+            'email': 'management@test.com',
+            'password': 'TestPass123!'
+        }, format='json')
+        self.access = response.data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+    def test_token_carries_role_claims(self):
+        """Test the access token contains role and profile id"""
+        from rest_framework_simplejwt.tokens import AccessToken
+        token = AccessToken(self.access)
+        self.assertEqual(token['role'], 'management')
+        self.assertEqual(token['profile_id'], self.management.Management_id)
+
+    def test_authenticated_request_does_not_load_user(self):
+        """Test only the list query runs for a token-authenticated request"""
+        Course.objects.create(course_name='Test Course')
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('course-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_approve_uses_profile_claim(self):
+        """Test management can approve with a token and no profile lookup"""
+        teacher = Teacher.objects.create(teacher_name='T', email='t@test.com', rfid='RFID_T')
+        student = Student.objects.create(
+            student_name='S', email='s@test.com', rfid='RFID_S', year=1, dept='CS', section='A'
+        )
+        course = Course.objects.create(course_name='Test Course')
+        request = UpdateAttendanceRequest.objects.create(
+            teacher=teacher, student=student, course=course, classes_to_add='Class A'
+        )
+        response = self.client.post(reverse('updateattendancerequest-approve', args=[request.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        request.refresh_from_db()
+        self.assertEqual(request.processed_by, self.management)
+
+    def test_student_token_cannot_approve(self):
+        """Test role permission rejects other roles from the token claims"""
+        from .authentication import tokens_for_profile
+        student_user = User.objects.create_user(username='s@test.com', email='s@test.com', password='x')
+        student = Student.objects.create(
+            user=student_user, student_name='S', email='s@test.com', rfid='RFID_S',
+            year=1, dept='CS', section='A'
+        )
+        access = tokens_for_profile(student_user, 'student', student.student_id).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = self.client.post(reverse('updateattendancerequest-approve', args=[1]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_logout_revokes_token(self):
+        """Test tokens stop working after logout"""
+        response = self.client.post(reverse('api-logout'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse('course-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_token_rejected(self):
+        """Test tokens stop working once the user is deactivated"""
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse('course-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_survives_cache_flush(self):
+        """Test revocations are reloaded from the database into a cold cache"""
+        from django.core.cache import cache
+        response = self.client.post(reverse('api-logout'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        cache.clear()
+        response = self.client.get(reverse('course-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_covers_refresh_tokens(self):
+        """Test tokens minted from an earlier refresh token stay revoked past the access token lifetime"""
+        import time
+        from unittest import mock
+        from .authentication import tokens_for_profile, revoke_user_tokens
+        refresh = tokens_for_profile(self.user, 'management', self.management.Management_id)
+        revoke_user_tokens(self.user.id)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        with mock.patch('time.time', return_value=time.time() + 2 * 60 * 60):
+            response = self.client.get(reverse('course-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_process_local_cache_refused(self):
+        """Test revocation refuses a per-process cache unless a single worker is declared"""
+        from django.core.exceptions import ImproperlyConfigured
+        from .authentication import check_revocation_cache
+        with self.settings(ALLOW_PROCESS_LOCAL_CACHE=False):
+            with self.assertRaises(ImproperlyConfigured):
+                check_revocation_cache()
+            with self.settings(JWT_REVOCATION_CHECK=False):
+                check_revocation_cache()
+        check_revocation_cache()
+
+
+class UnifiedLoginTestCase(APITestCase):
+    """Test the role-aware login pipeline and failed login throttling"""
+
+    def setUp(self):
+        from .throttling import login_throttle
+        login_throttle.reset()
+        self.addCleanup(login_throttle.reset)
+        self.user = User.objects.create_user(
+            username='teacher@test.com',
+            email='teacher@test.com',
+            password='TestPass123!'
+        )
+        self.teacher = Teacher.objects.create(
+            user=self.user, teacher_name='Test Teacher', email='teacher@test.com', rfid='RFID001'
+        )
+        self.url = reverse('login')
+
+    def test_login_resolves_role(self):
+        """Test the unified endpoint picks the user's profile"""
+        response = self.client.post(self.url, {
+            'email': 'teacher@test.com',
+            'password': 'TestPass123!'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user_type'], 'teacher')
+        self.assertEqual(response.data['teacher_id'], self.teacher.teacher_id)
+
+    def test_login_with_wrong_user_type(self):
+        """Test asking for a role the user lacks returns 404"""
+        response = self.client.post(self.url, {
+            'email': 'teacher@test.com',
+            'password': 'TestPass123!',
+            'user_type': 'student'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_profile_resolved_in_one_query(self):
+        """Test the user and profile are loaded with a single query"""
+        from .authentication import resolve_login
+        with self.assertNumQueries(1):
+            user, role, profile = resolve_login('teacher@test.com', 'TestPass123!')
+        self.assertEqual(role, 'teacher')
+        self.assertEqual(profile, self.teacher)
+
+    def test_failed_logins_are_throttled(self):
+        """Test repeated failures are refused before checking the password"""
+        for _ in range(5):
+            response = self.client.post(self.url, {
+                'email': 'teacher@test.com',
+                'password': 'WrongPassword123!'
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post(self.url, {
+            'email': 'teacher@test.com',
+            'password': 'TestPass123!'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+    def test_template_login_page(self):
+        """Test the template login page uses the same pipeline"""
+        response = self.client.post(reverse('teacher-login-page'), {
+            'email': 'teacher@test.com',
+            'password': 'TestPass123!'
+        })
+        self.assertRedirects(response, reverse('teacher-dashboard'))
+
+
+# ============ Response Cache Tests ============
+
+class ReferenceDataCacheTestCase(AuthenticatedAPITestCase):
+    """Test cached responses for read-mostly reference data endpoints"""
+
+    def setUp(self):
+        super().setUp()
+        self.teacher = Teacher.objects.create(teacher_name='Test Teacher', email='t@test.com', rfid='RFID001')
+        self.course = Course.objects.create(course_name='Test Course')
+        TaughtCourse.objects.create(course=self.course, teacher=self.teacher, classes_taken='Class A')
+
+    def test_repeat_fetch_served_from_cache(self):
+        """Test a repeat fetch does not query the database"""
+        url = reverse('course-list')
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        """Test a matching ETag gets 304 Not Modified"""
+        url = reverse('taughtcourse-list')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_query_params_are_part_of_key(self):
+        """Test different filters get different cache entries"""
+        url = reverse('taughtcourse-list')
+        self.assertEqual(len(self.client.get(url).json()), 1)
+        self.assertEqual(len(self.client.get(url, {'teacher': self.teacher.teacher_id + 1}).json()), 0)
+
+    def test_write_invalidates_cache(self):
+        """Test saving a model invalidates dependent responses"""
+        url = reverse('course-list')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.create(course_name='Another Course')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_related_model_change_invalidates_cache(self):
+        """Test renaming a teacher invalidates cached taught courses"""
+        url = reverse('taughtcourse-list')
+        self.client.get(url)
+        self.teacher.teacher_name = 'Renamed Teacher'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher.save()
+        response = self.client.get(url)
+        self.assertEqual(response.json()[0]['teacher_name'], 'Renamed Teacher')
+
+    def test_version_bumped_only_on_commit(self):
+        """Test a write does not bump the version stamp until it commits"""
+        from core.caching import get_model_versions
+        before, = get_model_versions([Course])
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.create(course_name='Another Course')
+            # A reader here still sees the old rows, so must keep the old stamp
+            self.assertEqual(get_model_versions([Course]), [before])
+        self.assertNotEqual(get_model_versions([Course]), [before])
+
+    def test_process_local_cache_bypassed(self):
+        """Test responses are not cached in a cache other workers cannot invalidate"""
+        url = reverse('course-list')
+        with self.settings(ALLOW_PROCESS_LOCAL_CACHE=False):
+            self.client.get(url)
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+
+
+# ============ Fast List Path Tests ============
+
+class FastListPathTestCase(AuthenticatedAPITestCase):
+    """Test the values_list() list path matches the model serializers"""
+
+    def setUp(self):
+        super().setUp()
+        from django.utils import timezone
+        management = Management.objects.create(Management_name='Mgmt', email='m@test.com')
+        self.teacher = Teacher.objects.create(teacher_name='Tëacher  ', email='t@test.com', rfid='RFID_T')
+        self.course = Course.objects.create(course_name='Cöurse')
+        self.students = [
+            Student.objects.create(
+                student_name=f'Student {i}', email=f's{i}@test.com' if i else None,
+                rfid=f'RFID_{i}', overall_attendance=12.5 * i, year=1, dept='CS', section='A'
+            )
+            for i in range(3)
+        ]
+        TaughtCourse.objects.create(course=self.course, teacher=self.teacher, classes_taken='Class A', year=1)
+        StudentCourse.objects.create(
+            student=self.students[0], course=self.course, teacher=self.teacher, classes_attended='2025-01-01'
+        )
+        UpdateAttendanceRequest.objects.create(
+            teacher=self.teacher, student=self.students[0], course=self.course, classes_to_add='Class A'
+        )
+        UpdateAttendanceRequest.objects.create(
+            teacher=self.teacher, student=self.students[1], course=self.course, classes_to_add='Class B',
+            status='approved', processed_by=management, processed_at=timezone.now()
+        )
+        session = AttendanceSession.objects.create(
+            teacher=self.teacher, course=self.course, section='A', year=1, qr_code_token='fast_token'
+        )
+        AttendanceRecord.objects.create(
+            session=session, student=self.students[0], rfid_scanned=True, rfid_scanned_at=timezone.now(),
+            qr_scanned=True, qr_scanned_at=timezone.now(), is_present=True, marked_present_at=timezone.now()
+        )
+        AttendanceRecord.objects.create(session=session, student=self.students[1])
+
+    def assertSameAsSerializer(self, url):
+        from django.core.cache import cache
+        from django.test import override_settings
+        fast = self.client.get(url)
+        cache.clear()
+        with override_settings(FAST_LIST_ENDPOINTS=False):
+            slow = self.client.get(url)
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast['Content-Type'], slow['Content-Type'])
+        self.assertEqual(fast.content, slow.content)
+
+    def test_students_match(self):
+        self.assertSameAsSerializer(reverse('student-list'))
+
+    def test_taught_courses_match(self):
+        self.assertSameAsSerializer(reverse('taughtcourse-list') + '?teacher=%d' % self.teacher.teacher_id)
+
+    def test_student_courses_match(self):
+        self.assertSameAsSerializer(reverse('studentcourse-list'))
+
+    def test_update_attendance_requests_match(self):
+        self.assertSameAsSerializer(reverse('updateattendancerequest-list'))
+
+    def test_attendance_sessions_match(self):
+        self.assertSameAsSerializer(reverse('attendancesession-list'))
+
+    def test_attendance_records_match(self):
+        self.assertSameAsSerializer(reverse('attendancerecord-list'))
+
+    def test_attendance_records_single_query(self):
+        """Test the fast path loads records with joined names in one query"""
+        with self.assertNumQueries(1):
+            self.client.get(reverse('attendancerecord-list'))
+
+
+# ============ JSON Renderer/Parser Tests ============
+
+class FastJSONRendererTestCase(TestCase):
+    """Test the orjson renderer/parser agree with DRF's stdlib implementation"""
+
+    def payload(self):
+        import datetime
+        import decimal
+        from django.utils import timezone
+        from django.utils.translation import gettext_lazy
+        return {
+            'aware': timezone.now(),
+            'naive': datetime.datetime(2025, 1, 2, 3, 4, 5, 678901),
+            'date': datetime.date(2025, 1, 2),
+            'time': datetime.time(9, 30),
+            'decimal': decimal.Decimal('12.50'),
+            'text': 'Ünïcode   line separator',
+            'lazy': gettext_lazy('Attendance'),
+            'float': 87.5,
+            'nested': [{1: 'int key', 'none': None, 'flag': True}],
+        }
+
+    def test_render_matches_stdlib(self):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        data = self.payload()
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_render_without_orjson(self):
+        from unittest import mock
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        data = self.payload()
+        with mock.patch('core.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_non_finite_floats_render_alike(self):
+        """Test NaN and infinities render as null with and without orjson"""
+        from unittest import mock
+        from .renderers import FastJSONRenderer
+        data = {'rate': float('nan'), 'rates': [float('inf'), -float('inf'), 1.5], 'wide': 2 ** 70}
+        expected = b'{"rate":null,"rates":[null,null,1.5],"wide":1180591620717411303424}'
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        self.assertEqual(FastJSONRenderer().render({**data, 'wide': 1}), expected.replace(b'1180591620717411303424', b'1'))
+        with mock.patch('core.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data), expected)
+
+    def test_exponent_floats_differ_in_notation_only(self):
+        """Test floats outside plain decimal range are written differently, with the same value"""
+        import json
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer, orjson
+        if orjson is None:
+            self.skipTest('orjson is not installed')
+        data = {'large': 1e16, 'small': 2.5e-05}
+        self.assertEqual(FastJSONRenderer().render(data), b'{"large":1e16,"small":0.000025}')
+        self.assertEqual(JSONRenderer().render(data), b'{"large":1e+16,"small":2.5e-05}')
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+    def test_indented_render_falls_back(self):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        data = {'a': [1, 2]}
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type)
+        )
+
+    def test_parse(self):
+        import io
+        from .renderers import FastJSONParser
+        data = FastJSONParser().parse(io.BytesIO('{"name": "Ünïcode", "year": 1}'.encode()))
+        self.assertEqual(data, {'name': 'Ünïcode', 'year': 1})
+
+    def test_parse_error(self):
+        import io
+        from rest_framework.exceptions import ParseError
+        from .renderers import FastJSONParser
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"year": NaN}'))
+
+
+# ============ Bulk Approve/Reject Tests ============
+
+class BulkProcessAttendanceRequestTestCase(APITestCase):
+    """Test set-based bulk approval and rejection of update requests"""
+
+    def setUp(self):
+        self.management_user = User.objects.create_user(
+            username='management@test.com', email='management@test.com', password='TestPass123!'
+        )
+        self.management = Management.objects.create(
+            user=self.management_user, email='management@test.com', Management_name='Test Management'
+        )
+        self.teacher = Teacher.objects.create(teacher_name='Teacher 1', email='t1@test.com', rfid='RFID_T1')
+        self.other_teacher = Teacher.objects.create(teacher_name='Teacher 2', email='t2@test.com', rfid='RFID_T2')
+        self.course = Course.objects.create(course_name='Test Course')
+        self.students = [
+            Student.objects.create(
+                student_name=f'Student {i}', email=f's{i}@test.com', rfid=f'RFID_{i}',
+                year=1, dept='CS', section='A'
+            )
+            for i in range(3)
+        ]
+        StudentCourse.objects.create(
+            student=self.students[0], course=self.course, teacher=self.teacher, classes_attended='Class A'
+        )
+        self.requests = [
+            UpdateAttendanceRequest.objects.create(
+                teacher=self.teacher, student=student, course=self.course, classes_to_add=f'Class {n}'
+            )
+            for n, student in enumerate(self.students, start=1)
+        ]
+        self.second_request = UpdateAttendanceRequest.objects.create(
+            teacher=self.teacher, student=self.students[0], course=self.course, classes_to_add='Class 9'
+        )
+        self.other_request = UpdateAttendanceRequest.objects.create(
+            teacher=self.other_teacher, student=self.students[1], course=self.course, classes_to_add='Class X'
+        )
+        self.url = reverse('updateattendancerequest-bulk-process')
+        self.client.force_authenticate(user=self.management_user)
+
+    def test_bulk_approve_by_ids(self):
+        """Test approving by ids reports per-id results and updates attendance"""
+        self.requests[2].status = 'rejected'
+        self.requests[2].save()
+        ids = [self.requests[0].id, self.second_request.id, self.requests[1].id, self.requests[2].id, 99999]
+        response = self.client.post(self.url, {'action': 'approve', 'ids': ids}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['processed'], 3)
+        self.assertEqual([r['result'] for r in response.data['results']], [
+            'approved', 'approved', 'approved', 'already_rejected', 'not_found'
+        ])
+        existing = StudentCourse.objects.get(student=self.students[0])
+        self.assertEqual(existing.classes_attended, 'Class A, Class 1, Class 9')
+        created = StudentCourse.objects.get(student=self.students[1])
+        self.assertEqual(created.classes_attended, 'Class 2')
+        self.requests[0].refresh_from_db()
+        self.assertEqual(self.requests[0].processed_by, self.management)
+
+    def test_bulk_reject_by_filter(self):
+        """Test rejecting every pending request of one teacher"""
+        response = self.client.post(self.url, {
+            'action': 'reject', 'teacher': self.teacher.teacher_id, 'status': 'pending'
+        }, format='json')
+        self.assertEqual(response.data['processed'], 4)
+        self.assertEqual(UpdateAttendanceRequest.objects.filter(status='rejected').count(), 4)
+        self.other_request.refresh_from_db()
+        self.assertEqual(self.other_request.status, 'pending')
+        self.assertEqual(StudentCourse.objects.get(student=self.students[0]).classes_attended, 'Class A')
+
+    def test_overlapping_batches_apply_once(self):
+        """Test a request in two batches is only applied by the first"""
+        self.client.post(self.url, {'action': 'approve', 'ids': [self.requests[0].id]}, format='json')
+        response = self.client.post(self.url, {
+            'action': 'approve', 'ids': [self.requests[0].id, self.requests[1].id]
+        }, format='json')
+        self.assertEqual([r['result'] for r in response.data['results']], ['already_approved', 'approved'])
+        self.assertEqual(
+            StudentCourse.objects.get(student=self.students[0]).classes_attended, 'Class A, Class 1'
+        )
+
+    def test_ids_outside_the_filters_reported_separately(self):
+        """Test an existing id excluded by the teacher filter is not reported as missing"""
+        response = self.client.post(self.url, {
+            'action': 'approve', 'ids': [self.requests[0].id, self.other_request.id, 99999],
+            'teacher': self.teacher.teacher_id
+        }, format='json')
+        self.assertEqual([r['result'] for r in response.data['results']], ['approved', 'filtered_out', 'not_found'])
+        self.other_request.refresh_from_db()
+        self.assertEqual(self.other_request.status, 'pending')
+
+    def test_batch_reads_back_only_its_claims(self):
+        """Test a request claimed by another batch at the same instant is not taken for this one's"""
+        from unittest import mock
+        from django.utils import timezone
+        from .attendance import process_attendance_requests
+        now = timezone.now()
+        candidates = [self.requests[0].id, self.requests[1].id]
+
+        def select_candidates(*args, **kwargs):
+            # Another batch claims the first candidate before this one's UPDATE
+            UpdateAttendanceRequest.objects.filter(id=candidates[0]).update(
+                status='approved', processed_at=now, processed_by=self.management
+            )
+            return candidates
+
+        queryset = mock.Mock()
+        queryset.filter.return_value.order_by.return_value.values_list.side_effect = select_candidates
+        with mock.patch('core.attendance.timezone.now', return_value=now):
+            processed = process_attendance_requests(queryset, True, self.management.Management_id)
+        self.assertEqual(processed, [self.requests[1].id])
+
+    def test_query_count_does_not_grow_with_batch(self):
+        """Test the batch is applied with a fixed number of queries"""
+        from .attendance import process_attendance_requests
+        # select, claim, read back, student courses (select, update, insert), event log, outbox + savepoint
+        with self.assertNumQueries(10):
+            processed = process_attendance_requests(
+                UpdateAttendanceRequest.objects.all(), True, self.management.Management_id
+            )
+        self.assertEqual(len(processed), 5)
+
+    def test_requires_ids_or_filter(self):
+        response = self.client.post(self.url, {'action': 'approve'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_non_management_cannot_bulk_process(self):
+        regular_user = User.objects.create_user(username='regular@test.com', password='TestPass123!')
+        self.client.force_authenticate(user=regular_user)
+        response = self.client.post(self.url, {'action': 'approve', 'ids': [self.requests[0].id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PendingRequestQueueTestCase(APITestCase):
+    """Test the management queue of pending update requests"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.management_user = User.objects.create_user(
+            username='management@test.com', email='management@test.com', password='TestPass123!'
+        )
+        self.management = Management.objects.create(
+            user=self.management_user, email='management@test.com', Management_name='Test Management'
+        )
+        self.teacher = Teacher.objects.create(teacher_name='Teacher 1', email='t1@test.com', rfid='RFID_T1')
+        self.other_teacher = Teacher.objects.create(teacher_name='Teacher 2', email='t2@test.com', rfid='RFID_T2')
+        self.course = Course.objects.create(course_name='Test Course')
+        self.student = Student.objects.create(
+            student_name='Student', email='s@test.com', rfid='RFID_S', year=1, dept='CS', section='A'
+        )
+        self.requests = [
+            UpdateAttendanceRequest.objects.create(
+                teacher=self.teacher, student=self.student, course=self.course, classes_to_add=f'Class {n}'
+            )
+            for n in range(5)
+        ]
+        self.other_request = UpdateAttendanceRequest.objects.create(
+            teacher=self.other_teacher, student=self.student, course=self.course, classes_to_add='Class X'
+        )
+        UpdateAttendanceRequest.objects.create(
+            teacher=self.teacher, student=self.student, course=self.course,
+            classes_to_add='Done', status='approved'
+        )
+        self.queue_url = reverse('updateattendancerequest-queue')
+        self.count_url = reverse('updateattendancerequest-pending-count')
+        self.client.force_authenticate(user=self.management_user)
+
+    def test_queue_groups(self):
+        """Test the first page carries pending counts per teacher and course"""
+        response = self.client.get(self.queue_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(g['teacher'], g['course'], g['pending']) for g in response.data['groups']],
+            [(self.teacher.teacher_id, self.course.course_id, 5),
+             (self.other_teacher.teacher_id, self.course.course_id, 1)]
+        )
+        self.assertEqual(response.data['groups'][0]['teacher_name'], 'Teacher 1')
+
+    def test_queue_keyset_pages(self):
+        """Test following next_cursor walks every pending request once, oldest first"""
+        seen = []
+        response = self.client.get(self.queue_url, {'limit': 2, 'teacher': self.teacher.teacher_id})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(r['id'] for r in response.data['results'])
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+            response = self.client.get(self.queue_url, {
+                'limit': 2, 'teacher': self.teacher.teacher_id, 'cursor': cursor
+            })
+            self.assertNotIn('groups', response.data)
+
+        self.assertEqual(seen, [r.id for r in self.requests])
+
+    def test_queue_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        response = self.client.get(self.queue_url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_queue_invalid_params(self):
+        """Test non-integer filters and out of range cursor ids are rejected, not a server error"""
+        import base64
+        for params in ({'teacher': 'abc'}, {'course': '1.5'}, {'limit': 'ten'},
+                       {'cursor': base64.urlsafe_b64encode(b'2024-01-01T00:00:00+00:00|99999999999999999999').decode()}):
+            response = self.client.get(self.queue_url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+        response = self.client.get(self.queue_url, {'teacher': 'abc'})
+        self.assertEqual(response.data['error'], 'teacher must be an integer')
+
+    def test_pending_count_tracks_writes(self):
+        """Test the cached counter follows creates, approvals and deletes"""
+        response = self.client.get(self.count_url)
+        self.assertEqual(response.data['pending'], 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UpdateAttendanceRequest.objects.create(
+                teacher=self.teacher, student=self.student, course=self.course, classes_to_add='Class 7'
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('updateattendancerequest-approve', args=[self.requests[0].id]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_request.delete()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.count_url)
+        self.assertEqual(response.data['pending'], 5)
+        self.assertEqual(UpdateAttendanceRequest.objects.filter(status='pending').count(), 5)
+
+    def test_queue_requires_management(self):
+        """Test teachers cannot read the queue or the count"""
+        teacher_user = User.objects.create_user(username='t@test.com', email='t@test.com', password='TestPass123!')
+        self.teacher.user = teacher_user
+        self.teacher.save()
+        self.client.force_authenticate(user=teacher_user)
+
+        self.assertEqual(self.client.get(self.queue_url).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get(self.count_url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ScanEventReplayTestCase(APITestCase):
+    """Test the scan event log and rebuilding attendance from it"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='student@test.com', email='student@test.com', password='TestPass123!')
+        self.teacher = Teacher.objects.create(teacher_name='Test Teacher', email='teacher@test.com', rfid='RFID001')
+        self.course = Course.objects.create(course_name='Test Course')
+        TaughtCourse.objects.create(course=self.course, teacher=self.teacher, classes_taken='C1, C2, C3, C4')
+        self.students = [
+            Student.objects.create(
+                student_name=f'Student {i}', email=f's{i}@test.com', rfid=f'RFID_S{i}', year=1, dept='CS', section='A'
+            )
+            for i in range(2)
+        ]
+        self.student = self.students[0]
+        self.student.user = self.user
+        self.student.save()
+        self.session = AttendanceSession.objects.create(
+            teacher=self.teacher, course=self.course, section='A', year=1, qr_code_token='replay_token'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def scan(self, student, rfid=True, qr=True):
+        if rfid:
+            self.client.post(reverse('rfid-scan'), {'rfid': student.rfid, 'session_id': self.session.id}, format='json')
+        if qr:
+            self.client.post(reverse('qr-scan'), {'qr_token': 'replay_token', 'student_id': student.student_id}, format='json')
+
+    def snapshot(self):
+        records = list(AttendanceRecord.objects.order_by('student_id').values(
+            'student_id', 'rfid_scanned', 'rfid_scanned_at', 'qr_scanned', 'qr_scanned_at', 'is_present', 'marked_present_at'
+        ))
+        courses = dict(StudentCourse.objects.values_list('student_id', 'classes_attended'))
+        return records, courses
+
+    def test_scans_are_logged(self):
+        """Test each accepted scan appends one event"""
+        self.scan(self.student)
+        self.client.post(reverse('rfid-scan'), {'rfid': 'UNKNOWN', 'session_id': self.session.id}, format='json')
+
+        self.assertEqual(
+            list(ScanEvent.objects.order_by('id').values_list('kind', 'student_id', 'session_id')),
+            [(ScanEvent.RFID, self.student.student_id, self.session.id),
+             (ScanEvent.QR, self.student.student_id, self.session.id)]
+        )
+
+    def test_replay_rebuilds_corrupted_state(self):
+        """Test replay restores records, classes attended and overall attendance"""
+        from .attendance import process_attendance_requests
+        from .replay import AttendanceReplay
+
+        self.scan(self.students[0])
+        self.scan(self.students[1], qr=False)
+        request = UpdateAttendanceRequest.objects.create(
+            teacher=self.teacher, student=self.students[0], course=self.course, classes_to_add='C1'
+        )
+        process_attendance_requests(UpdateAttendanceRequest.objects.filter(pk=request.pk), True, None)
+        expected = self.snapshot()
+
+        AttendanceRecord.objects.all().delete()
+        StudentCourse.objects.update(classes_attended='corrupted')
+        AttendanceReplay(chunk_size=1).run()
+
+        self.assertEqual(self.snapshot(), expected)
+        self.assertEqual(expected[1][self.students[0].student_id], f"{self.session.started_at:%Y-%m-%d}, C1")
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.overall_attendance, 50.0)
+
+    def test_replay_keeps_baseline(self):
+        """Test classes attended from before the log are kept and extended"""
+        from django.utils import timezone
+        from .replay import AttendanceReplay
+
+        student_course = StudentCourse.objects.create(
+            student=self.student, course=self.course, teacher=self.teacher, classes_attended='Old 1, Old 2'
+        )
+        ScanEvent.objects.create(
+            kind=ScanEvent.BASELINE, occurred_at=timezone.now(), student=self.student,
+            course=self.course, teacher=self.teacher, classes='Old 1, Old 2'
+        )
+        self.scan(self.student)
+        student_course.classes_attended = ''
+        student_course.save()
+
+        stats = AttendanceReplay().run()
+
+        student_course.refresh_from_db()
+        self.assertEqual(student_course.classes_attended, f"Old 1, Old 2, {self.session.started_at:%Y-%m-%d}")
+        self.assertEqual(stats['events'], 3)
+
+    def test_replay_after_archiving(self):
+        """Test archived sessions still credit StudentCourse and keep their records"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .archive import archive_sessions
+        from .replay import AttendanceReplay
+
+        self.scan(self.student)
+        self.session.status = 'stopped'
+        self.session.save()
+        archive_sessions(timezone.now() + timedelta(days=1))
+        StudentCourse.objects.update(classes_attended='')
+
+        AttendanceReplay().run()
+
+        self.assertEqual(StudentCourse.objects.get().classes_attended, f"{self.session.started_at:%Y-%m-%d}")
+        self.assertFalse(AttendanceRecord.objects.exists())
+        self.assertTrue(ArchivedAttendanceRecord.objects.get().is_present)
+
+    def test_dry_run_writes_nothing(self):
+        """Test the command reports without changing data"""
+        from io import StringIO
+        from django.core.management import call_command
+
+        self.scan(self.student)
+        AttendanceRecord.objects.all().delete()
+        out = StringIO()
+        call_command('replay_attendance', '--dry-run', stdout=out)
+
+        self.assertIn('records: 1', out.getvalue())
+        self.assertFalse(AttendanceRecord.objects.exists())
+
+
+class AttendanceArchiveTestCase(APITestCase):
+    """Test archiving old sessions and reading them back through the API"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        self.user = User.objects.create_user(username='reader@test.com', password='TestPass123!')
+        self.teacher = Teacher.objects.create(teacher_name='Test Teacher', email='teacher@test.com', rfid='RFID001')
+        self.course = Course.objects.create(course_name='Test Course')
+        self.students = [
+            Student.objects.create(
+                student_name=f'Student {i}', email=f's{i}@test.com', rfid=f'RFID_S{i}', year=1, dept='CS', section='A'
+            )
+            for i in range(2)
+        ]
+        now = timezone.now()
+        self.cutoff = now - timedelta(days=30)
+        self.old = self.create_session('old', now - timedelta(days=60), 'stopped')
+        self.recent = self.create_session('recent', now - timedelta(days=1), 'stopped')
+        self.old_active = self.create_session('old_active', now - timedelta(days=60), 'active')
+        self.client.force_authenticate(user=self.user)
+
+    def create_session(self, token, started_at, session_status):
+        session = AttendanceSession.objects.create(
+            teacher=self.teacher, course=self.course, section='A', year=1, qr_code_token=token, status=session_status
+        )
+        AttendanceSession.objects.filter(pk=session.pk).update(started_at=started_at)
+        AttendanceRecord.objects.create(
+            session=session, student=self.students[0], rfid_scanned=True, rfid_scanned_at=started_at,
+            qr_scanned=True, qr_scanned_at=started_at, is_present=True, marked_present_at=started_at
+        )
+        AttendanceRecord.objects.create(session=session, student=self.students[1], rfid_scanned=True, rfid_scanned_at=started_at)
+        return session
+
+    def test_archives_only_old_stopped_sessions(self):
+        from .archive import archive_sessions, term_for
+
+        moved = archive_sessions(self.cutoff, chunk_size=1)
+
+        self.assertEqual(moved, {'sessions': 1, 'records': 2})
+        self.assertEqual(
+            set(AttendanceSession.objects.values_list('id', flat=True)), {self.recent.id, self.old_active.id}
+        )
+        archived = ArchivedAttendanceSession.objects.get()
+        self.assertEqual(archived.id, self.old.id)
+        self.assertEqual(archived.term, term_for(archived.started_at))
+        self.assertEqual(ArchivedAttendanceRecord.objects.filter(session=archived).count(), 2)
+        self.assertFalse(AttendanceRecord.objects.filter(session_id=self.old.id).exists())
+
+    def test_reads_fall_back_to_archive(self):
+        """Test session, attendance and record endpoints answer the same after archiving"""
+        from django.test import override_settings
+        from .archive import archive_sessions
+
+        urls = [
+            reverse('attendancesession-detail', args=[self.old.id]),
+            reverse('attendancesession-attendance', args=[self.old.id]),
+            reverse('attendancerecord-list') + f'?session={self.old.id}',
+        ]
+        before = [self.client.get(url).json() for url in urls]
+        archive_sessions(self.cutoff)
+
+        self.assertEqual([self.client.get(url).json() for url in urls], before)
+        with override_settings(FAST_LIST_ENDPOINTS=False):
+            self.assertEqual(self.client.get(urls[2]).json(), before[2])
+
+    def test_student_records_include_archive(self):
+        from .archive import archive_sessions
+
+        archive_sessions(self.cutoff)
+        response = self.client.get(reverse('attendancerecord-list'), {'student': self.students[0].student_id})
+
+        self.assertEqual(
+            sorted(r['session'] for r in response.json()), sorted([self.old.id, self.recent.id, self.old_active.id])
+        )
+        self.assertEqual(len(self.client.get(reverse('attendancerecord-list')).json()), 4)
+
+    def test_unknown_session_is_404(self):
+        response = self.client.get(reverse('attendancesession-detail', args=[99999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_command_dry_run(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('archive_attendance', '--older-than-days', '30', '--dry-run', stdout=out)
+        self.assertIn('Would archive 1 session(s) and 2 record(s)', out.getvalue())
+        self.assertFalse(ArchivedAttendanceSession.objects.exists())
+
+        call_command('archive_attendance', '--older-than-days', '30', stdout=StringIO())
+        self.assertEqual(ArchivedAttendanceSession.objects.count(), 1)
+
+
+class ReplicaRouterTestCase(APITestCase):
+    """Test routing of safe reads to read replicas"""
+
+    def test_router_reads_from_replica_only_in_block(self):
+        from django.test import override_settings
+        from .routers import ReplicaRouter, read_from_replica
+
+        router = ReplicaRouter()
+        with override_settings(DATABASE_REPLICAS=['replica1']):
+            self.assertEqual(router.db_for_read(Student), 'default')
+            with read_from_replica():
+                self.assertEqual(router.db_for_read(Student), 'replica1')
+                self.assertEqual(router.db_for_write(Student), 'default')
+                # Pinned to the primary after a write
+                self.assertEqual(router.db_for_read(Student), 'default')
+            with read_from_replica():
+                self.assertEqual(router.db_for_read(Student), 'replica1')
+            self.assertEqual(router.db_for_read(Student), 'default')
+        self.assertTrue(router.allow_migrate('default', 'core'))
+        self.assertFalse(router.allow_migrate('replica1', 'core'))
+
+    def test_list_reads_replica_and_scans_stay_on_primary(self):
+        from unittest import mock
+
+        user = User.objects.create_user(username='reader@test.com', password='TestPass123!')
+        teacher = Teacher.objects.create(teacher_name='Teacher', email='t@test.com', rfid='RFID_T')
+        course = Course.objects.create(course_name='Course')
+        Student.objects.create(student_name='Student', email='s@test.com', rfid='RFID_S', year=1, dept='CS', section='A')
+        session = AttendanceSession.objects.create(
+            teacher=teacher, course=course, section='A', year=1, qr_code_token='replica_token'
+        )
+        self.client.force_authenticate(user=user)
+
+        with mock.patch('core.routers.choose_replica', return_value='default') as choose_replica:
+            self.client.post(reverse('rfid-scan'), {'rfid': 'RFID_S', 'session_id': session.id}, format='json')
+            self.assertFalse(choose_replica.called)
+
+            response = self.client.get(reverse('student-list'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(choose_replica.called)
+
+
+class WriteQueueTestCase(TransactionTestCase):
+    """Test the single-writer queue used for SQLite in production"""
+    # Keep the default tenant created by the migrations
+    serialized_rollback = True
+
+    def test_jobs_commit_in_batches_and_fail_alone(self):
+        import threading
+        from .write_queue import WriteQueue
+
+        write_queue = WriteQueue()
+        results, errors = {}, {}
+
+        def create(n):
+            if n == 3:
+                raise ValueError('bad job')
+            return Course.objects.create(course_name=f'Course {n}').course_name
+
+        def submit(n):
+            try:
+                results[n] = write_queue.submit(create, n)
+            except ValueError as exc:
+                errors[n] = exc
+
+        threads = [threading.Thread(target=submit, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {n: f'Course {n}' for n in range(8) if n != 3})
+        self.assertEqual(list(errors), [3])
+        self.assertEqual(Course.objects.count(), 7)
+
+    def test_scan_through_queue(self):
+        from django.test import override_settings
+
+        teacher = Teacher.objects.create(teacher_name='Teacher', email='t@test.com', rfid='RFID_T')
+        course = Course.objects.create(course_name='Course')
+        Student.objects.create(student_name='Student', email='s@test.com', rfid='RFID_S', year=1, dept='CS', section='A')
+        session = AttendanceSession.objects.create(
+            teacher=teacher, course=course, section='A', year=1, qr_code_token='queue_token'
+        )
+        with override_settings(SQLITE_WRITE_QUEUE=True):
+            response = self.client.post(
+                reverse('rfid-scan'), {'rfid': 'RFID_S', 'session_id': session.id}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(AttendanceRecord.objects.get().rfid_scanned)
+
+
+# ============ Dashboard Cache Tests ============
+
+class DashboardCacheTestCase(TestCase):
+    """Test the cached dashboard models and template fragments"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='student@test.com', email='student@test.com', password='TestPass123!')
+        self.teacher = Teacher.objects.create(teacher_name='Test Teacher', email='teacher@test.com', rfid='RFID001')
+        self.student = Student.objects.create(
+            user=self.user, student_name='Test Student', email='student@test.com', rfid='RFID_S', year=1, dept='CS', section='A'
+        )
+        self.courses = [Course.objects.create(course_name=f'Course {i}') for i in range(3)]
+        for course in self.courses:
+            TaughtCourse.objects.create(course=course, teacher=self.teacher, classes_taken='C1, C2, C3, C4')
+            StudentCourse.objects.create(student=self.student, course=course, teacher=self.teacher, classes_attended='C1')
+        self.client.force_login(self.user)
+        self.url = reverse('student-dashboard')
+
+    def test_dashboard_queries_do_not_grow_with_courses(self):
+        """Test the dashboard model is built without a query per course"""
+        from .dashboards import build_student_dashboard
+        with self.assertNumQueries(2):
+            dashboard = build_student_dashboard(self.student.student_id)
+        self.assertEqual(dashboard['total_courses'], 3)
+        self.assertEqual(
+            [course['attendance'] for course in dashboard['course_attendance']], [25.0, 25.0, 25.0]
+        )
+
+    def test_refresh_is_served_from_fragment_cache(self):
+        """Test a repeat load only resolves the session, user and profile"""
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Welcome, Test Student!')
+        self.assertContains(response, '25.0%')
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Welcome, Test Student!')
+
+    def test_scan_invalidates_dashboard(self):
+        """Test completing a scan shows the new attendance on the next load"""
+        from .attendance import register_scan
+
+        self.client.get(self.url)
+        session = AttendanceSession.objects.create(
+            teacher=self.teacher, course=self.courses[0], section='A', year=1, qr_code_token='dashboard_token'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            register_scan(session, self.student, ScanEvent.RFID)
+            register_scan(session, self.student, ScanEvent.QR)
+
+        response = self.client.get(self.url)
+        self.assertContains(response, '50.0%')
+
+    def test_approval_invalidates_dashboard(self):
+        """Test bulk approved requests show on the next load"""
+        from .attendance import process_attendance_requests
+
+        self.client.get(self.url)
+        request = UpdateAttendanceRequest.objects.create(
+            student=self.student, course=self.courses[1], teacher=self.teacher, classes_to_add='C2, C3'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            process_attendance_requests(UpdateAttendanceRequest.objects.filter(pk=request.pk), True, None)
+
+        response = self.client.get(self.url)
+        self.assertContains(response, '75.0%')
+
+    def test_missing_profile_redirects(self):
+        """Test a user without the role is sent back to the login page"""
+        self.client.force_login(User.objects.create_user(username='other@test.com', password='TestPass123!'))
+        response = self.client.get(reverse('teacher-dashboard'))
+        self.assertRedirects(response, reverse('teacher-login-page'))
+
+
+# ============ Student Self-Service Tests ============
+
+class MyAttendanceTestCase(APITestCase):
+    """Test the student's own attendance endpoint"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from .authentication import tokens_for_profile
+        cache.clear()
+        self.user = User.objects.create_user(username='student@test.com', email='student@test.com', password='TestPass123!')
+        self.teacher = Teacher.objects.create(teacher_name='Test Teacher', email='teacher@test.com', rfid='RFID001')
+        self.student = Student.objects.create(
+            user=self.user, student_name='Test Student', email='student@test.com', rfid='RFID_S', year=1, dept='CS', section='A'
+        )
+        self.courses = [Course.objects.create(course_name=f'Course {i}') for i in range(3)]
+        TaughtCourse.objects.create(course=self.courses[0], teacher=self.teacher, classes_taken='C1, C2, C3, C4')
+        TaughtCourse.objects.create(course=self.courses[1], teacher=self.teacher, classes_taken='C1, C2')
+        StudentCourse.objects.create(student=self.student, course=self.courses[0], teacher=self.teacher, classes_attended='C1')
+        StudentCourse.objects.create(student=self.student, course=self.courses[1], teacher=self.teacher, classes_attended='C1, C2')
+        # Not taught yet, left out of the overall figure
+        StudentCourse.objects.create(student=self.student, course=self.courses[2], teacher=self.teacher, classes_attended='C1')
+        access = tokens_for_profile(self.user, 'student', self.student.student_id).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.url = reverse('my-attendance')
+
+    def test_counters_follow_classes(self):
+        """Test the class counters are kept in sync on save"""
+        taught = TaughtCourse.objects.get(course=self.courses[0])
+        self.assertEqual(taught.classes_taken_count, 4)
+        student_course = StudentCourse.objects.get(course=self.courses[1])
+        student_course.classes_attended = ''
+        student_course.save()
+        student_course.refresh_from_db()
+        self.assertEqual(student_course.classes_attended_count, 0)
+
+    def test_attendance_in_one_query(self):
+        """Test per-course and overall figures come from a single query"""
+        from .authentication import _load_revocations
+        _load_revocations()  # as after the first authenticated request since the cache started
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(c['course_name'], c['held'], c['attended'], c['percentage']) for c in response.data['courses']],
+            [('Course 0', 4, 1, 25.0), ('Course 1', 2, 2, 100.0), ('Course 2', 0, 1, 0.0)]
+        )
+        self.assertEqual(response.data['overall'], {'held': 6, 'attended': 3, 'percentage': 50.0})
+
+    def test_conditional_get(self):
+        """Test an unchanged version is answered 304 without queries"""
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        request = UpdateAttendanceRequest.objects.create(
+            student=self.student, course=self.courses[0], teacher=self.teacher, classes_to_add='C2'
+        )
+        from .attendance import process_attendance_requests
+        with self.captureOnCommitCallbacks(execute=True):
+            process_attendance_requests(UpdateAttendanceRequest.objects.filter(pk=request.pk), True, None)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['courses'][0]['attended'], 2)
+
+    def test_students_only(self):
+        """Test other roles are refused"""
+        from .authentication import tokens_for_profile
+        access = tokens_for_profile(self.user, 'teacher', self.teacher.teacher_id).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+# ============ Teacher Sessions Tests ============
+
+class TeacherSessionsTestCase(APITestCase):
+    """Test the teacher's sessions endpoint and live session counters"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.core.cache import cache
+        from django.utils import timezone
+        from .authentication import tokens_for_profile
+        cache.clear()
+        self.user = User.objects.create_user(username='teacher@test.com', email='teacher@test.com', password='TestPass123!')
+        self.teacher = Teacher.objects.create(user=self.user, teacher_name='Test Teacher', email='teacher@test.com', rfid='RFID001')
+        other = Teacher.objects.create(teacher_name='Other Teacher', email='other@test.com', rfid='RFID002')
+        self.course = Course.objects.create(course_name='Test Course')
+        self.students = [
+            Student.objects.create(
+                student_name=f'Student {i}', email=f's{i}@test.com', rfid=f'RFID_S{i}', year=1, dept='CS', section='A'
+            )
+            for i in range(4)
+        ]
+        self.sessions = [
+            AttendanceSession.objects.create(
+                teacher=self.teacher, course=self.course, section='A', year=1, qr_code_token=f'token_{i}'
+            )
+            for i in range(3)
+        ]
+        AttendanceSession.objects.create(teacher=other, course=self.course, section='A', year=1, qr_code_token='other')
+        AttendanceSession.objects.filter(pk=self.sessions[2].pk).update(started_at=timezone.now() - timedelta(days=3))
+        access = tokens_for_profile(self.user, 'teacher', self.teacher.teacher_id).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.url = reverse('attendancesession-mine')
+
+    def scan(self, session, student, rfid=True, qr=True):
+        from .attendance import register_scan
+        with self.captureOnCommitCallbacks(execute=True):
+            if rfid:
+                register_scan(session, student, ScanEvent.RFID)
+            if qr:
+                register_scan(session, student, ScanEvent.QR)
+
+    def test_todays_sessions_with_statistics(self):
+        """Test today's sessions of the teacher come with counts from one query"""
+        self.scan(self.sessions[0], self.students[0])
+        self.scan(self.sessions[0], self.students[1], qr=False)
+        self.scan(self.sessions[0], self.students[2], rfid=False)
+
+        # Rosters come from the enrollment index, loaded on first use
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = {session['id']: session['statistics'] for session in response.data['sessions']}
+        self.assertEqual(set(stats), {self.sessions[0].id, self.sessions[1].id})
+        self.assertEqual(stats[self.sessions[0].id], {
+            'roster': 4, 'scanned': 3, 'present': 1, 'rfid_only': 1, 'qr_only': 1, 'absent': 3
+        })
+        self.assertEqual(stats[self.sessions[1].id]['scanned'], 0)
+
+    def test_date_range(self):
+        """Test a date range includes earlier sessions and bad dates are refused"""
+        from datetime import timedelta
+        from django.utils import timezone
+        start = (timezone.localdate() - timedelta(days=3)).isoformat()
+        response = self.client.get(self.url, {'from': start})
+        self.assertEqual(len(response.data['sessions']), 3)
+        response = self.client.get(self.url, {'date': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_live_counters_follow_scans(self):
+        """Test active sessions are served from counters updated by the scan path"""
+        from .live_stats import get_live_stats
+
+        self.client.get(self.url)  # seeds the counters
+        self.scan(self.sessions[0], self.students[0], qr=False)
+        self.assertEqual(get_live_stats([self.sessions[0].id])[self.sessions[0].id], {
+            'scanned': 1, 'present': 0, 'rfid_only': 1, 'qr_only': 0
+        })
+        self.scan(self.sessions[0], self.students[0], rfid=False)
+        self.assertEqual(get_live_stats([self.sessions[0].id])[self.sessions[0].id], {
+            'scanned': 1, 'present': 1, 'rfid_only': 0, 'qr_only': 0
+        })
+
+        # The counters, not the database, answer for live sessions
+        AttendanceRecord.objects.filter(session=self.sessions[0]).update(is_present=False)
+        response = self.client.get(self.url)
+        stats = {session['id']: session['statistics'] for session in response.data['sessions']}
+        self.assertEqual(stats[self.sessions[0].id]['present'], 1)
+
+    def test_teachers_only(self):
+        """Test other roles are refused"""
+        self.client.credentials()
+        self.client.force_authenticate(user=User.objects.create_user(username='x@test.com', password='x'))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class LiveSessionStatsTestCase(APITestCase):
+    """Test the live counters behind the statistics of active sessions"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='teacher@test.com', email='teacher@test.com', password='TestPass123!')
+        self.teacher = Teacher.objects.create(user=self.user, teacher_name='Test Teacher', email='teacher@test.com', rfid='RFID001')
+        self.course = Course.objects.create(course_name='Test Course')
+        self.students = [
+            Student.objects.create(
+                student_name=f'Student {i}', email=f's{i}@test.com', rfid=f'RFID_S{i}', year=1, dept='CS', section='A'
+            )
+            for i in range(3)
+        ]
+        self.session = AttendanceSession.objects.create(
+            teacher=self.teacher, course=self.course, section='A', year=1, qr_code_token='live_token'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.stats_url = reverse('attendancesession-stats', args=[self.session.id])
+
+    def scan(self, student, rfid=True, qr=True):
+        with self.captureOnCommitCallbacks(execute=True):
+            if rfid:
+                self.client.post(reverse('rfid-scan'), {'rfid': student.rfid, 'session_id': self.session.id}, format='json')
+            if qr:
+                self.client.post(reverse('qr-scan'), {'qr_token': 'live_token', 'student_id': student.student_id}, format='json')
+
+    def test_active_session_stats_without_counting(self):
+        """Test scans update the counters that answer stats polls"""
+        response = self.client.get(self.stats_url)  # seeds the counters
+        self.assertEqual(response.data['statistics']['total_students'], 0)
+
+        self.scan(self.students[0])
+        self.scan(self.students[1], qr=False)
+        # Only the session itself is looked up, within the caller's campus
+        with self.assertNumQueries(1):
+            response = self.client.get(self.stats_url)
+        self.assertEqual(response.data['statistics'], {
+            'total_students': 2, 'present': 1, 'absent': 1, 'rfid_only': 1, 'qr_only': 0
+        })
+
+        response = self.client.get(reverse('attendancesession-attendance', args=[self.session.id]))
+        self.assertEqual(len(response.data['records']), 2)
+        self.assertEqual(response.data['statistics']['present'], 1)
+
+    def test_writes_outside_scan_path_reset_counters(self):
+        """Test record edits and stopping a session fall back to counting"""
+        self.scan(self.students[0], qr=False)
+        self.client.get(self.stats_url)
+
+        record = AttendanceRecord.objects.get(session=self.session, student=self.students[0])
+        record.qr_scanned = record.is_present = True
+        record.save()
+        response = self.client.get(self.stats_url)
+        self.assertEqual(response.data['statistics']['present'], 1)
+
+        self.client.post(reverse('attendancesession-stop', args=[self.session.id]))
+        with self.assertNumQueries(2):
+            response = self.client.get(self.stats_url)
+        self.assertEqual(response.data['status'], 'stopped')
+
+    def test_local_backend_resyncs_on_miss(self):
+        """Test the in-process backend recounts a session it has not seen"""
+        from django.test import override_settings
+        from .live_stats import LocalLiveStats, get_backend, get_live_stats, session_stats
+
+        self.scan(self.students[0])
+        with override_settings(LIVE_SESSION_STATS_BACKEND='core.live_stats.LocalLiveStats'):
+            self.assertIsInstance(get_backend(), LocalLiveStats)
+            self.assertEqual(get_live_stats([self.session.id]), {})
+            self.assertEqual(session_stats(self.session)['present'], 1)
+
+            self.scan(self.students[1])
+            self.assertEqual(get_live_stats([self.session.id])[self.session.id], {
+                'scanned': 2, 'present': 2, 'rfid_only': 0, 'qr_only': 0
+            })
+
+    def test_seed_missing_a_scan_is_dropped(self):
+        """Test counts that a scan committed after are not kept as counters"""
+        from .live_stats import get_live_stats, seed_live_stats
+
+        stale = {'scanned': 0, 'present': 0, 'rfid_only': 0, 'qr_only': 0}
+        self.scan(self.students[0])  # commits after `stale` was counted
+        seed_live_stats(self.session.id, stale)
+        self.assertEqual(get_live_stats([self.session.id]), {})
+        response = self.client.get(self.stats_url)
+        self.assertEqual(response.data['statistics']['present'], 1)
+        self.assertEqual(get_live_stats([self.session.id])[self.session.id]['present'], 1)
+
+    def test_process_local_cache_counts_every_read(self):
+        """Test counters are not kept in a cache other workers cannot update"""
+        from django.test import override_settings
+        from .live_stats import get_live_stats
+
+        with override_settings(ALLOW_PROCESS_LOCAL_CACHE=False):
+            self.client.get(self.stats_url)
+            self.assertEqual(get_live_stats([self.session.id]), {})
+            self.scan(self.students[0])
+            # The session and its records, counted again
+            with self.assertNumQueries(2):
+                response = self.client.get(self.stats_url)
+        self.assertEqual(response.data['statistics']['present'], 1)
+
+
+# ============ Presence Bitmap Tests ============
+
+class PresenceBitmapTestCase(APITestCase):
+    """Test per-session presence bitmaps and the analytics built on them"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='management@test.com', email='management@test.com', password='TestPass123!')
+        Management.objects.create(user=self.user, Management_name='Admin', email='management@test.com')
+        self.teacher = Teacher.objects.create(teacher_name='Test Teacher', email='teacher@test.com', rfid='RFID001')
+        self.course = Course.objects.create(course_name='Test Course')
+        self.students = [
+            Student.objects.create(
+                student_name=f'Student {i}', email=f's{i}@test.com', rfid=f'RFID_S{i}', year=1, dept='CS', section='A'
+            )
+            for i in range(4)
+        ]
+        self.client.force_authenticate(user=self.user)
+
+    def add_session(self, present, section='A'):
+        """A stopped session of `section` with the given students present"""
+        from .presence import build_presence
+        session = AttendanceSession.objects.create(
+            teacher=self.teacher, course=self.course, section=section, year=1,
+            qr_code_token=f'token_{AttendanceSession.objects.count()}', status='stopped'
+        )
+        for student in present:
+            AttendanceRecord.objects.create(
+                session=session, student=student, rfid_scanned=True, qr_scanned=True, is_present=True
+            )
+        build_presence(AttendanceSession, [session.id])
+        return session
+
+    def test_bit_operations(self):
+        """Test the bit-sliced counter and streaks against plain counting"""
+        import random
+        from .presence import absence_streaks, decode, encode, from_bitmap, presence_counts, to_bitmap
+
+        rng = random.Random(0)
+        sessions = [{i for i in range(1, 200) if rng.random() < 0.7} for _ in range(40)]
+        bitmaps = [to_bitmap(present) for present in sessions]
+        self.assertEqual([decode(encode(bits)) for bits in bitmaps], bitmaps)
+        expected = {}
+        for present in sessions:
+            for student_id in present:
+                expected[student_id] = expected.get(student_id, 0) + 1
+        self.assertEqual(presence_counts(bitmaps), expected)
+
+        roster = to_bitmap(range(1, 200))
+        streaks = set(from_bitmap(absence_streaks(bitmaps, roster, 3)))
+        self.assertEqual(streaks, {
+            i for i in range(1, 200)
+            if any(all(i not in present for present in sessions[j:j + 3]) for j in range(len(sessions) - 2))
+        })
+
+    def test_stop_builds_bitmap_and_edits_drop_it(self):
+        """Test stopping a session stores its bitmap and later record edits clear it"""
+        from .presence import StudentIndex, decode
+        session = AttendanceSession.objects.create(
+            teacher=self.teacher, course=self.course, section='A', year=1, qr_code_token='presence_token'
+        )
+        record = AttendanceRecord.objects.create(session=session, student=self.students[1], is_present=True)
+        self.client.post(reverse('attendancesession-stop', args=[session.id]))
+        session.refresh_from_db()
+        index = StudentIndex.decode(session.presence_index)
+        self.assertEqual(index.students, [student.student_id for student in self.students])
+        self.assertEqual(index.student_ids(decode(session.presence)), [self.students[1].student_id])
+
+        record.is_present = False
+        record.save()
+        session.refresh_from_db()
+        self.assertIsNone(session.presence)
+
+    def test_bitmaps_are_indexed_by_roster(self):
+        """Test bitmaps stay roster sized however large student ids get, and differing indexes are aligned"""
+        from .presence import session_bitmaps
+        late = Student.objects.create(
+            student_id=10 ** 6, student_name='Late', email='late@test.com', rfid='RFID_LATE', year=1, dept='CS', section='A'
+        )
+        first = self.add_session([late])
+        first.refresh_from_db()
+        self.assertEqual(len(first.presence), 1)
+        late.section = 'B'
+        late.save()
+        self.add_session([self.students[0], late])  # roster without `late`, who is appended to the index
+
+        index, sessions = session_bitmaps(course=self.course.course_id)
+        self.assertEqual([index.student_ids(bits) for _, _, bits in sessions],
+                         [[late.student_id], [self.students[0].student_id, late.student_id]])
+
+    def test_attendance_rates(self):
+        """Test rates over live and archived sessions, including absent roster students"""
+        from django.utils import timezone
+        from .archive import archive_sessions
+
+        s0, s1, s2, _ = self.students
+        self.add_session([s0, s1])
+        archive_sessions(timezone.now())
+        self.add_session([s0, s1, s2])
+        self.add_session([s0])
+        self.add_session([s0, s2])
+
+        url = reverse('analytics-attendance-rates')
+        response = self.client.get(url, {'course': self.course.course_id, 'section': 'A', 'year': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['sessions'], 4)
+        self.assertEqual(
+            [(row['student_name'], row['rate']) for row in response.data['students']],
+            [('Student 0', 100.0), ('Student 1', 50.0), ('Student 2', 50.0), ('Student 3', 0.0)]
+        )
+        response = self.client.get(url, {'course': self.course.course_id, 'min_rate': 75})
+        self.assertEqual([row['student'] for row in response.data['students']], [s0.student_id])
+        response = self.client.get(url, {'course': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_absence_streaks_and_overlap(self):
+        """Test consecutive absences and attendees common to two sections"""
+        s0, s1, s2, s3 = self.students
+        self.add_session([s0, s1, s2])
+        self.add_session([s0])
+        self.add_session([s0, s3])
+        self.add_session([s0, s3])
+        self.add_session([s1, s2], section='B')
+
+        response = self.client.get(reverse('analytics-absence-streaks'), {'section': 'A', 'year': 1, 'length': 3})
+        self.assertEqual([row['student'] for row in response.data['students']], [s1.student_id, s2.student_id])
+
+        response = self.client.get(reverse('analytics-overlap'), {'sections': 'A,B'})
+        self.assertEqual(response.data['attendees'], {'A': 4, 'B': 2})
+        self.assertEqual([row['student'] for row in response.data['students']], [s1.student_id, s2.student_id])
+
+    def test_students_cannot_read_analytics(self):
+        """Test analytics are limited to teachers and management"""
+        from .authentication import tokens_for_profile
+        access = tokens_for_profile(self.user, 'student', self.students[0].student_id).access_token
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = self.client.get(reverse('analytics-overlap'), {'sections': 'A,B'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class TermReportTestCase(APITestCase):
+    """Test term attendance reports and their file formats"""
+
+    def setUp(self):
+        from datetime import datetime, timezone as dt_timezone
+        self.user = User.objects.create_user(username='management@test.com', email='management@test.com', password='TestPass123!')
+        Management.objects.create(user=self.user, Management_name='Admin', email='management@test.com')
+        self.teacher = Teacher.objects.create(teacher_name='Test Teacher', email='teacher@test.com', rfid='RFID001')
+        self.course = Course.objects.create(course_name='Test Course')
+        self.students = [
+            Student.objects.create(
+                student_name=f'Student {i}', email=f's{i}@test.com', rfid=f'RFID_S{i}', year=1, dept='CS', section='A'
+            )
+            for i in range(4)
+        ]
+        # Student 0 attends everything, 1 the first half, 2 the second half, 3 nothing
+        attendance = [[0, 1], [0, 1], [0, 2], [0, 2]]
+        for day, present in enumerate(attendance, start=1):
+            self.add_session(datetime(2024, 3, day, 9, tzinfo=dt_timezone.utc), present)
+        # Outside the term
+        self.add_session(datetime(2024, 8, 1, 9, tzinfo=dt_timezone.utc), [3])
+        self.client.force_authenticate(user=self.user)
+
+    def add_session(self, started_at, present):
+        session = AttendanceSession.objects.create(
+            teacher=self.teacher, course=self.course, section='A', year=1,
+            qr_code_token=f'token_{AttendanceSession.objects.count()}', status='stopped'
+        )
+        AttendanceSession.objects.filter(pk=session.pk).update(started_at=started_at)
+        for i in present:
+            AttendanceRecord.objects.create(
+                session=session, student=self.students[i], rfid_scanned=True, qr_scanned=True, is_present=True
+            )
+
+    def get_report(self, **params):
+        query = {'course': self.course.course_id, 'section': 'A', 'year': 1, 'term': '2024-S1', **params}
+        return self.client.get(reverse('term-report'), query)
+
+    def test_moving_averages(self):
+        """Test moving averages over a window, shorter at the start"""
+        from .reports import moving_averages
+        self.assertEqual(moving_averages([10, 20, 30, 40], 2), [10.0, 15.0, 25.0, 35.0])
+        self.assertEqual(moving_averages([], 3), [])
+
+    def test_json_report(self):
+        """Test rates, recent rates, turnout and flags of the term's sessions"""
+        response = self.get_report(window=2, threshold=60)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['sessions']), 4)
+        self.assertEqual([session['turnout'] for session in response.data['sessions']], [50.0] * 4)
+        self.assertEqual([session['turnout_moving_average'] for session in response.data['sessions']], [50.0] * 4)
+
+        students = {row['student']: row for row in response.data['students']}
+        first, second, third, fourth = (students[student.student_id] for student in self.students)
+        self.assertEqual(first['attendance'], [True] * 4)
+        self.assertEqual((first['rate'], first['below_threshold']), (100.0, False))
+        self.assertEqual(second['attendance'], [True, True, False, False])
+        self.assertEqual((second['rate'], second['recent_rate']), (50.0, 0.0))
+        self.assertTrue(second['below_threshold'])
+        self.assertTrue(second['recent_below_threshold'])
+        self.assertEqual((third['rate'], third['recent_rate'], third['recent_below_threshold']), (50.0, 100.0, False))
+        self.assertEqual((fourth['attended'], fourth['rate']), (0, 0.0))
+
+    def test_file_formats(self):
+        """Test the CSV, HTML and XLSX renderings"""
+        import csv
+        import io
+        import zipfile
+
+        response = self.get_report(format='csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('attachment; filename="attendance-', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(response.content.decode())))
+        self.assertEqual(rows[0][:2], ['Student ID', 'Name'])
+        self.assertEqual(rows[2][1:6], ['Student 1', 'P', 'P', 'A', 'A'])
+        self.assertEqual(rows[-1][1], 'Turnout %')
+
+        response = self.get_report(format='html')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, '<td class="a">A</td>')
+        self.assertContains(response, 'Test Course, section A, year 1, 2024-S1')
+
+        response = self.get_report(format='xlsx')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Disposition'].endswith('.xlsx"'))
+        with zipfile.ZipFile(io.BytesIO(response.content)) as workbook:
+            self.assertIn('[Content_Types].xml', workbook.namelist())
+            self.assertIn('<t>Student 1</t>', workbook.read('xl/worksheets/sheet1.xml').decode())
+
+    def test_invalid_requests(self):
+        """Test bad parameters, an unknown course and a student caller"""
+        from .authentication import tokens_for_profile
+        self.assertEqual(self.get_report(term='2024-S3').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_report(window=0).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_report(course=9999).status_code, status.HTTP_404_NOT_FOUND)
+
+        user = User.objects.create_user(username='s0@test.com', password='TestPass123!')
+        self.students[0].user = user
+        self.students[0].save()
+        access = tokens_for_profile(user, 'student', self.students[0].student_id).access_token
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.get_report().status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AttendanceAlertTestCase(APITestCase):
+    """Test the incremental low attendance detector and its API"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='management@test.com', email='management@test.com', password='TestPass123!')
+        Management.objects.create(user=self.user, Management_name='Admin', email='management@test.com')
+        self.teacher = Teacher.objects.create(teacher_name='Test Teacher', email='teacher@test.com', rfid='RFID001')
+        self.course = Course.objects.create(course_name='Test Course')
+        self.taught = TaughtCourse.objects.create(
+            course=self.course, teacher=self.teacher, classes_taken='d1, d2, d3, d4'
+        )
+        self.students = [
+            Student.objects.create(
+                student_name=f'Student {i}', email=f's{i}@test.com', rfid=f'RFID_S{i}', year=1, dept='CS', section='A'
+            )
+            for i in range(3)
+        ]
+        attended = ['d1, d2, d3, d4', 'd1', 'd1, d2, d3']
+        self.student_courses = [
+            StudentCourse.objects.create(
+                student=student, course=self.course, teacher=self.teacher, classes_attended=classes
+            )
+            for student, classes in zip(self.students, attended)
+        ]
+        self.client.force_authenticate(user=self.user)
+
+    def open_alerts(self):
+        from .models import AttendanceAlert
+        return set(AttendanceAlert.objects.filter(resolved_at__isnull=True).values_list('student_id', 'course_id'))
+
+    def test_detect_and_deduplicate(self):
+        """Test alerts are raised once per course and overall, and updated rather than duplicated"""
+        from .alerts import detect_low_attendance
+        from .models import AttendanceAlert, Notification
+
+        stats = detect_low_attendance()
+        self.assertIsNone(stats['since'])
+        self.assertEqual(stats['students_evaluated'], 3)
+        self.assertEqual(stats['alerts_raised'], 2)
+        student = self.students[1].student_id
+        self.assertEqual(self.open_alerts(), {(student, self.course.course_id), (student, None)})
+        alert = AttendanceAlert.objects.get(student_id=student, course__isnull=False)
+        self.assertEqual((alert.attended, alert.held, alert.rate), (1, 4, 25.0))
+
+        # A full run sees the same rates: nothing new
+        stats = detect_low_attendance(full=True)
+        self.assertEqual((stats['alerts_raised'], stats['alerts_resolved']), (0, 0))
+        self.assertEqual(AttendanceAlert.objects.count(), 2)
+        # Raising notified the student, once per alert
+        self.assertEqual(Notification.objects.filter(kind=Notification.LOW_ATTENDANCE, recipient='s1@test.com').count(), 2)
+
+    def test_incremental_runs(self):
+        """Test later runs only evaluate students whose attended or held classes changed"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .alerts import detect_low_attendance
+        from .models import AttendanceAlert, AttendanceAlertRun
+
+        detect_low_attendance()
+        # Move the watermark past the setUp writes
+        AttendanceAlertRun.objects.update(started_at=timezone.now() + timedelta(hours=1))
+        with self.settings(ATTENDANCE_ALERT_WATERMARK_OVERLAP=0):
+            self.assertEqual(detect_low_attendance()['students_evaluated'], 0)
+
+            AttendanceAlertRun.objects.all().delete()
+            AttendanceAlertRun.objects.create(started_at=timezone.now(), finished_at=timezone.now())
+            recovering = self.student_courses[1]
+            recovering.classes_attended = 'd1, d2, d3, d4'
+            recovering.save()
+            stats = detect_low_attendance()
+            self.assertEqual(stats['students_evaluated'], 1)
+            self.assertEqual(stats['alerts_resolved'], 2)
+            self.assertEqual(self.open_alerts(), set())
+
+            # Holding more classes puts everyone of the course up for evaluation
+            self.taught.classes_taken = 'd1, d2, d3, d4, d5, d6'
+            self.taught.save()
+            stats = detect_low_attendance()
+            self.assertEqual(stats['students_evaluated'], 3)
+            # 4 of 6 and 3 of 6 are all below 75%
+            self.assertEqual({student for student, _ in self.open_alerts()}, {student.student_id for student in self.students})
+        # The recovered student's course alert was reopened, not duplicated
+        self.assertEqual(AttendanceAlert.objects.filter(student=self.students[1]).count(), 2)
+
+    def test_approved_request_is_a_change(self):
+        """Test bulk approvals stamp the StudentCourses they credit"""
+        from django.utils import timezone
+        from .alerts import changed_students
+        since = timezone.now()
+        self.assertEqual(changed_students(since), [])
+        UpdateAttendanceRequest.objects.create(
+            teacher=self.teacher, student=self.students[1], course=self.course, classes_to_add='d2'
+        )
+        response = self.client.post(reverse('updateattendancerequest-bulk-process'), {'action': 'approve', 'status': 'pending'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(changed_students(since), [self.students[1].student_id])
+
+    def test_command_and_api(self):
+        """Test the management command and the alerts endpoint with its filters and teacher scoping"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .authentication import tokens_for_profile
+
+        out = StringIO()
+        call_command('detect_low_attendance', stdout=out)
+        self.assertIn('alerts raised: 2', out.getvalue())
+
+        response = self.client.get(reverse('attendancealert-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        response = self.client.get(reverse('attendancealert-list'), {'scope': 'overall'})
+        self.assertEqual([alert['course'] for alert in response.data], [None])
+        self.assertEqual(response.data[0]['student_name'], 'Student 1')
+        response = self.client.get(reverse('attendancealert-list'), {'status': 'resolved'})
+        self.assertEqual(response.data, [])
+
+        teacher_user = User.objects.create_user(username='teacher@test.com', password='TestPass123!')
+        self.teacher.user = teacher_user
+        self.teacher.save()
+        access = tokens_for_profile(teacher_user, 'teacher', self.teacher.teacher_id).access_token
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = self.client.get(reverse('attendancealert-list'))
+        self.assertEqual([alert['course'] for alert in response.data], [self.course.course_id])
+
+
+class NotificationOutboxTestCase(APITestCase):
+    """Test the notification outbox and its batched, retrying dispatcher"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='management@test.com', email='management@test.com', password='TestPass123!')
+        self.management = Management.objects.create(user=self.user, Management_name='Admin', email='management@test.com')
+        self.teacher = Teacher.objects.create(teacher_name='Test Teacher', email='teacher@test.com', rfid='RFID001')
+        self.course = Course.objects.create(course_name='Test Course')
+        self.student = Student.objects.create(
+            student_name='Test Student', email='student@test.com', rfid='RFID_S1', year=1, dept='CS', section='A'
+        )
+        self.session = AttendanceSession.objects.create(
+            teacher=self.teacher, course=self.course, section='A', year=1, qr_code_token='outbox_token'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_changes_write_to_outbox(self):
+        """Test becoming present and processing requests queue notifications with the change"""
+        from .attendance import register_scan
+        from .models import Notification
+
+        register_scan(self.session, self.student, ScanEvent.RFID)
+        self.assertFalse(Notification.objects.exists())
+        register_scan(self.session, self.student, ScanEvent.QR)
+        notification = Notification.objects.get()
+        self.assertEqual((notification.kind, notification.recipient), (Notification.PRESENT, 'student@test.com'))
+        self.assertEqual(notification.payload['course'], self.course.course_id)
+
+        attendance_request = UpdateAttendanceRequest.objects.create(
+            teacher=self.teacher, student=self.student, course=self.course, classes_to_add='2024-01-01'
+        )
+        response = self.client.post(reverse('updateattendancerequest-reject', args=[attendance_request.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        notification = Notification.objects.get(kind=Notification.REQUEST_REJECTED)
+        self.assertEqual(notification.recipient, 'teacher@test.com')
+
+    def test_rolled_back_change_queues_nothing(self):
+        """Test the outbox row shares the transaction of the change"""
+        from django.db import transaction
+        from .attendance import register_scan
+        from .models import Notification
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                register_scan(self.session, self.student, ScanEvent.RFID)
+                register_scan(self.session, self.student, ScanEvent.QR)
+                raise RuntimeError
+        self.assertFalse(Notification.objects.exists())
+
+    def test_dispatch_coalesces_digests(self):
+        """Test one email per recipient, through the SMTP channel and the test email backend"""
+        from django.core import mail
+        from .models import Notification
+        from .notifications import dispatch_notifications, notify
+
+        notify(Notification.PRESENT, [
+            ('student@test.com', {'course': self.course.course_id, 'date': '2024-01-0%d' % day}) for day in (1, 2)
+        ])
+        notify(Notification.LOW_ATTENDANCE, [('other@test.com', {'course': None, 'rate': 50.0, 'threshold': 75.0})])
+        with self.settings(NOTIFICATION_CHANNEL='core.notifications.SMTPChannel'):
+            stats = dispatch_notifications()
+        self.assertEqual((stats['notifications'], stats['digests'], stats['sent']), (3, 2, 3))
+        self.assertEqual(len(mail.outbox), 2)
+        digest = next(message for message in mail.outbox if message.to == ['student@test.com'])
+        self.assertEqual(digest.subject, '2 attendance notifications')
+        self.assertIn('Test Course on 2024-01-02', digest.body)
+        self.assertFalse(Notification.objects.filter(status='pending').exists())
+        self.assertEqual(dispatch_notifications()['notifications'], 0)
+
+    def test_failed_delivery_backs_off(self):
+        """Test failures are retried later with a doubling delay, then marked failed"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import Notification
+        from .notifications import dispatch_notifications, notify
+
+        notify(Notification.PRESENT, [('student@test.com', {'course': self.course.course_id, 'date': '2024-01-01'})])
+        unreachable = {
+            'NOTIFICATION_CHANNEL': 'core.notifications.SMTPChannel',
+            'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+            'EMAIL_HOST': '127.0.0.1', 'EMAIL_PORT': 1, 'EMAIL_TIMEOUT': 1,
+            'NOTIFICATION_MAX_ATTEMPTS': 2, 'NOTIFICATION_RETRY_DELAY': 60,
+        }
+        with self.settings(**unreachable):
+            before = timezone.now()
+            self.assertEqual(dispatch_notifications()['retried'], 1)
+            notification = Notification.objects.get()
+            self.assertEqual((notification.status, notification.attempts), ('pending', 1))
+            self.assertGreaterEqual(notification.next_attempt_at, before + timedelta(seconds=60))
+            self.assertTrue(notification.last_error)
+            # Not due yet
+            self.assertEqual(dispatch_notifications()['notifications'], 0)
+
+            Notification.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(dispatch_notifications()['failed'], 1)
+        self.assertEqual(Notification.objects.get().status, 'failed')
+
+    def test_claims_do_not_overlap(self):
+        """Test a dispatcher batch only gets the notifications its own claim stamped"""
+        from unittest import mock
+        from django.db.models.query import QuerySet
+        from django.utils import timezone
+        from .models import Notification
+        from .notifications import claim_due, notify
+
+        notify(Notification.PRESENT, [(f's{i}@test.com', {'course': self.course.course_id, 'date': '2024-01-01'}) for i in range(2)])
+        now = timezone.now()
+        update, competing = QuerySet.update, []
+
+        def claim_first(queryset, **kwargs):
+            # Another dispatcher with the same clock reading claims the same rows first
+            if not competing:
+                competing.append(None)
+                competing.extend(claim_due(2, now))
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', claim_first):
+            claimed = claim_due(2, now)
+        self.assertEqual(len(competing), 3)
+        self.assertEqual(claimed, [])
+
+    def test_file_channel_and_command(self):
+        """Test the management command delivering through the file channel"""
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import Notification
+        from .notifications import notify
+
+        notify(Notification.PRESENT, [('student@test.com', {'course': self.course.course_id, 'date': '2024-01-01'})])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'notifications.log')
+            out = StringIO()
+            with self.settings(NOTIFICATION_CHANNEL='core.notifications.FileChannel', NOTIFICATION_FILE_PATH=path):
+                call_command('dispatch_notifications', stdout=out)
+            with open(path, encoding='utf-8') as log:
+                self.assertIn('Subject: Present in Test Course', log.read())
+        self.assertIn('sent: 1', out.getvalue())
+
+
+class RFIDScanDebounceTestCase(APITestCase):
+    """Test repeated RFID taps are answered from the debounce window"""
+
+    def setUp(self):
+        from .throttling import scan_debouncer
+        scan_debouncer.reset()
+        self.addCleanup(scan_debouncer.reset)
+        self.teacher = Teacher.objects.create(teacher_name='Test Teacher', email='teacher@test.com', rfid='RFID001')
+        self.course = Course.objects.create(course_name='Test Course')
+        self.student = Student.objects.create(
+            student_name='Test Student', email='student@test.com', rfid='RFID_S1', year=1, dept='CS', section='A'
+        )
+        self.session = AttendanceSession.objects.create(
+            teacher=self.teacher, course=self.course, section='A', year=1, qr_code_token='debounce_token'
+        )
+        self.data = {'rfid': 'RFID_S1', 'session_id': self.session.id}
+
+    def test_repeats_skip_the_database(self):
+        """Test repeats within the window get the first response with no queries"""
+        with self.settings(RFID_SCAN_DEBOUNCE_SECONDS=60):
+            first = self.client.post(reverse('rfid-scan'), self.data, format='json')
+            self.assertEqual(first.status_code, status.HTTP_200_OK)
+            with self.assertNumQueries(0):
+                for _ in range(3):
+                    repeat = self.client.post(reverse('rfid-scan'), self.data, format='json')
+            self.assertEqual(repeat.data, first.data)
+        self.assertEqual(ScanEvent.objects.count(), 1)
+
+        user = User.objects.create_user(username='management@test.com', password='TestPass123!')
+        Management.objects.create(user=user, Management_name='Admin', email='management@test.com')
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse('rfid-scan-debounce'))
+        self.assertEqual(response.data['suppressed_duplicates'], 3)
+
+    def test_window_expiry_and_qr_scan(self):
+        """Test scans after the window, or after a QR scan of the student, go through"""
+        import time
+        from unittest import mock
+        from .throttling import scan_debouncer
+
+        with self.settings(RFID_SCAN_DEBOUNCE_SECONDS=1):
+            self.client.post(reverse('rfid-scan'), self.data, format='json')
+            with mock.patch('core.throttling.time.monotonic', return_value=time.monotonic() + 2):
+                self.client.post(reverse('rfid-scan'), self.data, format='json')
+            self.assertEqual(ScanEvent.objects.count(), 2)
+
+            self.client.force_authenticate(user=User.objects.create_user(username='qr@test.com', password='TestPass123!'))
+            self.assertFalse(self.client.post(reverse('rfid-scan'), self.data, format='json').data['is_present'])
+            self.assertEqual(scan_debouncer.suppressed, 1)
+            self.client.post(reverse('qr-scan'), {'qr_token': 'debounce_token', 'student_id': self.student.student_id}, format='json')
+            response = self.client.post(reverse('rfid-scan'), self.data, format='json')
+            self.assertTrue(response.data['is_present'])
+        self.assertEqual(scan_debouncer.suppressed, 1)
+
+    def test_errors_are_not_remembered(self):
+        """Test a failed scan is retried in full on the next tap"""
+        AttendanceSession.objects.filter(pk=self.session.pk).update(status='stopped')
+        with self.settings(RFID_SCAN_DEBOUNCE_SECONDS=60):
+            response = self.client.post(reverse('rfid-scan'), self.data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            AttendanceSession.objects.filter(pk=self.session.pk).update(status='active')
+            response = self.client.post(reverse('rfid-scan'), self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_disabled_by_default_in_tests(self):
+        """Test a zero window remembers nothing"""
+        self.client.post(reverse('rfid-scan'), self.data, format='json')
+        self.client.post(reverse('rfid-scan'), self.data, format='json')
+        self.assertEqual(ScanEvent.objects.count(), 2)
+
+
+class TaskQueueTestCase(APITestCase):
+    """Test the database-backed task queue and the work moved onto it"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.teacher = Teacher.objects.create(teacher_name='Test Teacher', email='teacher@test.com', rfid='RFID001')
+        self.course = Course.objects.create(course_name='Test Course')
+        self.student = Student.objects.create(
+            student_name='Test Student', email='student@test.com', rfid='RFID_S1', year=1, dept='CS', section='A'
+        )
+        self.session = AttendanceSession.objects.create(
+            teacher=self.teacher, course=self.course, section='A', year=1, qr_code_token='task_token'
+        )
+
+    def test_scan_credits_and_notifies_without_a_task(self):
+        """Test a scan credits the StudentCourse and queues the notification with the record"""
+        from .attendance import register_scan
+        from .models import Notification, Task
+
+        with self.settings(TASK_EXECUTOR='core.tasks.WorkerExecutor'):
+            register_scan(self.session, self.student, ScanEvent.RFID)
+            record = register_scan(self.session, self.student, ScanEvent.QR)
+        self.assertTrue(record.is_present)
+        label = self.session.started_at.strftime('%Y-%m-%d')
+        self.assertEqual(StudentCourse.objects.get(student=self.student).classes_attended, label)
+        notification = Notification.objects.get(kind=Notification.PRESENT)
+        self.assertEqual(notification.payload, {'course': self.course.course_id, 'date': label})
+        self.assertFalse(Task.objects.exists())
+
+    def test_idempotent_enqueue_and_retries(self):
+        """Test known keys are dropped, and failed attempts roll back and retry later"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import Task
+        from .tasks import enqueue, run_due_tasks, task
+
+        calls = []
+
+        @task('tests.flaky', max_attempts=2)
+        def flaky(name):
+            Course.objects.create(course_name=name)
+            calls.append(name)
+            if len(calls) == 1:
+                raise RuntimeError('try again')
+
+        with self.settings(TASK_EXECUTOR='core.tasks.WorkerExecutor', TASK_RETRY_DELAY=60):
+            flaky.enqueue('Queued', key='flaky-1')
+            flaky.enqueue('Queued', key='flaky-1')
+            enqueue('tests.missing')
+            self.assertEqual(Task.objects.count(), 2)
+
+            before = timezone.now()
+            self.assertEqual(run_due_tasks(), {'tasks': 2, 'done': 0, 'failed': 2})
+            retried = Task.objects.get(key='flaky-1')
+            self.assertEqual((retried.status, retried.attempts), ('pending', 1))
+            self.assertGreaterEqual(retried.run_at, before + timedelta(seconds=60))
+            self.assertIn('try again', retried.last_error)
+            self.assertFalse(Course.objects.filter(course_name='Queued').exists())
+            self.assertEqual(Task.objects.get(name='tests.missing').status, 'failed')
+
+            Task.objects.filter(pk=retried.pk).update(run_at=timezone.now())
+            self.assertEqual(run_due_tasks()['done'], 1)
+        self.assertEqual(Course.objects.filter(course_name='Queued').count(), 1)
+
+    def test_claims_do_not_overlap(self):
+        """Test a batch only gets the tasks its own claim stamped"""
+        from unittest import mock
+        from django.db.models.query import QuerySet
+        from django.utils import timezone
+        from .models import Task
+        from .tasks import claim_due
+
+        for i in range(2):
+            Task.objects.create(name='tests.noop', key=f'noop-{i}')
+        now = timezone.now()
+        update, competing = QuerySet.update, []
+
+        def claim_first(queryset, **kwargs):
+            # Another worker with the same clock reading claims the same rows first
+            if not competing:
+                competing.append(None)
+                competing.extend(claim_due(2, now))
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', claim_first):
+            claimed = claim_due(2, now)
+        self.assertEqual(len(competing), 3)
+        self.assertEqual(claimed, [])
+
+    def test_done_tasks_are_pruned(self):
+        """Test done tasks go after TASK_RETENTION, pending and failed ones stay"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import Task
+        from .tasks import prune_tasks
+
+        now = timezone.now()
+        old = now - timedelta(days=8)
+        Task.objects.create(name='tests.old', status='done', finished_at=old)
+        Task.objects.create(name='tests.recent', status='done', finished_at=now)
+        Task.objects.create(name='tests.failed', status='failed', finished_at=old)
+        Task.objects.create(name='tests.pending')
+        with self.settings(TASK_RETENTION=7 * 24 * 60 * 60):
+            self.assertEqual(prune_tasks(now), 1)
+        self.assertEqual(
+            set(Task.objects.values_list('name', flat=True)), {'tests.recent', 'tests.failed', 'tests.pending'}
+        )
+
+    def test_session_qr_code_rendered_ahead(self):
+        """Test starting a session stores its QR code for the qr action of any worker"""
+        from django.core.cache import cache
+
+        user = User.objects.create_user(username='teacher@test.com', password='TestPass123!')
+        self.client.force_authenticate(user=user)
+        response = self.client.post(reverse('attendancesession-list'), {
+            'teacher': self.teacher.teacher_id, 'course': self.course.course_id, 'section': 'A', 'year': 1
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        session = AttendanceSession.objects.get(pk=response.data['session']['id'])
+        self.assertTrue(session.qr_code_image.startswith('data:image/png;base64,'))
+
+        cache.clear()
+        response = self.client.get(reverse('attendancesession-qr', args=[session.id]))
+        self.assertEqual(response.data['qr_code'], session.qr_code_image)
+
+    def test_run_tasks_command(self):
+        """Test the worker command drains the queue"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .attendance import render_qr_code
+
+        with self.settings(TASK_EXECUTOR='core.tasks.WorkerExecutor'):
+            render_qr_code.enqueue('command_token')
+        out = StringIO()
+        call_command('run_tasks', stdout=out)
+        self.assertIn('done: 1', out.getvalue())
+        self.assertIn('pruned: 0', out.getvalue())
+
+
+class TaskThreadPoolTestCase(TransactionTestCase):
+    """Test the development executor runs tasks once their transaction commits"""
+    # Keep the default tenant created by the migrations
+    serialized_rollback = True
+
+    def test_tasks_run_after_commit(self):
+        from django.db import transaction
+        from .models import Task
+        from .tasks import get_executor, task
+
+        @task('tests.create_course')
+        def create_course(name):
+            Course.objects.create(course_name=name)
+
+        with self.settings(TASK_EXECUTOR='core.tasks.ThreadPoolExecutor'):
+            with transaction.atomic():
+                create_course.enqueue('Threaded')
+            get_executor()._pool.shutdown(wait=True)
+        self.assertTrue(Course.objects.filter(course_name='Threaded').exists())
+        self.assertEqual(Task.objects.get().status, 'done')
+
+
+class EnrollmentTestCase(APITestCase):
+    """Test course rosters come from the enrollment index"""
+
+    def setUp(self):
+        from .archive import term_for
+        from .enrollment import reset_rosters
+        reset_rosters()
+        self.teacher = Teacher.objects.create(teacher_name='Test Teacher', email='teacher@test.com', rfid='RFID001')
+        self.course = Course.objects.create(course_name='Test Course')
+        self.other_course = Course.objects.create(course_name='Other Course')
+        self.students = [
+            Student.objects.create(
+                student_name=f'Student {i}', email=f's{i}@test.com', rfid=f'RFID_S{i}', year=1, dept='CS',
+                section='A' if i < 3 else 'B'
+            )
+            for i in range(4)
+        ]
+        self.session = AttendanceSession.objects.create(
+            teacher=self.teacher, course=self.course, section='A', year=1, qr_code_token='enrollment_token'
+        )
+        self.term = term_for(self.session.started_at)
+
+    def scan(self, student):
+        return self.client.post(
+            reverse('rfid-scan'), {'rfid': student.rfid, 'session_id': self.session.id}, format='json'
+        )
+
+    def test_loaded_enrollment_decides_eligibility(self):
+        """Test a loaded course admits its enrollment only, others keep section/year matching"""
+        from .enrollment import course_roster, load_enrollments
+
+        self.assertEqual(course_roster(self.course.course_id, 'A', 1, self.term), {s.student_id for s in self.students[:3]})
+        self.assertEqual(self.scan(self.students[3]).status_code, status.HTTP_400_BAD_REQUEST)
+
+        loaded = load_enrollments(self.term, [
+            (self.course.course_id, self.students[0].student_id, 'A', 1),
+            (self.course.course_id, self.students[3].student_id, 'A', 1),
+            (self.course.course_id, self.students[1].student_id, 'B', 1),
+        ])
+        self.assertEqual(loaded, {'courses': 1, 'enrollments': 3})
+        self.assertEqual(self.scan(self.students[3]).status_code, status.HTTP_200_OK)
+        response = self.scan(self.students[1])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Student is not enrolled in this section/year')
+        self.assertEqual(
+            course_roster(self.other_course.course_id, 'A', 1, self.term), {s.student_id for s in self.students[:3]}
+        )
+
+        # Loading again replaces the course's enrollment for the term
+        load_enrollments(self.term, [(self.course.course_id, self.students[1].student_id, 'A', 1)])
+        self.assertEqual(course_roster(self.course.course_id, 'A', 1, self.term), {self.students[1].student_id})
+        with self.assertRaises(ValueError):
+            load_enrollments('spring', [])
+
+    def test_rosters_are_cached_until_changed(self):
+        """Test repeat lookups skip the database and writes are seen on the next one"""
+        from .enrollment import is_enrolled
+        from .models import Enrollment
+
+        self.assertTrue(is_enrolled(self.session, self.students[0]))
+        with self.assertNumQueries(0):
+            self.assertTrue(is_enrolled(self.session, self.students[1]))
+            self.assertFalse(is_enrolled(self.session, self.students[3]))
+
+        self.students[3].section = 'A'
+        self.students[3].save()
+        self.assertTrue(is_enrolled(self.session, self.students[3]))
+        Enrollment.objects.create(
+            course=self.course, student=self.students[0], section='A', year=1, term=self.term
+        )
+        self.assertFalse(is_enrolled(self.session, self.students[1]))
+
+    def test_reports_and_analytics_use_the_roster(self):
+        """Test absentees of the term report and absence streaks are the enrolled students"""
+        from .enrollment import load_enrollments
+        from .presence import build_presence
+
+        load_enrollments(self.term, [
+            (self.course.course_id, self.students[0].student_id, 'A', 1),
+            (self.course.course_id, self.students[3].student_id, 'A', 1),
+        ])
+        AttendanceSession.objects.filter(pk=self.session.pk).update(status='stopped')
+        build_presence(AttendanceSession, [self.session.id])
+
+        user = User.objects.create_user(username='management@test.com', password='TestPass123!')
+        Management.objects.create(user=user, Management_name='Admin', email='management@test.com')
+        self.client.force_authenticate(user=user)
+        expected = [self.students[0].student_id, self.students[3].student_id]
+
+        response = self.client.get(reverse('term-report'), {
+            'course': self.course.course_id, 'section': 'A', 'year': 1, 'term': self.term, 'format': 'json'
+        })
+        self.assertEqual([row['student'] for row in response.data['students']], expected)
+        response = self.client.get(reverse('analytics-absence-streaks'), {
+            'course': self.course.course_id, 'section': 'A', 'year': 1, 'length': 1
+        })
+        self.assertEqual([row['student'] for row in response.data['students']], expected)
+
+    def test_load_enrollments_command(self):
+        """Test loading a term from a CSV file and from the taught courses' sections"""
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from .models import Enrollment
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as stream:
+            stream.write(f'course,student,section,year\n{self.course.course_id},{self.students[3].student_id},A,1\n')
+        self.addCleanup(os.unlink, stream.name)
+        out = StringIO()
+        call_command('load_enrollments', self.term, stream.name, stdout=out)
+        self.assertIn('Loaded 1 enrollment(s) in 1 course(s)', out.getvalue())
+        self.assertEqual(Enrollment.objects.get().student, self.students[3])
+
+        TaughtCourse.objects.create(
+            course=self.other_course, teacher=self.teacher, classes_taken='', section='B', year=1
+        )
+        call_command('load_enrollments', self.term, '--from-sections', stdout=StringIO())
+        self.assertEqual(
+            list(Enrollment.objects.filter(course=self.other_course).values_list('student_id', flat=True)),
+            [self.students[3].student_id]
+        )
+        with self.assertRaises(CommandError):
+            call_command('load_enrollments', self.term, stdout=StringIO())
+
+
+class TenantTestCase(APITestCase):
+    """Test campuses (tenants) partition the API by host and token"""
+
+    host = 'north.example.edu'
+
+    def setUp(self):
+        from django.core.cache import cache
+        from django.test import override_settings
+        from .models import Tenant
+        from .tenancy import default_tenant_id
+        cache.clear()
+        overrides = override_settings(ALLOWED_HOSTS=['testserver', self.host])
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.default = default_tenant_id()
+        self.north = Tenant.objects.create(name='North', slug='north', domain=self.host)
+        self.teacher = Teacher.objects.create(teacher_name='Teacher', email='teacher@test.com', rfid='T1')
+        self.course = Course.objects.create(course_name='Default Course')
+        self.north_course = Course.objects.create(course_name='North Course', tenant=self.north)
+        self.student = Student.objects.create(
+            student_name='Default Student', email='student@test.com', rfid='RFID1', year=1, dept='CS', section='A'
+        )
+        # RFIDs are only unique within a campus
+        self.north_student = Student.objects.create(
+            student_name='North Student', email='north@test.com', rfid='RFID1', year=1, dept='CS', section='A',
+            tenant=self.north
+        )
+        self.north_session = AttendanceSession.objects.create(
+            teacher=self.teacher, course=self.north_course, section='A', year=1,
+            qr_code_token='north_token', status='active', tenant=self.north
+        )
+
+    def test_rows_default_to_the_current_tenant(self):
+        """Test new rows join the current tenant, else the default one"""
+        from .tenancy import use_tenant
+        self.assertEqual(Course.objects.create(course_name='Other').tenant_id, self.default)
+        with use_tenant(self.north.pk):
+            self.assertEqual(Course.objects.create(course_name='Other').tenant_id, self.north.pk)
+
+    def test_host_selects_the_tenant(self):
+        """Test lists only hold the rows of the host's campus"""
+        self.client.force_authenticate(user=User.objects.create_user(username='admin@test.com'))
+        response = self.client.get(reverse('course-list'))
+        self.assertEqual([row['course_name'] for row in response.data], ['Default Course'])
+        response = self.client.get(reverse('course-list'), HTTP_HOST=self.host)
+        self.assertEqual([row['course_name'] for row in response.data], ['North Course'])
+
+    def test_token_claim_selects_the_tenant(self):
+        """Test a token issued to a campus's user reads that campus on any host"""
+        user = User.objects.create_user(username='mgmt@test.com', email='mgmt@test.com', password='TestPass123!')
+        Management.objects.create(user=user, Management_name='Admin', email='mgmt@test.com', tenant=self.north)
+        response = self.client.post(reverse('login'), {
+            'email': 'mgmt@test.com', 'password': 'TestPass123!'
+        }, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        response = self.client.get(reverse('course-list'))
+        self.assertEqual([row['course_name'] for row in response.data], ['North Course'])
+
+    def test_rfid_scan_is_scoped_by_host(self):
+        """Test the same RFID marks the student of the reader's campus"""
+        url = reverse('rfid-scan')
+        data = {'rfid': 'RFID1', 'session_id': self.north_session.id}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.post(url, data, format='json', HTTP_HOST=self.host)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AttendanceRecord.objects.get(session=self.north_session).student, self.north_student)
+
+    def test_live_stats_are_scoped_by_tenant(self):
+        """Test another campus cannot read the live counters of a session"""
+        from .live_stats import get_backend
+        get_backend().seed(self.north_session.id, {'scanned': 1, 'present': 1, 'rfid_only': 0, 'qr_only': 0})
+        self.client.force_authenticate(user=User.objects.create_user(username='admin@test.com'))
+        url = reverse('attendancesession-stats', args=[self.north_session.id])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(url, HTTP_HOST=self.host)
+        self.assertEqual(response.data['statistics']['present'], 1)
+
+    def test_rfid_unique_within_tenant(self):
+        """Test registering a taken RFID fails on its campus only"""
+        self.client.force_authenticate(user=User.objects.create_user(username='admin@test.com'))
+        data = {'student_name': 'New', 'email': 'new@test.com', 'rfid': 'RFID1', 'year': 1, 'dept': 'CS', 'section': 'B'}
+        response = self.client.post(reverse('student-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('rfid', response.data)
+
+        data['rfid'] = 'RFID2'
+        response = self.client.post(reverse('student-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data['email'] = 'new-north@test.com'
+        response = self.client.post(reverse('student-list'), data, format='json', HTTP_HOST=self.host)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(Student.objects.filter(rfid='RFID2').values_list('tenant_id', flat=True)),
+            [self.default, self.north.pk]
+        )
+
+
+class ShardingTestCase(APITestCase):
+    """Test scan ingestion sharded by session over local SQLite shards"""
+
+    databases = {'default', 'shard1', 'shard2'}
+    shards = ['default', 'shard1', 'shard2']
+
+    def setUp(self):
+        from django.core.cache import cache
+        from django.test import override_settings
+        from .sharding import reserve_id_ranges, shard_for
+        from .throttling import scan_debouncer
+        cache.clear()
+        scan_debouncer.reset()
+        self.addCleanup(scan_debouncer.reset)
+        overrides = override_settings(ATTENDANCE_SHARDS=self.shards)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for alias in self.shards:
+            reserve_id_ranges(alias)
+
+        self.user = User.objects.create_user(username='student@test.com', email='student@test.com')
+        self.teacher = Teacher.objects.create(teacher_name='Teacher', email='teacher@test.com', rfid='T1')
+        self.course = Course.objects.create(course_name='Course')
+        self.student = Student.objects.create(
+            user=self.user, student_name='Student', email='student@test.com', rfid='RFID1', year=1, dept='CS', section='A'
+        )
+        # The first session placed on each shard
+        self.sessions = {}
+        for i in range(30):
+            session = AttendanceSession.objects.create(
+                teacher=self.teacher, course=self.course, section='A', year=1, qr_code_token=f'token_{i}'
+            )
+            self.sessions.setdefault(shard_for(session.id), session)
+        self.assertEqual(sorted(self.sessions), self.shards)
+
+    def scan_everywhere(self):
+        from .attendance import register_scan
+        for alias, session in self.sessions.items():
+            with self.captureOnCommitCallbacks(using=alias, execute=True):
+                register_scan(session, self.student, ScanEvent.RFID)
+                register_scan(session, self.student, ScanEvent.QR)
+
+    def test_ring_moves_few_keys(self):
+        """Test a new node only takes keys over, about its share of them"""
+        from .sharding import HashRing
+        before, after = HashRing(['a', 'b']), HashRing(['a', 'b', 'c'])
+        moved = [key for key in range(3000) if before.node_for(key) != after.node_for(key)]
+        self.assertTrue(all(after.node_for(key) == 'c' for key in moved))
+        self.assertLess(abs(len(moved) / 3000 - 1 / 3), 0.1)
+
+    def test_scans_stay_on_the_session_shard(self):
+        """Test both scans of a session write to its shard, and the session endpoints read from there"""
+        from .sharding import id_range_start
+        self.client.force_authenticate(user=self.user)
+        for alias, session in self.sessions.items():
+            with self.captureOnCommitCallbacks(using=alias, execute=True):
+                response = self.client.post(reverse('rfid-scan'), {'rfid': 'RFID1', 'session_id': session.id}, format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                response = self.client.post(reverse('qr-scan'), {
+                    'qr_token': session.qr_code_token, 'student_id': self.student.student_id
+                }, format='json')
+                self.assertTrue(response.data['is_present'])
+
+            for other in self.shards:
+                expected = 1 if other == alias else 0
+                self.assertEqual(AttendanceRecord.objects.using(other).filter(session_id=session.id).count(), expected)
+                self.assertEqual(ScanEvent.objects.using(other).filter(session_id=session.id).count(), 2 * expected)
+            self.assertGreaterEqual(AttendanceRecord.objects.get(session=session).id, id_range_start(alias))
+
+            response = self.client.get(reverse('attendancesession-attendance', args=[session.id]))
+            self.assertEqual([record['student'] for record in response.data['records']], [self.student.student_id])
+            self.assertEqual(response.data['statistics']['present'], 1)
+
+        self.assertEqual(StudentCourse.objects.get(student=self.student).classes_attended_count, 3)
+        response = self.client.get(reverse('attendancerecord-list'), {'student': self.student.student_id})
+        self.assertEqual(len(response.data), 3)
+
+    def test_analytics_gather_from_every_shard(self):
+        """Test presence bitmaps and session statistics span the shards"""
+        from .live_stats import count_sessions_stats
+        from .presence import session_bitmaps
+        self.scan_everywhere()
+        session_ids = [session.id for session in self.sessions.values()]
+        stats = count_sessions_stats(session_ids)
+        self.assertEqual({session_id: stats[session_id]['present'] for session_id in session_ids}, dict.fromkeys(session_ids, 1))
+
+        AttendanceSession.objects.update(status='stopped')
+        self.teacher.user = User.objects.create_user(username='teacher@test.com', email='teacher@test.com')
+        self.teacher.save()
+        self.client.force_authenticate(user=self.teacher.user)
+        response = self.client.get(reverse('attendancesession-mine'))
+        present = {session['id']: session['statistics']['present'] for session in response.data['sessions']}
+        self.assertEqual(sum(present.values()), 3)
+        self.assertEqual({session_id: present[session_id] for session_id in session_ids}, dict.fromkeys(session_ids, 1))
+
+        index, sessions = session_bitmaps(course=self.course.course_id)
+        present = {session_id: index.student_ids(bits) for session_id, _, bits in sessions}
+        self.assertEqual({session_id: present[session_id] for session_id in session_ids},
+                         dict.fromkeys(session_ids, [self.student.student_id]))
+
+    def test_lookups_route_or_refuse(self):
+        """Test get() and Q lookups of one session go to its shard, and cross-session reads refuse to run"""
+        from django.db.models import Q
+        self.scan_everywhere()
+        session = self.sessions['shard1']
+        self.assertEqual(AttendanceRecord.objects.get(session=session, student=self.student).session_id, session.id)
+        self.assertEqual(AttendanceRecord.objects.filter(Q(session_id=session.id) & Q(is_present=True)).count(), 1)
+        self.assertEqual(session.attendance_records.count(), 1)
+        with self.assertRaises(ValueError):
+            AttendanceRecord.objects.filter(Q(session=session) | Q(student=self.student)).count()
+        with self.assertRaises(ValueError):
+            AttendanceRecord.objects.exclude(session=session).count()
+        with self.assertRaises(ValueError):
+            list(self.student.attendance_records.all())
+
+    def test_record_list_fast_path_reads_every_shard(self):
+        """Test the values_list() record list gathers the shards and matches the model serializer"""
+        from .attendance import register_scan
+        from .models import Tenant
+        self.scan_everywhere()
+        # A session of another campus, whose records the list leaves out
+        north = Tenant.objects.create(name='North', slug='north', domain='north.example.edu')
+        session = AttendanceSession.objects.create(
+            teacher=self.teacher, course=self.course, section='A', year=1, qr_code_token='north_token', tenant=north
+        )
+        register_scan(session, self.student, ScanEvent.RFID)
+
+        self.client.force_authenticate(user=self.user)
+        url = reverse('attendancerecord-list')
+        # The tenant, the primary's records, then their sessions and students
+        with self.assertNumQueries(4, using='default'):
+            fast = self.client.get(url)
+        with self.settings(FAST_LIST_ENDPOINTS=False):
+            full = self.client.get(url)
+        self.assertEqual(fast.content, full.content)
+        self.assertEqual({record['session'] for record in fast.json()}, {session.id for session in self.sessions.values()})
+
+    def test_archiving_moves_records_from_every_shard(self):
+        """Test archiving gathers each shard's records and deletes them once the chunk commits"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .archive import archive_sessions
+        from .models import ArchivedAttendanceRecord
+        self.scan_everywhere()
+        AttendanceSession.objects.update(status='stopped')
+        with self.captureOnCommitCallbacks(execute=True):
+            moved = archive_sessions(timezone.now() + timedelta(seconds=1))
+        self.assertEqual(moved['records'], 3)
+        self.assertEqual(
+            sorted(ArchivedAttendanceRecord.objects.values_list('session_id', flat=True)),
+            sorted(session.id for session in self.sessions.values())
+        )
+        for alias in self.shards:
+            self.assertFalse(AttendanceRecord.objects.using(alias).exists())
+
+    def test_replay_reads_every_shard(self):
+        """Test replay rebuilds each shard's records and credits adjustments logged on the primary"""
+        from .attendance import process_attendance_requests
+        from .replay import AttendanceReplay
+        self.scan_everywhere()
+        request = UpdateAttendanceRequest.objects.create(
+            teacher=self.teacher, student=self.student, course=self.course, classes_to_add='Extra'
+        )
+        process_attendance_requests(UpdateAttendanceRequest.objects.filter(pk=request.pk), True, None)
+        expected = StudentCourse.objects.get(student=self.student).classes_attended
+        for alias in self.shards:
+            AttendanceRecord.objects.using(alias).all().delete()
+        StudentCourse.objects.update(classes_attended='')
+
+        stats = AttendanceReplay().run()
+        self.assertEqual(stats['records'], 3)
+        for alias, session in self.sessions.items():
+            record = AttendanceRecord.objects.using(alias).get(session_id=session.id)
+            self.assertTrue(record.is_present)
+        self.assertEqual(StudentCourse.objects.get(student=self.student).classes_attended, expected)
+
+    def test_deleting_a_session_deletes_its_sharded_records(self):
+        """Test the records of a deleted session go once the delete commits"""
+        self.scan_everywhere()
+        session = self.sessions['shard1']
+        with self.captureOnCommitCallbacks(execute=True):
+            session.delete()
+        self.assertFalse(AttendanceRecord.objects.using('shard1').exists())
+        self.assertTrue(AttendanceRecord.objects.using('shard2').exists())
+
+    def test_rebalance_moves_misplaced_sessions(self):
+        """Test rows left on the primary by an older layout move to their shard with their ids"""
+        from io import StringIO
+        from django.core.management import CommandError, call_command
+        session = self.sessions['shard2']
+        record = AttendanceRecord.objects.using('default').create(session=session, student=self.student, rfid_scanned=True)
+        ScanEvent.objects.using('default').create(
+            kind=ScanEvent.RFID, occurred_at=session.started_at, student=self.student, session=session,
+            course=self.course, teacher=self.teacher
+        )
+
+        with self.assertRaises(CommandError):
+            call_command('rebalance_shards', stdout=StringIO())
+        AttendanceSession.objects.update(status='stopped')
+        out = StringIO()
+        call_command('rebalance_shards', stdout=out)
+        self.assertIn('Moved 1 record(s) and 1 scan event(s) of 1 session(s)', out.getvalue())
+        self.assertFalse(AttendanceRecord.objects.using('default').exists())
+        self.assertEqual(AttendanceRecord.objects.get(session=session).id, record.id)
+        self.assertEqual(ScanEvent.objects.filter(session=session).count(), 1)
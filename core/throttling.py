@@ -0,0 +1,149 @@
+"""
+In-memory token buckets for throttling failed login attempts, and the
+debounce window of RFID scans.
+
+Both live in the worker process, so their limits and counters are per
+worker. Buckets are checked before any password hashing happens; the
+debounce window before any database access.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+
+class TokenBucket:
+    """
+    A keyed token bucket: each key holds up to `capacity` tokens and regains
+    `refill_rate` tokens per second. Fully refilled keys are pruned.
+    """
+
+    def __init__(self, capacity, refill_rate, max_keys=10000):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _level(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.refill_rate)
+
+    def has_tokens(self, key):
+        with self._lock:
+            return self._level(key, time.monotonic()) >= 1
+
+    def retry_after(self, key):
+        """Seconds until `key` regains a token"""
+        with self._lock:
+            missing = 1 - self._level(key, time.monotonic())
+        return max(0, int(missing / self.refill_rate) + 1) if missing > 0 else 0
+
+    def consume(self, key):
+        with self._lock:
+            now = time.monotonic()
+            self._buckets[key] = (max(0.0, self._level(key, now) - 1), now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+
+    def _prune(self, now):
+        full = [key for key in self._buckets if self._level(key, now) >= self.capacity]
+        for key in full:
+            del self._buckets[key]
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class LoginThrottle:
+    """Throttles failed logins per email and per client IP"""
+
+    def __init__(self):
+        config = getattr(settings, 'LOGIN_RATE_LIMIT', {})
+        self.by_email = TokenBucket(
+            config.get('EMAIL_CAPACITY', 5),
+            config.get('EMAIL_REFILL_PER_SECOND', 1 / 60),
+        )
+        self.by_ip = TokenBucket(
+            config.get('IP_CAPACITY', 50),
+            config.get('IP_REFILL_PER_SECOND', 1 / 6),
+        )
+
+    @staticmethod
+    def _keys(request, email):
+        return (email or '').strip().lower(), request.META.get('REMOTE_ADDR', '')
+
+    def retry_after(self, request, email):
+        """Return 0 if the attempt may proceed, else seconds to wait"""
+        email_key, ip_key = self._keys(request, email)
+        if self.by_email.has_tokens(email_key) and self.by_ip.has_tokens(ip_key):
+            return 0
+        return max(self.by_email.retry_after(email_key), self.by_ip.retry_after(ip_key))
+
+    def record_failure(self, request, email):
+        email_key, ip_key = self._keys(request, email)
+        self.by_email.consume(email_key)
+        self.by_ip.consume(ip_key)
+
+    def reset(self):
+        self.by_email.reset()
+        self.by_ip.reset()
+
+
+login_throttle = LoginThrottle()
+
+
+class ScanDebouncer:
+    """
+    Remembers the response to a scan for RFID_SCAN_DEBOUNCE_SECONDS, keyed
+    by (rfid, session id), so the repeats a reader emits for a single tap
+    are answered from memory. `suppressed` counts the repeats answered.
+    Entries live in this process only: each worker has its own window.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self.suppressed = 0
+        self._responses = {}  # key -> (expires, response)
+        self._lock = threading.Lock()
+
+    @property
+    def window(self):
+        return getattr(settings, 'RFID_SCAN_DEBOUNCE_SECONDS', 1.0)
+
+    def get(self, key):
+        """The response remembered for `key`, counted as suppressed; None when there is none"""
+        with self._lock:
+            entry = self._responses.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            self.suppressed += 1
+            return entry[1]
+
+    def remember(self, key, response):
+        if self.window <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._responses[key] = (now + self.window, response)
+            if len(self._responses) > self.max_keys:
+                self._prune(now)
+
+    def forget(self, key):
+        """Drop `key`, e.g. once another scan has made its response stale"""
+        with self._lock:
+            self._responses.pop(key, None)
+
+    def _prune(self, now):
+        expired = [key for key, (expires, _) in self._responses.items() if expires <= now]
+        for key in expired:
+            del self._responses[key]
+
+    def reset(self):
+        with self._lock:
+            self._responses.clear()
+            self.suppressed = 0
+
+
+scan_debouncer = ScanDebouncer()
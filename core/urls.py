@@ -4,9 +4,11 @@ from .views import (
     StudentRegistrationView,
     TeacherRegistrationView,
     ManagementRegistrationView,
+    LoginView,
     StudentLoginView,
     TeacherLoginView,
     ManagementLoginView,
+    LogoutView,
     student_login_page,
     teacher_login_page,
     management_login_page,
@@ -27,7 +29,12 @@ from .views import (
     UpdateAttendanceRequestViewSet,
     AttendanceSessionViewSet,
     AttendanceRecordViewSet,
+    AttendanceAlertViewSet,
+    AttendanceAnalyticsViewSet,
+    MyAttendanceView,
+    TermReportView,
     RFIDScanView,
+    RFIDDebounceStatsView,
     QRScanView
 )
 
@@ -43,6 +50,8 @@ router.register(r'student-courses', StudentCourseViewSet, basename='studentcours
 router.register(r'update-attendance-requests', UpdateAttendanceRequestViewSet, basename='updateattendancerequest')
 router.register(r'attendance-sessions', AttendanceSessionViewSet, basename='attendancesession')
 router.register(r'attendance-records', AttendanceRecordViewSet, basename='attendancerecord')
+router.register(r'attendance-alerts', AttendanceAlertViewSet, basename='attendancealert')
+router.register(r'analytics', AttendanceAnalyticsViewSet, basename='analytics')
 
 urlpatterns = [
     # CRUD API endpoints (from router)
@@ -56,8 +65,15 @@ urlpatterns = [
          UpdateAttendanceRequestViewSet.as_view({'post': 'reject'}), 
          name='updateattendancerequest-reject'),
     
+    # Student self-service endpoints
+    path('me/attendance/', MyAttendanceView.as_view(), name='my-attendance'),
+
+    # Reports
+    path('reports/term/', TermReportView.as_view(), name='term-report'),
+    
     # Attendance scanning endpoints
     path('attendance/rfid-scan/', RFIDScanView.as_view(), name='rfid-scan'),
+    path('attendance/rfid-scan/debounce/', RFIDDebounceStatsView.as_view(), name='rfid-scan-debounce'),
     path('attendance/qr-scan/', QRScanView.as_view(), name='qr-scan'),
     
     # API Registration endpoints
@@ -66,9 +82,11 @@ urlpatterns = [
     path('auth/register/management/', ManagementRegistrationView.as_view(), name='management-register'),
     
     # API Login endpoints
+    path('auth/login/', LoginView.as_view(), name='login'),
     path('auth/login/student/', StudentLoginView.as_view(), name='student-login'),
     path('auth/login/teacher/', TeacherLoginView.as_view(), name='teacher-login'),
     path('auth/login/management/', ManagementLoginView.as_view(), name='management-login'),
+    path('auth/logout/', LogoutView.as_view(), name='api-logout'),
     
     # Template-based login pages
     path('login/student/', student_login_page, name='student-login-page'),
@@ -1,22 +1,60 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from django.db.models import Count, F, Q, prefetch_related_objects
+from django.conf import settings
 from django.utils import timezone
-from django.http import HttpResponse
+from django.utils.functional import SimpleLazyObject
+from django.utils.dateparse import parse_date, parse_datetime
+from django.http import Http404, HttpResponse
 from rest_framework import status, generics, viewsets
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import action
-from rest_framework_simplejwt.tokens import RefreshToken
-import qrcode
-import io
 import base64
+import binascii
+import hashlib
 import secrets
+from .authentication import (
+    ROLE_STUDENT, ROLE_TEACHER, ROLE_MANAGEMENT,
+    LoginFailed, get_profile_id, resolve_login, tokens_for_profile, revoke_user_tokens
+)
+from .attendance import (
+    attendance_percentage, course_attendance, get_pending_request_count, process_attendance_requests, register_scan,
+    render_qr_code, session_qr_code
+)
+from .archive import term_for
+from .caching import CachedResponseMixin, etag_matches, not_modified
+from .dashboards import dashboard_version, get_dashboard
+from .enrollment import course_roster, is_enrolled, session_roster
+from .fastpath import (
+    FastListMixin,
+    StudentValuesSerializer,
+    TaughtCourseValuesSerializer,
+    StudentCourseValuesSerializer,
+    UpdateAttendanceRequestValuesSerializer,
+    AttendanceSessionValuesSerializer,
+    AttendanceRecordValuesSerializer
+)
+from .live_stats import (
+    LIVE_STATS_FIELDS, count_session_stats, count_sessions_stats, get_live_stats, reset_live_stats, seed_live_stats,
+    session_stats, session_stats_annotations
+)
+from .permissions import IsManagement, IsStudent, IsTeacher
+from . import presence
+from .presence import build_presence, invalidate_presence, section_roster, session_bitmaps
+from .renderers import FastJSONRenderer, TermReportCSVRenderer, TermReportHTMLRenderer, TermReportXLSXRenderer
+from .reports import DEFAULT_THRESHOLD, DEFAULT_WINDOW, build_term_report, report_filename
+from .routers import ReplicaReadMixin
+from .sharding import PRIMARY, is_sharded, scatter, shard_for
+from .tenancy import TenantScopedMixin, get_current_tenant, tenant_scope
+from .throttling import login_throttle, scan_debouncer
+from .write_queue import run_serialized
 from .serializers import (
     StudentRegistrationSerializer,
     TeacherRegistrationSerializer,
@@ -30,20 +68,25 @@ from .serializers import (
     TaughtCourseSerializer,
     StudentCourseSerializer,
     UpdateAttendanceRequestSerializer,
+    BulkProcessAttendanceRequestSerializer,
     AttendanceSessionSerializer,
     AttendanceRecordSerializer,
+    ArchivedAttendanceSessionSerializer,
+    ArchivedAttendanceRecordSerializer,
+    AttendanceAlertSerializer,
     RFIDScanSerializer,
     QRScanSerializer
 )
 from .models import (
     Student, Teacher, Management, StudentCourse, TaughtCourse, Course, Class,
-    UpdateAttendanceRequest, AttendanceSession, AttendanceRecord
+    UpdateAttendanceRequest, AttendanceSession, AttendanceRecord, ScanEvent,
+    ArchivedAttendanceSession, ArchivedAttendanceRecord, AttendanceAlert
 )
 
 
 # ============ CRUD ViewSets for all models ============
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(TenantScopedMixin, ReplicaReadMixin, FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet for Student model providing CRUD operations.
     - GET /students/ - List all students
@@ -55,6 +98,7 @@ class StudentViewSet(viewsets.ModelViewSet):
     """
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
+    values_serializer_class = StudentValuesSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -72,7 +116,7 @@ class StudentViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class TeacherViewSet(viewsets.ModelViewSet):
+class TeacherViewSet(TenantScopedMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """
     ViewSet for Teacher model providing CRUD operations.
     - GET /teachers/ - List all teachers
@@ -85,9 +129,10 @@ class TeacherViewSet(viewsets.ModelViewSet):
     queryset = Teacher.objects.all()
     serializer_class = TeacherSerializer
     permission_classes = [IsAuthenticated]
+    cache_models = (Teacher,)
 
 
-class ManagementViewSet(viewsets.ModelViewSet):
+class ManagementViewSet(TenantScopedMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for Management model providing CRUD operations.
     - GET /management/ - List all management users
@@ -102,7 +147,7 @@ class ManagementViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(TenantScopedMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """
     ViewSet for Course model providing CRUD operations.
     - GET /courses/ - List all courses
@@ -115,9 +160,10 @@ class CourseViewSet(viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [IsAuthenticated]
+    cache_models = (Course,)
 
 
-class ClassViewSet(viewsets.ModelViewSet):
+class ClassViewSet(TenantScopedMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """
     ViewSet for Class (Classroom) model providing CRUD operations.
     - GET /classes/ - List all classes
@@ -130,9 +176,10 @@ class ClassViewSet(viewsets.ModelViewSet):
     queryset = Class.objects.all()
     serializer_class = ClassSerializer
     permission_classes = [IsAuthenticated]
+    cache_models = (Class,)
 
 
-class TaughtCourseViewSet(viewsets.ModelViewSet):
+class TaughtCourseViewSet(TenantScopedMixin, CachedResponseMixin, FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet for TaughtCourse model providing CRUD operations.
     - GET /taught-courses/ - List all taught courses
@@ -143,8 +190,11 @@ class TaughtCourseViewSet(viewsets.ModelViewSet):
     - DELETE /taught-courses/{id}/ - Delete a taught course
     """
     queryset = TaughtCourse.objects.all()
+    tenant_field = 'course__tenant'
     serializer_class = TaughtCourseSerializer
+    values_serializer_class = TaughtCourseValuesSerializer
     permission_classes = [IsAuthenticated]
+    cache_models = (TaughtCourse, Course, Teacher)
 
     def get_queryset(self):
         queryset = self.queryset.all()
@@ -158,7 +208,7 @@ class TaughtCourseViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class StudentCourseViewSet(viewsets.ModelViewSet):
+class StudentCourseViewSet(TenantScopedMixin, ReplicaReadMixin, FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet for StudentCourse model providing CRUD operations.
     - GET /student-courses/ - List all student courses
@@ -169,7 +219,9 @@ class StudentCourseViewSet(viewsets.ModelViewSet):
     - DELETE /student-courses/{id}/ - Delete a student course
     """
     queryset = StudentCourse.objects.all()
+    tenant_field = 'student__tenant'
     serializer_class = StudentCourseSerializer
+    values_serializer_class = StudentCourseValuesSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -187,7 +239,7 @@ class StudentCourseViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class UpdateAttendanceRequestViewSet(viewsets.ModelViewSet):
+class UpdateAttendanceRequestViewSet(TenantScopedMixin, ReplicaReadMixin, FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet for UpdateAttendanceRequest model providing CRUD operations.
     - GET /update-attendance-requests/ - List all update attendance requests
@@ -198,10 +250,23 @@ class UpdateAttendanceRequestViewSet(viewsets.ModelViewSet):
     - DELETE /update-attendance-requests/{id}/ - Delete an update attendance request
     - POST /update-attendance-requests/{id}/approve/ - Approve the request (by management)
     - POST /update-attendance-requests/{id}/reject/ - Reject the request (by management)
+    - POST /update-attendance-requests/bulk-process/ - Approve/reject many requests (by management)
+    - GET /update-attendance-requests/queue/ - Pending requests, grouped counts and keyset pages (by management)
+    - GET /update-attendance-requests/pending-count/ - Number of pending requests (by management)
     """
     queryset = UpdateAttendanceRequest.objects.all()
+    tenant_field = 'student__tenant'
     serializer_class = UpdateAttendanceRequestSerializer
+    values_serializer_class = UpdateAttendanceRequestValuesSerializer
     permission_classes = [IsAuthenticated]
+    management_actions = ('approve', 'reject', 'bulk_process', 'queue', 'pending_count')
+    queue_page_size = 50
+    queue_max_page_size = 200
+
+    def get_permissions(self):
+        if self.action in self.management_actions:
+            return [IsAuthenticated(), IsManagement()]
+        return super().get_permissions()
 
     def get_queryset(self):
         queryset = self.queryset
@@ -222,7 +287,6 @@ class UpdateAttendanceRequestViewSet(viewsets.ModelViewSet):
 
     def _process_request(self, request, pk, approve):
         """Helper method to approve or reject a request"""
-        from django.utils import timezone
         from django.http import Http404
 
         try:
@@ -239,47 +303,30 @@ class UpdateAttendanceRequestViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get management user
-        try:
-            management = Management.objects.get(user=request.user)
-        except Management.DoesNotExist:
+        # Get management profile (from the token claims when available)
+        management_id = get_profile_id(request.user, ROLE_MANAGEMENT)
+        if management_id is None:
             return Response(
                 {'error': 'Only management users can process attendance requests'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
+        processed = run_serialized(process_attendance_requests,
+            UpdateAttendanceRequest.objects.filter(pk=attendance_request.pk), approve, management_id
+        )
+        attendance_request.refresh_from_db()
+        if not processed:
+            # Processed concurrently by someone else
+            return Response(
+                {'error': f'Request has already been {attendance_request.status}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         if approve:
-            # Approve: Update the student's attendance in the StudentCourse
-            try:
-                student_course = StudentCourse.objects.get(
-                    student=attendance_request.student,
-                    course=attendance_request.course,
-                    teacher=attendance_request.teacher
-                )
-                # Append the new classes to the existing attendance
-                if student_course.classes_attended:
-                    student_course.classes_attended = f"{student_course.classes_attended}, {attendance_request.classes_to_add}"
-                else:
-                    student_course.classes_attended = attendance_request.classes_to_add
-                student_course.save()
-            except StudentCourse.DoesNotExist:
-                # Create new StudentCourse record if it doesn't exist
-                StudentCourse.objects.create(
-                    student=attendance_request.student,
-                    course=attendance_request.course,
-                    teacher=attendance_request.teacher,
-                    classes_attended=attendance_request.classes_to_add
-                )
-            attendance_request.status = 'approved'
             message = 'Attendance request approved and attendance updated'
         else:
-            attendance_request.status = 'rejected'
             message = 'Attendance request rejected'
 
-        attendance_request.processed_at = timezone.now()
-        attendance_request.processed_by = management
-        attendance_request.save()
-
         serializer = self.get_serializer(attendance_request)
         return Response({
             'message': message,
@@ -294,8 +341,133 @@ class UpdateAttendanceRequestViewSet(viewsets.ModelViewSet):
         """Reject the attendance update request"""
         return self._process_request(request, pk, approve=False)
 
+    @staticmethod
+    def _encode_cursor(row):
+        raw = f"{row['requested_at']}|{row['id']}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        requested_at, pk = raw.rsplit('|', 1)
+        requested_at = parse_datetime(requested_at)
+        if requested_at is None:
+            raise ValueError('bad cursor timestamp')
+        pk = int(pk)
+        if not 0 < pk < 2 ** 63:
+            raise ValueError('bad cursor id')
+        return requested_at, pk
+
+    @action(detail=False, methods=['get'])
+    def queue(self, request):
+        """
+        Pending requests, oldest first, paged by an opaque cursor over
+        (requested_at, id). The first page also carries the per teacher/course
+        counts, computed with one aggregate query.
+        """
+        pending = tenant_scope(UpdateAttendanceRequest.objects.filter(status='pending'), self.tenant_field)
+        for name in ('teacher', 'course'):
+            value = request.query_params.get(name)
+            if value:
+                try:
+                    pending = pending.filter(**{f'{name}_id': int(value)})
+                except ValueError:
+                    return Response({'error': f'{name} must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = int(request.query_params.get('limit', self.queue_page_size))
+            if limit < 1:
+                raise ValueError('limit must be positive')
+            limit = min(limit, self.queue_max_page_size)
+            cursor = request.query_params.get('cursor')
+            after = self._decode_cursor(cursor) if cursor else None
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            return Response({'error': 'Invalid limit or cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+        page = pending.order_by('requested_at', 'id')
+        if after:
+            requested_at, pk = after
+            page = page.filter(Q(requested_at__gt=requested_at) | Q(requested_at=requested_at, id__gt=pk))
+        results = UpdateAttendanceRequestValuesSerializer().serialize(page[:limit + 1])
+        # The extra row only tells whether another page exists
+        has_more = len(results) > limit
+        results = results[:limit]
+        data = {'results': results, 'next_cursor': None}
+        if has_more:
+            data['next_cursor'] = self._encode_cursor(results[-1])
+
+        if not after:
+            data['groups'] = list(
+                pending.order_by()
+                .values('teacher', 'course')
+                .annotate(
+                    teacher_name=F('teacher__teacher_name'),
+                    course_name=F('course__course_name'),
+                    pending=Count('id')
+                )
+                .order_by('-pending', 'teacher', 'course')
+            )
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='pending-count')
+    def pending_count(self, request):
+        """Badge count of pending requests, served from a cached counter"""
+        return Response({'pending': get_pending_request_count(get_current_tenant())}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk-process')
+    def bulk_process(self, request):
+        """
+        Approve or reject many pending requests at once, selected by `ids`
+        and/or the teacher/course filters. Reports the outcome per id.
+        """
+        serializer = BulkProcessAttendanceRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        approve = data['action'] == 'approve'
+        scoped = tenant_scope(UpdateAttendanceRequest.objects.all(), self.tenant_field)
+        queryset = scoped
+        if 'ids' in data:
+            queryset = queryset.filter(id__in=data['ids'])
+        if data.get('teacher'):
+            queryset = queryset.filter(teacher_id=data['teacher'])
+        if data.get('course'):
+            queryset = queryset.filter(course_id=data['course'])
+
+        processed = set(run_serialized(process_attendance_requests,
+            queryset, approve, get_profile_id(request.user, ROLE_MANAGEMENT)
+        ))
+
+        new_status = 'approved' if approve else 'rejected'
+        if 'ids' in data:
+            current = dict(scoped.filter(id__in=data['ids']).order_by().values_list('id', 'status'))
+            if data.get('teacher') or data.get('course'):
+                selected = set(queryset.order_by().values_list('id', flat=True))
+            else:
+                selected = current
+            results = []
+            for request_id in data['ids']:
+                if request_id in processed:
+                    outcome = new_status
+                elif request_id not in current:
+                    outcome = 'not_found'
+                elif request_id not in selected:
+                    outcome = 'filtered_out'  # exists, but not for the requested teacher/course
+                else:
+                    outcome = f'already_{current[request_id]}'
+                results.append({'id': request_id, 'result': outcome})
+        else:
+            results = [{'id': request_id, 'result': new_status} for request_id in sorted(processed)]
+
+        return Response({
+            'message': f'{len(processed)} attendance request(s) {new_status}',
+            'processed': len(processed),
+            'results': results
+        }, status=status.HTTP_200_OK)
+
 
-class AttendanceSessionViewSet(viewsets.ModelViewSet):
+class AttendanceSessionViewSet(TenantScopedMixin, ReplicaReadMixin, FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet for AttendanceSession model providing CRUD operations and session management.
     - GET /attendance-sessions/ - List all attendance sessions
@@ -307,9 +479,13 @@ class AttendanceSessionViewSet(viewsets.ModelViewSet):
     - POST /attendance-sessions/{id}/stop/ - Stop an active session
     - GET /attendance-sessions/{id}/qr/ - Get QR code for the session
     - GET /attendance-sessions/{id}/attendance/ - Get attendance records for the session
+    - GET /attendance-sessions/{id}/stats/ - Get the session's statistics only
+    - GET /attendance-sessions/mine/ - The teacher's sessions of today (or ?date=, ?from=&to=) with statistics
+    Retrieve and attendance also find sessions that have been archived.
     """
     queryset = AttendanceSession.objects.all()
     serializer_class = AttendanceSessionSerializer
+    values_serializer_class = AttendanceSessionValuesSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -344,6 +520,7 @@ class AttendanceSessionViewSet(viewsets.ModelViewSet):
         if serializer.is_valid():
             # Save the session and set the token
             session = serializer.save(qr_code_token=qr_token, status='active')
+            render_qr_code.enqueue(qr_token, key=f'session-qr:{session.id}')
             
             # Return the updated serializer data
             response_serializer = self.get_serializer(session)
@@ -373,6 +550,7 @@ class AttendanceSessionViewSet(viewsets.ModelViewSet):
         session.status = 'stopped'
         session.stopped_at = timezone.now()
         session.save()
+        build_presence(AttendanceSession, [session.id])
 
         serializer = self.get_serializer(session)
         return Response({
@@ -382,7 +560,7 @@ class AttendanceSessionViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def qr(self, request, pk=None):
-        """Generate and return QR code for the session"""
+        """Return the session's QR code, rendered in the background when the session started"""
         try:
             session = self.get_object()
         except AttendanceSession.DoesNotExist:
@@ -397,69 +575,147 @@ class AttendanceSessionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Generate QR code
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(session.qr_code_token)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
-        
         return Response({
-            'qr_code': f'data:image/png;base64,{img_base64}',
+            'qr_code': session_qr_code(session),
             'qr_token': session.qr_code_token,
             'session_id': session.id
         }, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsTeacher])
+    def mine(self, request):
+        """
+        The requesting teacher's sessions started on `date` (default today) or
+        between `from` and `to`, with their statistics from one grouped query
+        (plus one per other shard holding some of them, see core.sharding).
+        Active sessions report their live counters.
+        """
+        today = timezone.localdate()
+        dates = {}
+        for name in ('from', 'to'):
+            raw = request.query_params.get(name) or request.query_params.get('date')
+            try:
+                dates[name] = parse_date(raw) if raw else today
+            except ValueError:
+                dates[name] = None
+            if dates[name] is None:
+                return Response(
+                    {'error': f'{name} must be a date (YYYY-MM-DD)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        if dates['from'] > dates['to']:
+            return Response({'error': 'from must not be after to'}, status=status.HTTP_400_BAD_REQUEST)
+
+        sessions = list(
+            AttendanceSession.objects.filter(
+                teacher_id=get_profile_id(request.user, ROLE_TEACHER),
+                started_at__date__gte=dates['from'], started_at__date__lte=dates['to']
+            )
+            .select_related('teacher', 'course')
+            .annotate(**session_stats_annotations())
+        )
+        live = get_live_stats([session.id for session in sessions if session.status == 'active'])
+        # The annotations only count records on the primary
+        sharded = count_sessions_stats([session.id for session in sessions if shard_for(session.id) != PRIMARY])
+
+        results = []
+        for session in sessions:
+            stats = sharded.get(session.id) or {field: getattr(session, field) for field in LIVE_STATS_FIELDS}
+            if session.status == 'active':
+                if session.id in live:
+                    stats = live[session.id]
+                else:
+                    seed_live_stats(session.id, stats)
+            roster = len(session_roster(session))
+            data = AttendanceSessionSerializer(session).data
+            data['statistics'] = {
+                'roster': roster,
+                **stats,
+                'absent': max(roster - stats['present'], 0),
+            }
+            results.append(data)
+
+        return Response({
+            'from': dates['from'].isoformat(),
+            'to': dates['to'].isoformat(),
+            'sessions': results,
+        }, status=status.HTTP_200_OK)
+
+    def get_archived_session(self):
+        """The session from the archive, for sessions no longer in the live table"""
+        return generics.get_object_or_404(
+            tenant_scope(ArchivedAttendanceSession.objects.select_related('teacher', 'course')), pk=self.kwargs['pk']
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            session = self.get_archived_session()
+            return Response(ArchivedAttendanceSessionSerializer(session).data)
+
     @action(detail=True, methods=['get'])
     def attendance(self, request, pk=None):
-        """Get attendance records for the session"""
+        """Get attendance records for the session, live or archived"""
         try:
             session = self.get_object()
-        except AttendanceSession.DoesNotExist:
-            return Response(
-                {'error': 'Attendance session not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-
-        records = AttendanceRecord.objects.filter(session=session)
-        serializer = AttendanceRecordSerializer(records, many=True)
-        
-        # Calculate statistics
-        total_students = records.count()
-        present_students = records.filter(is_present=True).count()
-        rfid_only = records.filter(rfid_scanned=True, qr_scanned=False).count()
-        qr_only = records.filter(rfid_scanned=False, qr_scanned=True).count()
+            records = AttendanceRecord.objects.filter(session=session)
+            serializer = AttendanceRecordSerializer(records, many=True)
+            stats = session_stats(session)
+        except Http404:
+            session = self.get_archived_session()
+            records = session.attendance_records.all()
+            serializer = ArchivedAttendanceRecordSerializer(records, many=True)
+            stats = count_session_stats(records)
         
         return Response({
             'records': serializer.data,
-            'statistics': {
-                'total_students': total_students,
-                'present': present_students,
-                'absent': total_students - present_students,
-                'rfid_only': rfid_only,
-                'qr_only': qr_only
-            }
+            'statistics': self.format_statistics(stats)
         }, status=status.HTTP_200_OK)
 
+    @staticmethod
+    def format_statistics(stats):
+        return {
+            'total_students': stats['scanned'],
+            'present': stats['present'],
+            'absent': stats['scanned'] - stats['present'],
+            'rfid_only': stats['rfid_only'],
+            'qr_only': stats['qr_only']
+        }
 
-class AttendanceRecordViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Statistics of the session without its records. While the session is
+        active they are served from the live counters, after the one query
+        resolving the session within the caller's campus.
+        """
+        try:
+            session = self.get_object()
+            stats = session_stats(session)
+        except Http404:
+            session = self.get_archived_session()
+            stats = count_session_stats(session.attendance_records.all())
+        return Response({
+            'session_id': session.id, 'status': session.status, 'statistics': self.format_statistics(stats)
+        })
+
+
+class AttendanceRecordViewSet(TenantScopedMixin, ReplicaReadMixin, FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet for AttendanceRecord model providing CRUD operations.
     - GET /attendance-records/ - List all attendance records
     - GET /attendance-records/{id}/ - Retrieve an attendance record
+    Filtering by an archived session, or by student, includes archived records.
+    With records sharded (see core.sharding), they are gathered from the
+    filtered session's shard or from every shard.
     """
     queryset = AttendanceRecord.objects.all()
+    tenant_field = 'session__tenant'
     serializer_class = AttendanceRecordSerializer
+    values_serializer_class = AttendanceRecordValuesSerializer
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        queryset = self.queryset.all()
+    def apply_filters(self, queryset):
         # Optional filters
         session_id = self.request.query_params.get('session')
         student_id = self.request.query_params.get('student')
@@ -474,48 +730,351 @@ class AttendanceRecordViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    def get_queryset(self):
+        return self.apply_filters(self.queryset.all())
+
+    def get_archived_queryset(self):
+        """
+        Archived records a historical query asks for: those of an archived
+        `session`, or a `student`'s archived records. None for other queries.
+        """
+        session_id = self.request.query_params.get('session')
+        if session_id:
+            if tenant_scope(AttendanceSession.objects.filter(pk=session_id)).exists():
+                return None
+        elif not self.request.query_params.get('student'):
+            return None
+        return self.apply_filters(tenant_scope(ArchivedAttendanceRecord.objects.all(), self.tenant_field))
+
+    def sharded_records(self, queryset):
+        """
+        The rows of `queryset` gathered from the shards, limited to the current
+        tenant. Sharded rows cannot join the primary, so their students and
+        sessions are fetched from it afterwards.
+        """
+        records = list(scatter(queryset))
+        prefetch_related_objects(records, 'student', 'session__course', 'session__teacher')
+        tenant_id = get_current_tenant()
+        return [record for record in records if tenant_id is None or record.session.tenant_id == tenant_id]
+
+    def get_object(self):
+        if not is_sharded():
+            return super().get_object()
+        records = self.sharded_records(AttendanceRecord.objects.filter(pk=self.kwargs['pk']))
+        if not records:
+            raise Http404
+        self.check_object_permissions(self.request, records[0])
+        return records[0]
+
+    def serialize_records(self, queryset, serializer_class):
+        if self.use_values_serializer(self.request):
+            return self.values_serializer_class().serialize(queryset)
+        return list(serializer_class(queryset, many=True, context=self.get_serializer_context()).data)
+
+    def list(self, request, *args, **kwargs):
+        archived = self.get_archived_queryset()
+        if is_sharded():
+            # The tenant filter joins sessions, which are on the primary only
+            queryset = self.get_queryset()
+            if self.use_values_serializer(request):
+                live = self.values_serializer_class().serialize_sharded(queryset, get_current_tenant())
+            else:
+                records = self.sharded_records(queryset)
+                live = list(AttendanceRecordSerializer(records, many=True, context=self.get_serializer_context()).data)
+        elif archived is None:
+            return super().list(request, *args, **kwargs)
+        else:
+            live = self.serialize_records(self.filter_queryset(self.get_queryset()), AttendanceRecordSerializer)
+        if archived is None:
+            return Response(live)
+        # Archived records are older than any live one, so they follow them
+        return Response(live + self.serialize_records(archived, ArchivedAttendanceRecordSerializer))
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        reset_live_stats([instance.session_id])
+        invalidate_presence([instance.session_id])
+
+
+class AttendanceAlertViewSet(TenantScopedMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Low attendance alerts raised by `manage.py detect_low_attendance`.
+    - GET /attendance-alerts/ - Open alerts, newest first
+    - GET /attendance-alerts/{id}/ - Retrieve an alert
+    `status` is open (default), resolved or all; `scope` is course or
+    overall; also filtered by `student`, `course` and `teacher`. Teachers
+    only see the alerts of their own courses.
+    """
+    queryset = AttendanceAlert.objects.select_related('student', 'course', 'teacher')
+    tenant_field = 'student__tenant'
+    serializer_class = AttendanceAlertSerializer
+    permission_classes = [IsAuthenticated, IsTeacher | IsManagement]
+
+    def get_queryset(self):
+        queryset = self.queryset.all()
+        if get_profile_id(self.request.user, ROLE_MANAGEMENT) is None:
+            queryset = queryset.filter(teacher_id=get_profile_id(self.request.user, ROLE_TEACHER))
+
+        params = self.request.query_params
+        if self.action == 'list':
+            alert_status = params.get('status', 'open')
+            if alert_status == 'open':
+                queryset = queryset.filter(resolved_at__isnull=True)
+            elif alert_status == 'resolved':
+                queryset = queryset.filter(resolved_at__isnull=False)
+        scope = params.get('scope')
+        if scope in ('course', 'overall'):
+            queryset = queryset.filter(course__isnull=scope == 'overall')
+        for name in ('student', 'course', 'teacher'):
+            if params.get(name):
+                queryset = queryset.filter(**{f'{name}_id': params[name]})
+        return queryset
+
+
+class AttendanceAnalyticsViewSet(viewsets.ViewSet):
+    """
+    Attendance analytics over stopped sessions, live and archived, computed
+    from their presence bitmaps (see core.presence).
+    - GET /analytics/attendance-rates/ - Each student's share of sessions attended
+    - GET /analytics/absence-streaks/ - Students who missed `length` sessions in a row
+    - GET /analytics/overlap/ - Students attending sessions of every one of `sections`
+    Sessions are selected with the `course`, `teacher`, `section` and `year` filters.
+    """
+    permission_classes = [IsAuthenticated, IsTeacher | IsManagement]
+
+    def session_filters(self, request, *names):
+        """The session filters among `names`, and the tenant; raises ValueError for a non-integer id or year"""
+        filters = {}
+        for name in names:
+            value = request.query_params.get(name) or None
+            if value is not None and name != 'section':
+                try:
+                    value = int(value)
+                except ValueError:
+                    raise ValueError(f'{name} must be an integer')
+            filters[name] = value
+        filters['tenant'] = get_current_tenant()
+        return filters
+
+    def roster(self, filters, index, sessions):
+        """
+        Bitmap over `index` of the students expected at `sessions`: the
+        course's enrollment in their terms when a course is given, else the
+        section and year
+        """
+        if filters['course'] is None:
+            return index.bitmap(section_roster(filters['section'], filters['year'], filters['tenant']))
+        students = set()
+        for term in {term_for(started_at) for _, started_at, _ in sessions}:
+            students |= course_roster(filters['course'], filters['section'], filters['year'], term)
+        return index.bitmap(sorted(students))
+
+    def student_list(self, student_ids, **extra):
+        """Students with their names, in id order, each merged with extra[field][id]"""
+        names = dict(Student.objects.filter(pk__in=student_ids).values_list('student_id', 'student_name'))
+        return [
+            {'student': student_id, 'student_name': names.get(student_id),
+             **{field: values[student_id] for field, values in extra.items()}}
+            for student_id in sorted(student_ids)
+        ]
+
+    @action(detail=False, methods=['get'], url_path='attendance-rates')
+    def attendance_rates(self, request):
+        """
+        Rate of every student attending the sessions (the whole roster of the
+        section and year when both are given), optionally within min_rate/max_rate.
+        """
+        try:
+            filters = self.session_filters(request, 'course', 'teacher', 'section', 'year')
+            min_rate = float(request.query_params.get('min_rate', 0))
+            max_rate = float(request.query_params.get('max_rate', 100))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        index, sessions = session_bitmaps(**filters)
+        bitmaps = [bits for _, _, bits in sessions]
+        roster = 0
+        if filters['section'] and filters['year']:
+            roster = self.roster(filters, index, sessions)
+        rates = {
+            index.students[position]: rate for position, rate in presence.attendance_rates(bitmaps, roster).items()
+            if min_rate <= rate <= max_rate
+        }
+        return Response({
+            'sessions': len(bitmaps),
+            'students': self.student_list(list(rates), rate=rates),
+        })
+
+    @action(detail=False, methods=['get'], url_path='absence-streaks')
+    def absence_streaks(self, request):
+        """Students of the section and year who missed `length` (default 3) sessions in a row"""
+        try:
+            filters = self.session_filters(request, 'course', 'teacher', 'section', 'year')
+            if not filters['section'] or not filters['year']:
+                raise ValueError('section and year are required')
+            length = int(request.query_params.get('length', 3))
+            if length < 1:
+                raise ValueError('length must be positive')
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        index, sessions = session_bitmaps(**filters)
+        bitmaps = [bits for _, _, bits in sessions]
+        missed = presence.absence_streaks(bitmaps, self.roster(filters, index, sessions), length)
+        return Response({
+            'sessions': len(bitmaps),
+            'length': length,
+            'students': self.student_list(index.student_ids(missed)),
+        })
+
+    @action(detail=False, methods=['get'])
+    def overlap(self, request):
+        """Attendees of each of the comma separated `sections`, and those attending all of them"""
+        sections = [section for section in request.query_params.get('sections', '').split(',') if section]
+        try:
+            filters = self.session_filters(request, 'course', 'teacher', 'year')
+            if len(sections) < 2:
+                raise ValueError('sections must list at least two comma separated sections')
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Sections have rosters of their own, so their bitmaps are over different indexes
+        per_section = {}
+        for section in sections:
+            index, sessions = session_bitmaps(section=section, **filters)
+            per_section[section] = set(index.student_ids(presence.attendees(bits for _, _, bits in sessions)))
+        return Response({
+            'attendees': {section: len(student_ids) for section, student_ids in per_section.items()},
+            'students': self.student_list(set.intersection(*per_section.values())),
+        })
+
+
+class MyAttendanceView(APIView):
+    """
+    API endpoint for a student's own attendance
+    GET /me/attendance/
+
+    Per-course held/attended/percentage and the overall figure, from the
+    class counters in one query. Responses carry an ETag derived from the
+    student's dashboard version, so a conditional GET with an unchanged
+    version is answered 304 without touching the database.
+    """
+    permission_classes = [IsAuthenticated, IsStudent]
+
+    def get(self, request):
+        student_id = get_profile_id(request.user, ROLE_STUDENT)
+        # Read before the data, so the tag can only ever be older than it
+        version = dashboard_version(ROLE_STUDENT, student_id)
+        etag = f'"{hashlib.md5(version.encode()).hexdigest()}"'
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        courses = []
+        total_attended = total_held = 0
+        for course in course_attendance(student_id):
+            held = course['held'] or 0
+            if course['held'] is not None:
+                # Courses without a TaughtCourse are left out, as in overall_attendance()
+                total_attended += course['attended']
+                total_held += held
+            courses.append({
+                'course': course['course_id'],
+                'course_name': course['course_name'],
+                'teacher': course['teacher_id'],
+                'teacher_name': course['teacher_name'],
+                'held': held,
+                'attended': course['attended'],
+                'percentage': attendance_percentage(course['attended'], held),
+            })
+
+        response = Response({
+            'student': student_id,
+            'courses': courses,
+            'overall': {
+                'held': total_held,
+                'attended': total_attended,
+                'percentage': attendance_percentage(total_attended, total_held),
+            },
+        })
+        response['ETag'] = etag
+        return response
+
+
+class TermReportView(APIView):
+    """
+    API endpoint for term attendance reports
+    GET /reports/term/?course=&section=&year=&term=2024-S1
+
+    The attendance grid of a course's section and year over a term, with
+    rates, recent rates over the last `window` sessions, session turnout
+    and its moving average, and students below `threshold` flagged (see
+    core.reports). `format` selects json (default), csv, html or xlsx; the
+    csv and xlsx files are sent as attachments.
+    """
+    permission_classes = [IsAuthenticated, IsTeacher | IsManagement]
+    renderer_classes = [FastJSONRenderer, TermReportCSVRenderer, TermReportHTMLRenderer, TermReportXLSXRenderer]
+    ATTACHMENT_FORMATS = ('csv', 'xlsx')
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            missing = [name for name in ('course', 'section', 'year', 'term') if not params.get(name)]
+            if missing:
+                raise ValueError(f"{', '.join(missing)} required")
+            try:
+                course_id, year = int(params['course']), int(params['year'])
+                threshold = float(params.get('threshold', DEFAULT_THRESHOLD))
+                window = int(params.get('window', DEFAULT_WINDOW))
+            except ValueError:
+                raise ValueError('course, year and window must be integers, threshold a number')
+            if window < 1:
+                raise ValueError('window must be positive')
+            course = tenant_scope(Course.objects.filter(pk=course_id)).first()
+            if course is None:
+                raise Http404('Course not found')
+            report = build_term_report(course, params['section'], year, params['term'], threshold, window)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = Response(report)
+        if request.accepted_renderer.format in self.ATTACHMENT_FORMATS:
+            filename = report_filename(report, request.accepted_renderer.format)
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
 
 class RFIDScanView(APIView):
     """
     API endpoint for RFID scanning
     POST /attendance/rfid-scan/
+
+    Readers repeat a tap several times within a second: a card scanned again
+    in the same session within RFID_SCAN_DEBOUNCE_SECONDS gets the first
+    scan's response back without touching the database.
     """
     permission_classes = [AllowAny]  # Allow hardware to scan without auth
 
-    def _mark_attendance_if_complete(self, record, session):
-        """
-        Helper method to mark attendance and update StudentCourse if both scans are complete.
-        """
-        if record.rfid_scanned and record.qr_scanned:
-            record.is_present = True
-            record.marked_present_at = timezone.now()
-            
-            # Update StudentCourse attendance
-            student_course, _ = StudentCourse.objects.get_or_create(
-                student=record.student,
-                course=session.course,
-                teacher=session.teacher
-            )
-            
-            # Append the session date to classes_attended
-            session_date = session.started_at.strftime('%Y-%m-%d')
-            if student_course.classes_attended:
-                student_course.classes_attended = f"{student_course.classes_attended}, {session_date}"
-            else:
-                student_course.classes_attended = session_date
-            student_course.save()
-
     def post(self, request):
         serializer = RFIDScanSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        rfid = serializer.validated_data['rfid']
-        session_id = serializer.validated_data['session_id']
-
+        rfid, session_id = serializer.validated_data['rfid'], serializer.validated_data['session_id']
+        # RFIDs are only unique within a campus
+        key = (get_current_tenant(), rfid, session_id)
+        cached = scan_debouncer.get(key)
+        if cached is not None:
+            return Response(cached[1], status=cached[0])
+        response = self.scan(rfid, session_id)
+        if status.is_success(response.status_code):
+            # Errors may clear up on the next tap, e.g. once the session is started
+            scan_debouncer.remember(key, (response.status_code, response.data))
+        return response
+
+    def scan(self, rfid, session_id):
         # Get student by RFID
         try:
-            student = Student.objects.get(rfid=rfid)
+            student = tenant_scope(Student.objects.all()).get(rfid=rfid)
         except Student.DoesNotExist:
             return Response(
                 {'error': 'Student not found with this RFID'},
@@ -524,7 +1083,7 @@ class RFIDScanView(APIView):
 
         # Get session
         try:
-            session = AttendanceSession.objects.get(id=session_id)
+            session = tenant_scope(AttendanceSession.objects.all()).get(id=session_id)
         except AttendanceSession.DoesNotExist:
             return Response(
                 {'error': 'Attendance session not found'},
@@ -539,26 +1098,14 @@ class RFIDScanView(APIView):
             )
 
         # Check if student is enrolled in this course/section/year
-        if student.section != session.section or student.year != session.year:
+        if not is_enrolled(session, student):
             return Response(
                 {'error': 'Student is not enrolled in this section/year'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get or create attendance record
-        record, created = AttendanceRecord.objects.get_or_create(
-            session=session,
-            student=student
-        )
-
-        # Update RFID scan
-        record.rfid_scanned = True
-        record.rfid_scanned_at = timezone.now()
-
-        # Check if both RFID and QR are scanned
-        self._mark_attendance_if_complete(record, session)
-
-        record.save()
+        # Update the attendance record, marking the student present once both scans are in
+        record = run_serialized(register_scan, session, student, ScanEvent.RFID)
 
         return Response({
             'message': 'RFID scanned successfully',
@@ -570,6 +1117,22 @@ class RFIDScanView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+class RFIDDebounceStatsView(APIView):
+    """
+    API endpoint for tuning the RFID debounce window
+    GET /attendance/rfid-scan/debounce/
+
+    Repeated taps suppressed by this worker process since it started.
+    """
+    permission_classes = [IsAuthenticated, IsManagement]
+
+    def get(self, request):
+        return Response({
+            'window_seconds': scan_debouncer.window,
+            'suppressed_duplicates': scan_debouncer.suppressed,
+        })
+
+
 class QRScanView(APIView):
     """
     API endpoint for QR code scanning
@@ -577,29 +1140,6 @@ class QRScanView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
-    def _mark_attendance_if_complete(self, record, session):
-        """
-        Helper method to mark attendance and update StudentCourse if both scans are complete.
-        """
-        if record.rfid_scanned and record.qr_scanned:
-            record.is_present = True
-            record.marked_present_at = timezone.now()
-            
-            # Update StudentCourse attendance
-            student_course, _ = StudentCourse.objects.get_or_create(
-                student=record.student,
-                course=session.course,
-                teacher=session.teacher
-            )
-            
-            # Append the session date to classes_attended
-            session_date = session.started_at.strftime('%Y-%m-%d')
-            if student_course.classes_attended:
-                student_course.classes_attended = f"{student_course.classes_attended}, {session_date}"
-            else:
-                student_course.classes_attended = session_date
-            student_course.save()
-
     def post(self, request):
         serializer = QRScanSerializer(data=request.data)
         if not serializer.is_valid():
@@ -610,7 +1150,7 @@ class QRScanView(APIView):
 
         # Get student
         try:
-            student = Student.objects.get(student_id=student_id)
+            student = tenant_scope(Student.objects.all()).get(student_id=student_id)
         except Student.DoesNotExist:
             return Response(
                 {'error': 'Student not found'},
@@ -619,7 +1159,7 @@ class QRScanView(APIView):
 
         # Get session by QR token
         try:
-            session = AttendanceSession.objects.get(qr_code_token=qr_token)
+            session = tenant_scope(AttendanceSession.objects.all()).get(qr_code_token=qr_token)
         except AttendanceSession.DoesNotExist:
             return Response(
                 {'error': 'Invalid QR code or session not found'},
@@ -634,26 +1174,16 @@ class QRScanView(APIView):
             )
 
         # Check if student is enrolled in this course/section/year
-        if student.section != session.section or student.year != session.year:
+        if not is_enrolled(session, student):
             return Response(
                 {'error': 'Student is not enrolled in this section/year'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get or create attendance record
-        record, created = AttendanceRecord.objects.get_or_create(
-            session=session,
-            student=student
-        )
-
-        # Update QR scan
-        record.qr_scanned = True
-        record.qr_scanned_at = timezone.now()
-
-        # Check if both RFID and QR are scanned
-        self._mark_attendance_if_complete(record, session)
-
-        record.save()
+        # Update the attendance record, marking the student present once both scans are in
+        record = run_serialized(register_scan, session, student, ScanEvent.QR)
+        # A debounced RFID response of this student would now be stale
+        scan_debouncer.forget((get_current_tenant(), student.rfid, session.id))
 
         return Response({
             'message': 'QR code scanned successfully',
@@ -728,201 +1258,148 @@ class ManagementRegistrationView(generics.CreateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class StudentLoginView(APIView):
+def _profile_payload(role, profile):
+    """Role specific part of the login response"""
+    if role == ROLE_STUDENT:
+        return {
+            'student_id': profile.student_id,
+            'student_name': profile.student_name,
+            'email': profile.email
+        }
+    if role == ROLE_TEACHER:
+        return {
+            'teacher_id': profile.teacher_id,
+            'teacher_name': profile.teacher_name,
+            'email': profile.email
+        }
+    return {
+        'management_id': profile.Management_id,
+        'management_name': profile.Management_name,
+        'email': profile.email
+    }
+
+
+class LoginView(APIView):
     """
-    API endpoint for student login
+    API endpoint for login.
+    Resolves the user and profile in one query and issues role-claim tokens.
+    POST /auth/login/ accepts an optional `user_type`; the role specific
+    endpoints below fix it.
     """
     permission_classes = [AllowAny]
+    role = None
 
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
-        if serializer.is_valid():
-            email = serializer.validated_data['email']
-            password = serializer.validated_data['password']
-            
-            # Authenticate user
-            user = authenticate(username=email, password=password)
-            
-            if user is not None:
-                # Check if user has a student profile
-                try:
-                    student = Student.objects.get(user=user)
-                    # Generate JWT tokens
-                    refresh = RefreshToken.for_user(user)
-                    return Response({
-                        'message': 'Login successful',
-                        'refresh': str(refresh),
-                        'access': str(refresh.access_token),
-                        'user_type': 'student',
-                        'student_id': student.student_id,
-                        'student_name': student.student_name,
-                        'email': student.email
-                    }, status=status.HTTP_200_OK)
-                except Student.DoesNotExist:
-                    return Response({
-                        'error': 'Student profile not found for this user'
-                    }, status=status.HTTP_404_NOT_FOUND)
-            else:
-                return Response({
-                    'error': 'Invalid email or password'
-                }, status=status.HTTP_401_UNAUTHORIZED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        email = serializer.validated_data['email']
+        password = serializer.validated_data['password']
+        role = self.role or serializer.validated_data.get('user_type')
+
+        # Refuse throttled attempts before spending time on password hashing
+        retry_after = login_throttle.retry_after(request, email)
+        if retry_after:
+            return Response({
+                'error': 'Too many failed login attempts. Try again later.'
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(retry_after)})
+
+        try:
+            user, role, profile = resolve_login(email, password, role)
+        except LoginFailed as e:
+            if e.status_code == status.HTTP_401_UNAUTHORIZED:
+                login_throttle.record_failure(request, email)
+            return Response({'error': e.message}, status=e.status_code)
 
+        refresh = tokens_for_profile(user, role, profile.pk, profile.tenant_id)
+        return Response({
+            'message': 'Login successful',
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+            'user_type': role,
+            **_profile_payload(role, profile)
+        }, status=status.HTTP_200_OK)
 
-class TeacherLoginView(APIView):
+
+class StudentLoginView(LoginView):
     """
-    API endpoint for teacher login
+    API endpoint for student login
     """
-    permission_classes = [AllowAny]
+    role = ROLE_STUDENT
 
-    def post(self, request):
-        serializer = LoginSerializer(data=request.data)
-        if serializer.is_valid():
-            email = serializer.validated_data['email']
-            password = serializer.validated_data['password']
-            
-            # Authenticate user
-            user = authenticate(username=email, password=password)
-            
-            if user is not None:
-                # Check if user has a teacher profile
-                try:
-                    teacher = Teacher.objects.get(user=user)
-                    # Generate JWT tokens
-                    refresh = RefreshToken.for_user(user)
-                    return Response({
-                        'message': 'Login successful',
-                        'refresh': str(refresh),
-                        'access': str(refresh.access_token),
-                        'user_type': 'teacher',
-                        'teacher_id': teacher.teacher_id,
-                        'teacher_name': teacher.teacher_name,
-                        'email': teacher.email
-                    }, status=status.HTTP_200_OK)
-                except Teacher.DoesNotExist:
-                    return Response({
-                        'error': 'Teacher profile not found for this user'
-                    }, status=status.HTTP_404_NOT_FOUND)
-            else:
-                return Response({
-                    'error': 'Invalid email or password'
-                }, status=status.HTTP_401_UNAUTHORIZED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class TeacherLoginView(LoginView):
+    """
+    API endpoint for teacher login
+    """
+    role = ROLE_TEACHER
 
-class ManagementLoginView(APIView):
+
+class ManagementLoginView(LoginView):
     """
     API endpoint for management login
     """
-    permission_classes = [AllowAny]
+    role = ROLE_MANAGEMENT
+
+
+class LogoutView(APIView):
+    """
+    API endpoint for logout.
+    Revokes every token issued to the user so far.
+    """
+    permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        serializer = LoginSerializer(data=request.data)
-        if serializer.is_valid():
-            email = serializer.validated_data['email']
-            password = serializer.validated_data['password']
-            
-            # Authenticate user
-            user = authenticate(username=email, password=password)
-            
-            if user is not None:
-                # Check if user has a management profile
-                try:
-                    management = Management.objects.get(user=user)
-                    # Generate JWT tokens
-                    refresh = RefreshToken.for_user(user)
-                    return Response({
-                        'message': 'Login successful',
-                        'refresh': str(refresh),
-                        'access': str(refresh.access_token),
-                        'user_type': 'management',
-                        'management_id': management.Management_id,
-                        'management_name': management.Management_name,
-                        'email': management.email
-                    }, status=status.HTTP_200_OK)
-                except Management.DoesNotExist:
-                    return Response({
-                        'error': 'Management profile not found for this user'
-                    }, status=status.HTTP_404_NOT_FOUND)
-            else:
-                return Response({
-                    'error': 'Invalid email or password'
-                }, status=status.HTTP_401_UNAUTHORIZED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        revoke_user_tokens(request.user.id)
+        return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
 
 
 # Template-based views for login and register pages
 
-def student_login_page(request):
-    """
-    Django template view for student login
-    """
+def _login_page(request, role, template, dashboard):
+    """Shared POST handling for the template login pages"""
     if request.method == 'POST':
         email = request.POST.get('email')
         password = request.POST.get('password')
-        
-        user = authenticate(request, username=email, password=password)
-        
-        if user is not None:
-            try:
-                student = Student.objects.get(user=user)
-                login(request, user)
-                messages.success(request, 'Login successful!')
-                return redirect('student-dashboard')
-            except Student.DoesNotExist:
-                messages.error(request, 'Student profile not found for this user')
+
+        if login_throttle.retry_after(request, email):
+            messages.error(request, 'Too many failed login attempts. Try again later.')
+            return render(request, template)
+
+        try:
+            user, _, _ = resolve_login(email, password, role)
+        except LoginFailed as e:
+            if e.status_code == status.HTTP_401_UNAUTHORIZED:
+                login_throttle.record_failure(request, email)
+            messages.error(request, e.message)
         else:
-            messages.error(request, 'Invalid email or password')
-    
-    return render(request, 'core/student_login.html')
+            login(request, user, backend='django.contrib.auth.backends.ModelBackend')
+            messages.success(request, 'Login successful!')
+            return redirect(dashboard)
+
+    return render(request, template)
+
+
+def student_login_page(request):
+    """
+    Django template view for student login
+    """
+    return _login_page(request, ROLE_STUDENT, 'core/student_login.html', 'student-dashboard')
 
 
 def teacher_login_page(request):
     """
     Django template view for teacher login
     """
-    if request.method == 'POST':
-        email = request.POST.get('email')
-        password = request.POST.get('password')
-        
-        user = authenticate(request, username=email, password=password)
-        
-        if user is not None:
-            try:
-                teacher = Teacher.objects.get(user=user)
-                login(request, user)
-                messages.success(request, 'Login successful!')
-                return redirect('teacher-dashboard')
-            except Teacher.DoesNotExist:
-                messages.error(request, 'Teacher profile not found for this user')
-        else:
-            messages.error(request, 'Invalid email or password')
-    
-    return render(request, 'core/teacher_login.html')
+    return _login_page(request, ROLE_TEACHER, 'core/teacher_login.html', 'teacher-dashboard')
 
 
 def management_login_page(request):
     """
     Django template view for management login
     """
-    if request.method == 'POST':
-        email = request.POST.get('email')
-        password = request.POST.get('password')
-        
-        user = authenticate(request, username=email, password=password)
-        
-        if user is not None:
-            try:
-                management = Management.objects.get(user=user)
-                login(request, user)
-                messages.success(request, 'Login successful!')
-                return redirect('management-dashboard')
-            except Management.DoesNotExist:
-                messages.error(request, 'Management profile not found for this user')
-        else:
-            messages.error(request, 'Invalid email or password')
-    
-    return render(request, 'core/management_login.html')
+    return _login_page(request, ROLE_MANAGEMENT, 'core/management_login.html', 'management-dashboard')
 
 
 def student_register_page(request):
@@ -1085,52 +1562,35 @@ def management_register_page(request):
     return render(request, 'core/management_register.html')
 
 
+def _render_dashboard(request, role, template, login_page, not_found):
+    """
+    Render a dashboard from its cached dashboard model. The template caches
+    its fragment under the same version, so the data is only assembled when
+    the fragment is missing.
+    """
+    profile_id = get_profile_id(request.user, role)
+    if profile_id is None:
+        messages.error(request, not_found)
+        return redirect(login_page)
+
+    version = dashboard_version(role, profile_id)
+    context = {
+        'dashboard': SimpleLazyObject(lambda: get_dashboard(role, profile_id, version)),
+        'dashboard_version': version,
+        'profile_id': profile_id,
+        'dashboard_cache_timeout': getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 10 * 60),
+    }
+    return render(request, template, context)
+
+
 @login_required
 def student_dashboard(request):
     """
     Dashboard view for students with attendance information
     """
-    try:
-        student = Student.objects.get(user=request.user)
-        
-        # Get course-wise attendance
-        student_courses = StudentCourse.objects.filter(student=student).select_related('course', 'teacher')
-        
-        course_attendance = []
-        for sc in student_courses:
-            # Calculate attendance percentage for this course
-            taught_course = TaughtCourse.objects.filter(
-                course=sc.course, 
-                teacher=sc.teacher
-            ).first()
-            
-            if taught_course:
-                # Parse classes attended and classes taken
-                classes_attended = len(sc.classes_attended.split(',')) if sc.classes_attended else 0
-                classes_taken = len(taught_course.classes_taken.split(',')) if taught_course.classes_taken else 0
-                
-                attendance_percentage = (classes_attended / classes_taken * 100) if classes_taken > 0 else 0
-            else:
-                attendance_percentage = 0
-            
-            course_attendance.append({
-                'course_name': sc.course.course_name,
-                'teacher_name': sc.teacher.teacher_name,
-                'attendance': round(attendance_percentage, 1)
-            })
-        
-        context = {
-            'student_name': student.student_name,
-            'student_id': student.student_id,
-            'overall_attendance': round(student.overall_attendance, 1),
-            'total_courses': len(course_attendance),
-            'course_attendance': course_attendance,
-        }
-        
-        return render(request, 'core/student_dashboard.html', context)
-    except Student.DoesNotExist:
-        messages.error(request, 'Student profile not found')
-        return redirect('student-login-page')
+    return _render_dashboard(
+        request, ROLE_STUDENT, 'core/student_dashboard.html', 'student-login-page', 'Student profile not found'
+    )
 
 
 @login_required
@@ -1138,31 +1598,9 @@ def teacher_dashboard(request):
     """
     Dashboard view for teachers
     """
-    try:
-        teacher = Teacher.objects.get(user=request.user)
-        
-        # Get courses taught by this teacher
-        taught_courses = TaughtCourse.objects.filter(teacher=teacher).select_related('course')
-        
-        courses = []
-        for tc in taught_courses:
-            courses.append({
-                'course_name': tc.course.course_name,
-                'classes_taken': tc.classes_taken if tc.classes_taken else 'None'
-            })
-        
-        context = {
-            'teacher_name': teacher.teacher_name,
-            'teacher_id': teacher.teacher_id,
-            'email': teacher.email,
-            'total_courses': len(courses),
-            'courses': courses,
-        }
-        
-        return render(request, 'core/teacher_dashboard.html', context)
-    except Teacher.DoesNotExist:
-        messages.error(request, 'Teacher profile not found')
-        return redirect('teacher-login-page')
+    return _render_dashboard(
+        request, ROLE_TEACHER, 'core/teacher_dashboard.html', 'teacher-login-page', 'Teacher profile not found'
+    )
 
 
 @login_required
@@ -1170,19 +1608,10 @@ def management_dashboard(request):
     """
     Dashboard view for management
     """
-    try:
-        management = Management.objects.get(user=request.user)
-        
-        context = {
-            'management_name': management.Management_name,
-            'management_id': management.Management_id,
-            'email': management.email,
-        }
-        
-        return render(request, 'core/management_dashboard.html', context)
-    except Management.DoesNotExist:
-        messages.error(request, 'Management profile not found')
-        return redirect('management-login-page')
+    return _render_dashboard(
+        request, ROLE_MANAGEMENT, 'core/management_dashboard.html', 'management-login-page',
+        'Management profile not found'
+    )
 
 
 def logout_page(request):
@@ -0,0 +1,87 @@
+"""
+Single-writer queue for running production on SQLite.
+
+SQLite allows one writer at a time, and every commit is a disk sync. With
+SQLITE_WRITE_QUEUE on, hot write paths (the scan views) hand their unit of
+work to one writer thread instead of writing from the request thread. The
+writer takes everything queued while the previous commit was in progress
+and runs it in a single transaction, one savepoint per job, so a burst of
+scans costs one commit (group commit) and never contends for the lock.
+
+Callers block until their job is committed and get its return value, or its
+exception. Without the setting, run_serialized() calls the function inline.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+class WriteQueue:
+    """Runs submitted jobs on one thread, committing them in batches"""
+
+    def __init__(self, max_batch=64):
+        self.max_batch = max_batch
+        self._jobs = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the writer thread and return its result"""
+        future = Future()
+        self._jobs.put((future, func, args, kwargs))
+        self._ensure_started()
+        return future.result()
+
+    def _ensure_started(self):
+        # Started lazily so forked worker processes each get their own writer
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._jobs.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._jobs.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch):
+        close_old_connections()
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for future, func, args, kwargs in batch:
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+        except Exception as exc:
+            # The commit itself failed, nothing in the batch was written
+            for future, *_ in batch:
+                future.set_exception(exc)
+            return
+
+        for future, result, exc in outcomes:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+write_queue = WriteQueue()
+
+
+def run_serialized(func, *args, **kwargs):
+    """Run a write through the writer thread when SQLITE_WRITE_QUEUE is on"""
+    if getattr(settings, 'SQLITE_WRITE_QUEUE', False):
+        return write_queue.submit(func, *args, **kwargs)
+    return func(*args, **kwargs)